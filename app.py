@@ -1,10 +1,21 @@
 # /app.py
-from flask import Flask, render_template, request, send_file, redirect, url_for
-import importlib
+from flask import Flask, render_template, request, send_file, redirect, url_for, jsonify
 import io
+import os
 import pandas as pd
 
+import jobs
+import metrics
+from scripts import category_store
+
+# Requests larger than this are rejected with 413 before anything is read.
+# Uploaded files themselves are spooled to a temporary file by werkzeug beyond 500 KiB.
+MAX_UPLOAD_BYTES = int(os.environ.get('AUTOWORLD_MAX_UPLOAD_MB', 512)) * 1024 * 1024
+
 app = Flask(__name__)
+app.config['MAX_CONTENT_LENGTH'] = MAX_UPLOAD_BYTES
+
+XLSX_MIMETYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
 
 # Define your programs. The 'id' must match the script's filename (without .py)
 # The 'name' is what users will see on the website.
@@ -45,34 +56,28 @@ def run_program(program_name):
     program_info = PROGRAMS_DICT[program_name]
 
     if request.method == 'POST':
-        if 'file' not in request.files or request.files['file'].filename == '':
+        files = [f for f in request.files.getlist('file') if f.filename]
+        if not files:
             return redirect(request.url)
-        
-        file = request.files['file']
+
         try:
-            module = importlib.import_module(f"scripts.{program_name}")
             # This function name must match the one in the script file.
-            output_buffer = module.process_file(file)
-
-            # --- ADDED CHECK ---
-            # Check if the processing function returned a valid result.
-            if output_buffer is None:
-                raise ValueError(f"The '{program_name}' script ran but did not produce an output file. This might happen if the input data was empty or did not meet the script's criteria.")
-            # --- END ADDED CHECK ---
-            
-            output_filename = f"processed_{program_name}_{file.filename}"
-            return send_file(
-                output_buffer,
-                as_attachment=True,
-                download_name=output_filename,
-                mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-            )
+            # The worker raises if the script returns no output file.
+            if len(files) == 1 and not files[0].filename.lower().endswith('.zip'):
+                file = files[0]
+                output_filename = f"processed_{program_name}_{file.filename}"
+                job_id = jobs.submit(program_name, 'process_file', file, download_name=output_filename)
+            else:
+                # Batch mode: several files or a zip, processed in parallel and returned as one zip.
+                output_filename = f"processed_{program_name}_batch.zip"
+                job_id = jobs.submit_batch(program_name, 'process_file', files, download_name=output_filename)
+            return redirect(url_for('job_page', job_id=job_id))
         except Exception as e:
             # Render the generic upload page with an error message
-            return render_template('run_program.html', program_name=program_info['name'], error=str(e))
+            return render_template('run_program.html', program_name=program_info['name'], program_id=program_name, error=str(e))
 
     # For GET requests, show the generic upload page.
-    return render_template('run_program.html', program_name=program_info['name'], error=None)
+    return render_template('run_program.html', program_name=program_info['name'], program_id=program_name, error=None)
 
 
 # --- Dedicated Handler for Tirepick Daily ---
@@ -82,18 +87,19 @@ def run_tirepick_daily():
         try:
             file = request.files.get('file')
             analysis_date = request.form.get('analysis_date')
+            end_date = request.form.get('end_date', '').strip()
 
             if not file or not analysis_date:
                 raise ValueError("A file and an analysis date are required.")
 
-            module = importlib.import_module("scripts.tirepick_daily")
-            result_df = module.analyze_sales_data(file, analysis_date)
-
-            table_html = result_df.to_html(classes='table table-striped', index=False) if not result_df.empty else None
-            
-            return render_template('view_tirepick_daily_results.html', 
-                                   table_html=table_html, 
-                                   analysis_date=analysis_date)
+            if end_date:
+                # Range mode: one run returns a day x channel table for the whole period.
+                job_id = jobs.submit('tirepick_daily', 'analyze_sales_range', file, analysis_date, end_date,
+                                     meta={'analysis_date': f"{analysis_date} ~ {end_date}", 'is_range': True})
+            else:
+                job_id = jobs.submit('tirepick_daily', 'analyze_sales_data', file, analysis_date,
+                                     meta={'analysis_date': analysis_date})
+            return redirect(url_for('job_page', job_id=job_id))
 
         except Exception as e:
             return render_template('run_tirepick_daily.html', error=str(e))
@@ -114,11 +120,20 @@ def run_ibx_automation():
             if not all([data_type, sheet_name, input_file, template_file]):
                 raise ValueError("All fields are required.")
 
-            module = importlib.import_module("scripts.ibx_automation")
-            output_buffer = module.process_files(data_type, sheet_name, input_file, template_file)
-            
             output_filename = f"UPDATED_{template_file.filename}"
-            return send_file(output_buffer, as_attachment=True, download_name=output_filename, mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+            if data_type == 'both':
+                # B2B and B2C filled into the same template with one load/save.
+                b2c_sheet_name = request.form.get('b2c_sheet_name')
+                b2c_input_file = request.files.get('b2c_input_file')
+                if not b2c_sheet_name or not b2c_input_file or not b2c_input_file.filename:
+                    raise ValueError("The B2C input file and sheet name are required for a combined run.")
+                job_id = jobs.submit('ibx_automation', 'process_combined', template_file,
+                                     ['b2b', 'b2c'], [sheet_name, b2c_sheet_name], input_file, b2c_input_file,
+                                     download_name=output_filename)
+            else:
+                job_id = jobs.submit('ibx_automation', 'process_files', data_type, sheet_name, input_file, template_file,
+                                     download_name=output_filename)
+            return redirect(url_for('job_page', job_id=job_id))
         except Exception as e:
             return render_template('run_ibx_automation.html', error=str(e))
     return render_template('run_ibx_automation.html', error=None)
@@ -134,10 +149,8 @@ def run_crm():
             if not file1 or not file2:
                 raise ValueError("Both Dataset 1 and Dataset 2 files are required.")
 
-            module = importlib.import_module("scripts.crm")
-            output_buffer = module.process_files(file1, file2)
-            
-            return send_file(output_buffer, as_attachment=True, download_name='extracted_crm_contacts.xlsx', mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+            job_id = jobs.submit('crm', 'process_files', file1, file2, download_name='extracted_crm_contacts.xlsx')
+            return redirect(url_for('job_page', job_id=job_id))
         except Exception as e:
             return render_template('run_crm.html', error=str(e))
     return render_template('run_crm.html', error=None)
@@ -150,17 +163,55 @@ def run_pl_categorizer():
         try:
             prev_file = request.files.get('prev_file')
             curr_file = request.files.get('curr_file')
-            if not prev_file or not curr_file:
-                raise ValueError("Both the 'previous' and 'current' month files are required.")
+            if not curr_file or not curr_file.filename:
+                raise ValueError("The 'current' month file is required.")
+            if prev_file is not None and not prev_file.filename:
+                prev_file = None  # optional: the stored vendor categories are used instead
 
-            module = importlib.import_module("scripts.pl_categorizer")
-            output_buffer = module.process_files(prev_file, curr_file)
-            
             output_filename = f"Categorized_{curr_file.filename}"
-            return send_file(output_buffer, as_attachment=True, download_name=output_filename, mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+            job_id = jobs.submit('pl_categorizer', 'process_files', prev_file, curr_file, download_name=output_filename)
+            return redirect(url_for('job_page', job_id=job_id))
         except Exception as e:
-            return render_template('run_pl_categorizer.html', error=str(e))
-    return render_template('run_pl_categorizer.html', error=None)
+            return render_template('run_pl_categorizer.html', error=str(e), vendor_count=category_store.count())
+    return render_template('run_pl_categorizer.html', error=None, vendor_count=category_store.count())
+
+
+@app.route('/run/pl_categorizer/categories.csv')
+def export_pl_categories():
+    """Downloads the stored vendor categories as CSV."""
+    return send_file(category_store.export_csv(), as_attachment=True,
+                     download_name='pl_categories.csv', mimetype='text/csv')
+
+
+@app.route('/run/pl_categorizer/categories', methods=['POST'])
+def import_pl_categories():
+    """Merges an uploaded vendor/category CSV into the store."""
+    categories_file = request.files.get('categories_file')
+    try:
+        if not categories_file or not categories_file.filename:
+            raise ValueError("Please choose a CSV file to import.")
+        category_store.import_csv(categories_file.stream)
+    except Exception as e:
+        return render_template('run_pl_categorizer.html', error=str(e), vendor_count=category_store.count())
+    return redirect(url_for('run_pl_categorizer'))
+
+
+# --- Multi-month comparison for PL Converter ---
+@app.route('/run/pl_converter/compare', methods=['GET', 'POST'])
+def run_pl_converter_compare():
+    if request.method == 'POST':
+        try:
+            files = [f for f in request.files.getlist('files') if f.filename]
+            if not files or (len(files) == 1 and not files[0].filename.lower().endswith('.zip')):
+                raise ValueError("Please upload at least two monthly trial balances (or a .zip of them).")
+
+            # Each month is parsed in its own worker; the results are merged into one workbook.
+            job_id = jobs.submit_batch('pl_converter', 'parse_month', files,
+                                       download_name='pl_monthly_comparison.xlsx', combine='combine_months')
+            return redirect(url_for('job_page', job_id=job_id))
+        except Exception as e:
+            return render_template('run_pl_converter_compare.html', error=str(e))
+    return render_template('run_pl_converter_compare.html', error=None)
 
 
 # --- Dedicated Handler for Quick Delivery ---
@@ -173,19 +224,77 @@ def run_quick_delivery():
             if not logistics_file or not admin_file:
                 raise ValueError("Both logistics and admin files are required.")
 
-            module = importlib.import_module("scripts.quick_delivery")
-            output_buffer = module.process_files(logistics_file, admin_file)
-
-            return send_file(
-                output_buffer,
-                as_attachment=True,
-                download_name='quick_delivery_summary.xlsx',
-                mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-            )
+            job_id = jobs.submit('quick_delivery', 'process_files', logistics_file, admin_file,
+                                 download_name='quick_delivery_summary.xlsx')
+            return redirect(url_for('job_page', job_id=job_id))
         except Exception as e:
             return render_template('run_quick_delivery.html', error=str(e))
     return render_template('run_quick_delivery.html', error=None)
 
 
+# --- Background Job Status and Download ---
+@app.route('/jobs/<job_id>')
+def job_page(job_id):
+    """Shows the progress of a queued run and its result once finished."""
+    job = jobs.status(job_id)
+    if job is None:
+        return "Job not found", 404
+
+    program_info = PROGRAMS_DICT.get(job['program'], {'id': job['program'], 'name': job['program']})
+    if job['state'] == 'done' and job.get('kind') == 'frame':
+        # Tirepick Daily returns a table that is shown in the browser.
+        result_df = jobs.load_frame(job_id)
+        table_html = result_df.to_html(classes='table table-striped', index=False) if not result_df.empty else None
+        return render_template('view_tirepick_daily_results.html',
+                               table_html=table_html,
+                               analysis_date=job['meta'].get('analysis_date'),
+                               is_range=job['meta'].get('is_range', False))
+
+    return render_template('job_status.html', job=job, program=program_info)
+
+
+@app.route('/jobs/<job_id>/status')
+def job_status(job_id):
+    """Returns the job record as JSON for polling clients."""
+    job = jobs.status(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job)
+
+
+@app.route('/jobs/<job_id>/download')
+def job_download(job_id):
+    """Streams the finished output file of a job."""
+    path = jobs.result_path(job_id)
+    if path is None:
+        return "Result not available", 404
+    job = jobs.status(job_id)
+    return send_file(path, as_attachment=True, download_name=job['download_name'],
+                     mimetype=job.get('mimetype', XLSX_MIMETYPE))
+
+
+@app.errorhandler(413)
+def upload_too_large(e):
+    """Explains the upload limit instead of a bare 413 page."""
+    limit_mb = MAX_UPLOAD_BYTES // (1024 * 1024)
+    return f"The upload is too large. Files up to {limit_mb} MB in total can be processed at once.", 413
+
+
+# --- Readiness ---
+@app.route('/ready')
+def readiness():
+    """Readiness probe: 503 until the scripts are imported and this process's job pool is running."""
+    state = jobs.readiness()
+    return jsonify(state), 200 if state['ready'] else 503
+
+
+# --- Run Metrics ---
+@app.route('/metrics')
+def prometheus_metrics():
+    """Prometheus text exposition of the program run metrics (see metrics.py)."""
+    return metrics.render(), 200, {'Content-Type': metrics.CONTENT_TYPE}
+
+
+# Development server only; production runs wsgi.py under gunicorn (see gunicorn.conf.py).
 if __name__ == '__main__':
     app.run(host='0.0.0.0', debug=True)
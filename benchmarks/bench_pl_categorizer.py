@@ -0,0 +1,64 @@
+"""Benchmark PL Categorizer's previous-month ledger read.
+
+Builds synthetic ledgers of increasing size and times
+``pl_categorizer.build_category_map`` on a read-only workbook, which is what
+``process_files`` does with the previous month's upload. The time per row
+should stay flat as the ledger grows.
+
+Usage::
+
+    python -m benchmarks.bench_pl_categorizer [rows ...]
+"""
+
+from __future__ import annotations
+
+import io
+import sys
+import time
+
+import openpyxl
+
+from scripts import pl_categorizer
+
+DEFAULT_SIZES = [10_000, 100_000, 500_000]
+VENDORS = 5_000
+CATEGORIES = ["매출원가", "판관비", "영업외비용", "공통"]
+
+
+def make_ledger(rows: int) -> bytes:
+    """Return an xlsx ledger with ``rows`` data rows and the usual headers."""
+
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet("원장")
+    sheet.append(["일자", "계정과목", "거래처명", "적요", "차변", "대변", "구분"])
+    for i in range(rows):
+        vendor = i % VENDORS
+        sheet.append([
+            f"2024-01-{i % 28 + 1:02d}", "지급수수료", f"거래처{vendor}", f"적요 {i}",
+            (i * 37) % 100_000, 0, CATEGORIES[vendor % len(CATEGORIES)],
+        ])
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    return buffer.getvalue()
+
+
+def time_build_category_map(data: bytes) -> tuple[float, int]:
+    start = time.perf_counter()
+    workbook = openpyxl.load_workbook(io.BytesIO(data), read_only=True)
+    try:
+        category_map = pl_categorizer.build_category_map(workbook)
+    finally:
+        workbook.close()
+    return time.perf_counter() - start, len(category_map)
+
+
+def main(sizes: list[int]) -> None:
+    print(f"{'rows':>10} {'seconds':>10} {'us/row':>10} {'vendors':>10}")
+    for rows in sizes:
+        data = make_ledger(rows)
+        elapsed, vendors = time_build_category_map(data)
+        print(f"{rows:>10,} {elapsed:>10.2f} {elapsed / rows * 1e6:>10.2f} {vendors:>10,}")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES)
@@ -0,0 +1,239 @@
+"""Benchmark every program on synthetic uploads, phase by phase.
+
+Each program runs on the workbooks of :mod:`benchmarks.synthetic_exports`
+at the requested sizes, the way the job workers call it, and its wall time
+is split into the phases the job workers record (see
+:mod:`scripts.phase_timer`):
+
+``parse``
+    Loading the uploads in the shared readers or ``openpyxl.load_workbook``.
+``serialize``
+    Producing the output file in the shared writers.
+``compute``
+    Everything else.
+
+Every run starts cold: the upload cache, the B2C daily store, the PL
+category store and IBX's template cache live in a temporary directory and
+are emptied before each run, so nothing carries over between sizes or
+repeats. Input generation is not timed.
+
+The harness also runs against older trees, down to the first commit. Where
+``scripts.phase_timer`` does not exist yet, only the wall time of each
+program's public entry point is recorded (``total``); where Tirepick Daily
+has no ``analyze_sales_range``, its single-day ``analyze_sales_data`` is
+timed on the last day of the month instead.
+
+Results are saved as JSON (commit, versions and per-program, per-size
+phase seconds of the fastest repeat) so runs of different commits can be
+compared with ``--baseline``.
+
+Usage::
+
+    python -m benchmarks.bench_programs [--rows 10000 ...] [--programs crm ...] [--repeat 3]
+                                        [--output results.json] [--baseline old.json]
+"""
+
+from __future__ import annotations
+
+import os
+import tempfile
+
+# Keep the caches and stores of the benchmark away from the real ones; the
+# scripts read these when they are imported.
+_STATE_DIR = tempfile.mkdtemp(prefix="autoworld-bench-")
+os.environ["AUTOWORLD_CACHE_DIR"] = os.path.join(_STATE_DIR, "upload_cache")
+os.environ["AUTOWORLD_B2C_STORE"] = os.path.join(_STATE_DIR, "b2c_daily.sqlite3")
+os.environ["AUTOWORLD_CATEGORY_DB"] = os.path.join(_STATE_DIR, "pl_categories.sqlite3")
+
+import argparse  # noqa: E402
+import contextlib  # noqa: E402
+import datetime  # noqa: E402
+import importlib  # noqa: E402
+import json  # noqa: E402
+import platform  # noqa: E402
+import subprocess  # noqa: E402
+import time  # noqa: E402
+from dataclasses import dataclass  # noqa: E402
+
+import openpyxl  # noqa: E402
+import pandas as pd  # noqa: E402
+
+from benchmarks import synthetic_exports  # noqa: E402
+from scripts import (  # noqa: E402
+    b2c_weekly_p, crm, ibx_automation, margin_by_tire, pl_categorizer, pl_converter, quick_delivery,
+    tirepick_daily, weekly_kpi,
+)
+
+
+def _optional_script(name: str):
+    """Import ``scripts.<name>``, or return None on a tree that predates it."""
+
+    try:
+        return importlib.import_module(f"scripts.{name}")
+    except ModuleNotFoundError as e:
+        if e.name != f"scripts.{name}":
+            raise
+        return None
+
+
+b2c_daily_store = _optional_script("b2c_daily_store")
+category_store = _optional_script("category_store")
+phase_timer = _optional_script("phase_timer")
+upload_cache = _optional_script("upload_cache")
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+PHASES = ["parse", "compute", "serialize"]
+
+_MONTH_FIRST = synthetic_exports.MONTH_START
+_MONTH_LAST = _MONTH_FIRST + datetime.timedelta(days=synthetic_exports.MONTH_DAYS - 1)
+
+
+def _tirepick_month(orders):
+    if hasattr(tirepick_daily, "analyze_sales_range"):
+        return tirepick_daily.analyze_sales_range(
+            orders, _MONTH_FIRST.strftime("%Y%m%d"), _MONTH_LAST.strftime("%Y%m%d"))
+    return tirepick_daily.analyze_sales_data(orders, _MONTH_LAST.strftime("%Y%m%d"))
+
+
+@dataclass
+class Program:
+    """How to run one program: its input kinds and the call."""
+
+    inputs: tuple
+    run: object
+
+
+PROGRAMS = {
+    "weekly_kpi": Program(("order",), weekly_kpi.process_file),
+    "margin_by_tire": Program(("order",), margin_by_tire.process_file),
+    "b2c_weekly_p": Program(("order",), b2c_weekly_p.process_file),
+    "tirepick_daily": Program(("order",), _tirepick_month),
+    "ibx_automation": Program(
+        ("order", "ibx_template"),
+        lambda orders, template: ibx_automation.process_files("b2b", "B2B", orders, template),
+    ),
+    "quick_delivery": Program(("logistics", "admin"), quick_delivery.process_files),
+    "crm": Program(("member_ids", "consent"), crm.process_files),
+    "pl_converter": Program(("trial_balance",), pl_converter.process_file),
+    # The same ledger is the previous and the current month.
+    "pl_categorizer": Program(("ledger", "ledger"), pl_categorizer.process_files),
+}
+
+
+def reset_state() -> None:
+    """Empty every cache and store a program could reuse between runs."""
+
+    if upload_cache is not None:
+        upload_cache.clear()
+    if hasattr(ibx_automation, "_template_cache"):
+        ibx_automation._template_cache.clear()
+    for store in filter(None, (b2c_daily_store, category_store)):
+        for suffix in ("", "-wal", "-shm"):
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(store.STORE_PATH + suffix)
+
+
+def run_once(program: Program, paths: list) -> dict:
+    """Run ``program`` once on the files at ``paths`` and return its phase seconds.
+
+    Without ``phase_timer`` only the ``total`` is known.
+    """
+
+    reset_state()
+    with contextlib.ExitStack() as stack:
+        streams = [stack.enter_context(open(path, "rb")) for path in paths]
+        run = stack.enter_context(phase_timer.collect()) if phase_timer else None
+        start = time.perf_counter()
+        program.run(*streams)
+        total = time.perf_counter() - start
+    if run is None:
+        return {"total": round(total, 4)}
+    parse, serialize = run.seconds.get("parse", 0.0), run.seconds.get("serialize", 0.0)
+    seconds = {"parse": parse, "compute": max(total - parse - serialize, 0.0), "serialize": serialize, "total": total}
+    return {key: round(value, 4) for key, value in seconds.items()}
+
+
+def benchmark(name: str, rows: int, repeat: int = 1) -> dict:
+    """Time program ``name`` at ``rows`` rows; keeps the fastest of ``repeat`` runs."""
+
+    program = PROGRAMS[name]
+    paths = [synthetic_exports.export_path(kind, rows) for kind in program.inputs]
+    result = {"program": name, "rows": rows, "repeat": repeat}
+    try:
+        runs = [run_once(program, paths) for _ in range(repeat)]
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+        return result
+    result.update(min(runs, key=lambda run: run["total"]))
+    return result
+
+
+def git_commit() -> str | None:
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=root, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=root,
+                               capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return f"{commit}-dirty" if dirty else commit
+
+
+def load_results(path: str) -> dict:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def print_row(result: dict, baseline: dict | None = None) -> None:
+    line = f"{result['program']:<16} {result['rows']:>10,}"
+    if "error" in result:
+        print(f"{line}  {result['error']}")
+        return
+    line += "".join(f" {result[phase]:>10.2f}" if phase in result else f" {'-':>10}"
+                    for phase in [*PHASES, "total"])
+    old = (baseline or {}).get((result["program"], result["rows"]))
+    if old and "total" in old and result["total"]:
+        line += f" {old['total'] / result['total']:>8.2f}x"
+    print(line)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Time the programs on synthetic uploads.")
+    parser.add_argument("--rows", type=int, nargs="+", default=synthetic_exports.DEFAULT_SIZES)
+    parser.add_argument("--programs", nargs="+", choices=list(PROGRAMS), default=list(PROGRAMS))
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--output", help="JSON file for the results (default: benchmarks/results/<commit>.json)")
+    parser.add_argument("--baseline", help="earlier results JSON; prints the speedup of each run against it")
+    args = parser.parse_args(argv)
+
+    baseline = None
+    if args.baseline:
+        baseline = {(r["program"], r["rows"]): r for r in load_results(args.baseline)["results"]}
+
+    commit = git_commit()
+    header = f"{'program':<16} {'rows':>10}" + "".join(f" {phase:>10}" for phase in [*PHASES, "total"])
+    print(header + (f" {'speedup':>9}" if baseline else ""))
+    results = []
+    for rows in args.rows:
+        for name in args.programs:
+            result = benchmark(name, rows, args.repeat)
+            results.append(result)
+            print_row(result, baseline)
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{commit or 'results'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump({
+            "commit": commit,
+            "created": datetime.datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "openpyxl": openpyxl.__version__,
+            "results": results,
+        }, f, ensure_ascii=False, indent=2)
+    print(f"Saved {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""Benchmark server start-up and the latency of the first job.
+
+Every scenario runs in a fresh interpreter, so nothing is imported or
+started beforehand:
+
+``import app``
+    What the development server loads before its first request.
+``import wsgi``
+    The production entry point: the app plus pandas, openpyxl and every
+    script (``jobs.PRELOAD_MODULES``).
+``warm_up``
+    Starting the job pool and its workers (``jobs.warm_up``) after
+    ``import wsgi``, as each gunicorn worker does before taking requests.
+``first job, cold`` / ``first job, warm``
+    Submit to finished for one Weekly KPI run on a synthetic order export,
+    right after ``import app`` (the pool, the fork server and the script
+    imports all happen inside the job) and after ``import wsgi`` plus
+    ``warm_up``.
+
+Each scenario is repeated and the fastest run is kept.
+
+Usage::
+
+    python -m benchmarks.bench_startup [--rows 1000] [--repeat 3]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import textwrap
+
+from benchmarks import synthetic_exports
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_IMPORT = """
+import json, time
+start = time.perf_counter()
+import {module}
+print(json.dumps({{"seconds": time.perf_counter() - start}}))
+"""
+
+_WARM_UP = """
+import json, time
+import wsgi, jobs
+start = time.perf_counter()
+jobs.warm_up()
+print(json.dumps({"seconds": time.perf_counter() - start}))
+jobs.shutdown()
+"""
+
+_FIRST_JOB = """
+import json, sys, time
+from werkzeug.datastructures import FileStorage
+import {module}, jobs
+if {warm}:
+    jobs.warm_up()
+start = time.perf_counter()
+with open(sys.argv[1], "rb") as f:
+    job_id = jobs.submit("weekly_kpi", "process_file", FileStorage(f, filename="orders.xlsx"))
+while jobs.status(job_id)["state"] not in ("done", "error"):
+    time.sleep(0.005)
+print(json.dumps({{"seconds": time.perf_counter() - start, "state": jobs.status(job_id)["state"]}}))
+jobs.shutdown()
+"""
+
+SCENARIOS = {
+    "import app": _IMPORT.format(module="app"),
+    "import wsgi": _IMPORT.format(module="wsgi"),
+    "warm_up": _WARM_UP,
+    "first job, cold": _FIRST_JOB.format(module="app", warm=False),
+    "first job, warm": _FIRST_JOB.format(module="wsgi", warm=True),
+}
+
+
+def run_scenario(code: str, orders_path: str) -> dict:
+    """Run ``code`` in a fresh interpreter with its own job directory and stores."""
+
+    with tempfile.TemporaryDirectory(prefix="autoworld-startup-") as state_dir:
+        env = dict(
+            os.environ,
+            AUTOWORLD_JOB_DIR=os.path.join(state_dir, "jobs"),
+            AUTOWORLD_CACHE_DIR=os.path.join(state_dir, "upload_cache"),
+            AUTOWORLD_B2C_STORE=os.path.join(state_dir, "b2c_daily.sqlite3"),
+            AUTOWORLD_CATEGORY_DB=os.path.join(state_dir, "pl_categories.sqlite3"),
+            AUTOWORLD_METRICS_LOG=os.path.join(state_dir, "run_metrics.jsonl"),
+        )
+        # The job workers re-import the main script, so it needs a file and the main guard.
+        script = os.path.join(state_dir, "scenario.py")
+        with open(script, "w", encoding="utf-8") as f:
+            f.write("if __name__ == '__main__':\n" + textwrap.indent(code.strip(), "    ") + "\n")
+        env["PYTHONPATH"] = os.pathsep.join(filter(None, [ROOT, env.get("PYTHONPATH")]))
+        process = subprocess.run([sys.executable, script, orders_path], cwd=ROOT, env=env,
+                                 capture_output=True, text=True)
+    if process.returncode:
+        raise RuntimeError(process.stderr.strip())
+    return json.loads(process.stdout.strip().splitlines()[-1])
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Time server start-up and the first job.")
+    parser.add_argument("--rows", type=int, default=1_000, help="rows of the order export of the first job")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    orders_path = synthetic_exports.export_path("order", args.rows)
+    print(f"{'scenario':<18} {'seconds':>10}")
+    for name, code in SCENARIOS.items():
+        runs = [run_scenario(code, orders_path) for _ in range(args.repeat)]
+        best = min(runs, key=lambda run: run["seconds"])
+        state = f"  ({best['state']})" if best.get("state", "done") != "done" else ""
+        print(f"{name:<18} {best['seconds']:>10.2f}{state}")
+
+
+if __name__ == "__main__":
+    main()
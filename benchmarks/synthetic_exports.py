@@ -0,0 +1,324 @@
+"""Synthetic uploads for the benchmarks.
+
+Writes xlsx workbooks shaped like the files the programs receive: the order
+export of the tire shop, the courier cost (logistics) and admin order
+exports of Quick Delivery, the member id list and marketing-consent export
+of CRM, a trial balance for PL Converter, a ledger for PL Categorizer and an
+IBX template. Column names and label vocabularies (status, brands, channels,
+product types, partner ids, account names) are taken from the scripts, so
+the generated files go through the same code paths as real uploads.
+
+Generation is deterministic for a given ``(kind, rows, seed)``. Large files
+take a while to write, so :func:`export_path` keeps them under
+``benchmarks/data`` (ignored by git) and reuses them on later runs.
+
+Usage::
+
+    python -m benchmarks.synthetic_exports [--rows 10000 100000 1000000] [--kinds order admin ...]
+"""
+
+from __future__ import annotations
+
+import argparse
+import datetime
+import io
+import os
+
+import numpy as np
+import openpyxl
+
+from benchmarks.bench_pl_categorizer import make_ledger
+from scripts import ibx_automation, margin_by_tire, pl_converter
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+
+# Every export covers one month, like the month-to-date uploads.
+MONTH_START = datetime.date(2025, 9, 1)
+MONTH_DAYS = 30
+
+STATUSES = ["완료", "배송", "확정", "입금", "준비", "취소", "반품"]
+STATUS_WEIGHTS = [0.45, 0.15, 0.15, 0.05, 0.05, 0.1, 0.05]
+CHANNELS = ["앱", "웹", "모바일웹", "제휴", "전화"]
+CHANNEL_WEIGHTS = [0.4, 0.2, 0.2, 0.15, 0.05]
+PRODUCT_TYPES = ["타이어", "엔진오일", "휠얼라인먼트", "배터리", "세차권", "와이퍼"]
+PRODUCT_TYPE_WEIGHTS = [0.6, 0.1, 0.1, 0.08, 0.06, 0.06]
+BRANDS_BY_PRODUCT_TYPE = {
+    "타이어": ibx_automation.TIRE_BRANDS_B2B + ["기타"],
+    "엔진오일": ibx_automation.ENGINE_OIL_BRANDS_B2B,
+    "휠얼라인먼트": ["기타"],
+    "배터리": ibx_automation.BATTERY_BRANDS_B2B,
+    "세차권": ["기타"],
+    "와이퍼": ["보쉬", "기타"],
+}
+TIRE_PATTERNS = ["쿠퍼 CS5", "쿠퍼 코브라", "이글 F1", "벤투스 S1", "파일럿 스포츠 4", "투란자 T005", "엔페라 AU7"]
+OIL_PRODUCTS = ["엔진오일 교체 + 오일필터", "엔진오일 4L", "엔진오일 교체 (오일필터 포함)"]
+# Partner ids of margin_by_tire plus plain customer accounts.
+PARTNER_IDS = list(margin_by_tire.BLACK_CIRCLE_MAP) + list(margin_by_tire.TIREPICK_MAP)
+DELIVERY_METHODS = ["택배", "퀵배송", "방문장착", "직접수령"]
+DELIVERY_METHOD_WEIGHTS = [0.5, 0.2, 0.25, 0.05]
+PROVINCES = {
+    "서울특별시": ["강남구", "서초구", "송파구", "마포구", "영등포구", "강서구", "노원구"],
+    "경기도": ["성남시 분당구", "수원시 영통구", "용인시 수지구", "고양시 일산동구", "화성시"],
+    "인천광역시": ["연수구", "남동구", "부평구"],
+    "부산광역시": ["해운대구", "부산진구"],
+}
+ROADS = ["테헤란로", "판교로", "올림픽로", "세종대로", "중앙로", "월드컵로", "광교로"]
+
+# Spelled out: older trees keep this list inside weekly_kpi.process_file.
+DROPPED_COLUMNS = ["년도", "월", "주", "년월", "기획전", "상품정보", "배송사", "송장번호"]
+
+# Order export columns: what the programs read, plus columns weekly_kpi drops.
+ORDER_COLUMNS = [
+    "주문번호", "주문일", "주문일자", "상태", "주문ID", "고객id", "주문채널", "상품타입", "Brand", "브랜드",
+    "패턴", "주문상품", "Part No", "주문수량", "수량", "타이어가격", "상품가", "상품주문금액", "실결제금액",
+    "장착비", "정산금액", "판매금액", "배송비", "상품쿠폰", "배송비쿠폰", "포인트", "상품별 영업할인", "직원할인",
+    "배송방법", "배송주소",
+] + DROPPED_COLUMNS
+
+
+def make_order_export(rows: int, seed: int = 0) -> bytes:
+    """Return an order export with ``rows`` order lines over one month."""
+
+    rng = np.random.default_rng(seed)
+    days = np.sort(rng.integers(0, MONTH_DAYS, rows))
+    dates = [MONTH_START + datetime.timedelta(days=int(day)) for day in range(MONTH_DAYS)]
+    stamps = rng.integers(8 * 3600, 22 * 3600, rows)
+    product_types = rng.choice(PRODUCT_TYPES, rows, p=PRODUCT_TYPE_WEIGHTS)
+    brands = np.empty(rows, dtype=object)
+    for product_type, choices in BRANDS_BY_PRODUCT_TYPE.items():
+        mask = product_types == product_type
+        brands[mask] = rng.choice(choices, int(mask.sum()))
+    is_tire = product_types == "타이어"
+    products = np.where(is_tire, "타이어 장착", product_types).astype(object)
+    is_oil = product_types == "엔진오일"
+    products[is_oil] = rng.choice(OIL_PRODUCTS, int(is_oil.sum()))
+    quantity = np.where(is_tire, rng.choice([1, 2, 4], rows, p=[0.2, 0.4, 0.4]), 1)
+    unit_price = rng.integers(40, 400, rows) * 1000
+    amount = quantity * unit_price
+    partner = rng.random(rows) < 0.3
+
+    columns = {
+        "주문번호": (2_509_000_000 + np.sort(rng.integers(0, max(rows * 7 // 10, 1), rows))).tolist(),
+        "주문일": [int(dates[day].strftime("%Y%m%d")) for day in days],
+        "주문일자": [datetime.datetime.combine(dates[day], datetime.time()) + datetime.timedelta(seconds=int(s))
+                   for day, s in zip(days, stamps)],
+        "상태": rng.choice(STATUSES, rows, p=STATUS_WEIGHTS).tolist(),
+        "주문ID": np.where(partner, rng.choice(PARTNER_IDS, rows),
+                         np.char.add("user", rng.integers(1, 50_000, rows).astype(str))).tolist(),
+        "고객id": rng.integers(1, max(rows // 5, 10), rows).tolist(),
+        "주문채널": rng.choice(CHANNELS, rows, p=CHANNEL_WEIGHTS).tolist(),
+        "상품타입": product_types.tolist(),
+        "Brand": brands.tolist(),
+        "브랜드": brands.tolist(),
+        "패턴": np.where(is_tire, rng.choice(TIRE_PATTERNS, rows), None).tolist(),
+        "주문상품": products.tolist(),
+        "Part No": np.char.add(np.where(rng.random(rows) < 0.05, "B", "T"),
+                               rng.integers(1000, 9999, rows).astype(str)).tolist(),
+        "주문수량": quantity.tolist(),
+        "수량": quantity.tolist(),
+        "타이어가격": unit_price.tolist(),
+        "상품가": amount.tolist(),
+        "상품주문금액": amount.tolist(),
+        "실결제금액": (amount - rng.integers(0, 5, rows) * 1000).tolist(),
+        "장착비": np.where(is_tire, quantity * 5000, 0).tolist(),
+        "정산금액": (amount * 0.85).round(-1).tolist(),
+        "판매금액": amount.tolist(),
+        "배송비": rng.choice([0, 3000, 5000], rows).tolist(),
+        "상품쿠폰": rng.choice([0, 0, 0, 5000, 10000], rows).tolist(),
+        "배송비쿠폰": rng.choice([0, 0, 3000], rows).tolist(),
+        "포인트": rng.choice([0, 0, 1000, 2000], rows).tolist(),
+        "상품별 영업할인": rng.choice([0, 0, 0, 10000], rows).tolist(),
+        "직원할인": rng.choice([0] * 19 + [20000], rows).tolist(),
+        "배송방법": rng.choice(DELIVERY_METHODS, rows, p=DELIVERY_METHOD_WEIGHTS).tolist(),
+        "배송주소": make_addresses(rng, rows),
+    }
+    for col in ORDER_COLUMNS:
+        if col not in columns:
+            columns[col] = rng.integers(0, 1000, rows).tolist()
+    return _workbook("주문", ORDER_COLUMNS, [columns[col] for col in ORDER_COLUMNS])
+
+
+def make_admin_export(rows: int, seed: int = 0) -> bytes:
+    """Return the admin order export of Quick Delivery with ``rows`` orders."""
+
+    rng = np.random.default_rng(seed)
+    columns = ["주문번호", "주문일자", "상태", "고객id", "상품타입", "배송방법", "배송주소", "배송비"]
+    values = [
+        (2_509_000_000 + np.arange(rows)).tolist(),
+        [(MONTH_START + datetime.timedelta(days=int(day))).isoformat() for day in rng.integers(0, MONTH_DAYS, rows)],
+        rng.choice(STATUSES, rows, p=STATUS_WEIGHTS).tolist(),
+        rng.integers(1, max(rows // 5, 10), rows).tolist(),
+        rng.choice(PRODUCT_TYPES, rows, p=PRODUCT_TYPE_WEIGHTS).tolist(),
+        rng.choice(DELIVERY_METHODS, rows, p=DELIVERY_METHOD_WEIGHTS).tolist(),
+        make_addresses(rng, rows),
+        rng.choice([0, 3000, 5000], rows).tolist(),
+    ]
+    return _workbook("주문관리", columns, values)
+
+
+def make_logistics_export(rows: int, seed: int = 0) -> bytes:
+    """Return a courier cost export matching part of :func:`make_admin_export`'s orders.
+
+    About a quarter of the admin orders went out by courier; most of those
+    codes match an order number, the rest belong to other shops.
+    """
+
+    rng = np.random.default_rng(seed + 1)
+    shipments = max(rows // 4, 1)
+    codes = 2_509_000_000 + rng.choice(rows * 11 // 10 + 1, shipments, replace=False)
+    columns = ["배송일자", "자체 관리코드", "기사명", "출발지", "도착지", "합계비용"]
+    values = [
+        [(MONTH_START + datetime.timedelta(days=int(day))).isoformat() for day in rng.integers(0, MONTH_DAYS, shipments)],
+        codes.tolist(),
+        np.char.add("기사", rng.integers(1, 200, shipments).astype(str)).tolist(),
+        ["본사 물류센터"] * shipments,
+        make_addresses(rng, shipments),
+        [f"{cost:,}" for cost in (rng.integers(15, 80, shipments) * 1000).tolist()],
+    ]
+    return _workbook("퀵비용", columns, values)
+
+
+def make_member_ids(rows: int, seed: int = 0) -> bytes:
+    """Return CRM dataset 1: tirepick member ids in the second column."""
+
+    rng = np.random.default_rng(seed + 2)
+    members = rng.choice(max(rows * 2, 10), rows, replace=False)
+    values = [list(range(1, rows + 1)), [f"tirepick_{member}" for member in members.tolist()]]
+    return _workbook("회원", ["No", "user_id"], values)
+
+
+def make_consent_export(rows: int, seed: int = 0) -> bytes:
+    """Return CRM dataset 2: customers with push consent, e-mail and phone number."""
+
+    rng = np.random.default_rng(seed + 3)
+    phones = rng.integers(10_000_000, 99_999_999, rows)
+    values = [
+        np.arange(rows).astype(str).tolist(),
+        np.char.add("고객", np.arange(rows).astype(str)).tolist(),
+        rng.choice(["O", "X"], rows, p=[0.6, 0.4]).tolist(),
+        [f" User{i}@Example.com " if i % 7 == 0 else f"user{i}@example.com" for i in range(rows)],
+        # A mix of the formats that arrive: dashed, bare digits and numbers without the leading 0.
+        [f"010-{p // 10_000:04d}-{p % 10_000:04d}" if p % 3 == 0 else (f"010{p}" if p % 3 == 1 else f"10{p}")
+         for p in phones.tolist()],
+    ]
+    return _workbook("고객", ["고객id", "이름", "푸시수신동의", "이메일", "고객전화번호"], values)
+
+
+def make_trial_balance(rows: int, seed: int = 0) -> bytes:
+    """Return a trial balance with ``rows`` accounts, every mapped account among them."""
+
+    rng = np.random.default_rng(seed + 4)
+    # Every account the D2 mapping looks up, in mapping order.
+    accounts = list(dict.fromkeys(name for item in pl_converter.MAP_D2_TO_D1 for name in item["d1_lookup_names"]))
+    accounts += [f"기타계정{i}" for i in range(max(rows - len(accounts), 0))]
+    accounts = accounts[:rows]
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet("합계잔액시산표")
+    sheet.append(["합계잔액시산표"])
+    sheet.append(["기간: 2025/09/01 ~ 2025/09/30"])
+    sheet.append(["계정명", "금액"])
+    for account, amount in zip(accounts, rng.integers(0, 500_000_000, len(accounts)).tolist()):
+        sheet.append([account, amount])
+    sheet.append(["2025/10/01 오전 9:00:00"])
+    return _save(workbook)
+
+
+def make_ledger_export(rows: int, seed: int = 0) -> bytes:
+    """Return a PL Categorizer ledger; see ``bench_pl_categorizer.make_ledger``."""
+
+    return make_ledger(rows)
+
+
+def make_ibx_template(rows: int = 0, seed: int = 0) -> bytes:
+    """Return an IBX template with 'B2B' and 'B2C' sheets; ``rows`` is ignored."""
+
+    workbook = openpyxl.Workbook()
+    workbook.remove(workbook.active)
+    layouts = [
+        ("B2B", ibx_automation.TIRE_OUTPUT_START_ROW_B2B, ibx_automation.OTHER_CATEGORY_ROW_MAPPING_B2B),
+        ("B2C", ibx_automation.TIRE_OUTPUT_START_ROW_B2C, ibx_automation.OTHER_CATEGORY_ROW_MAPPING_B2C),
+    ]
+    for name, start_row, other_rows in layouts:
+        sheet = workbook.create_sheet(name)
+        sheet["D2"] = "브랜드"
+        for offset, brand in enumerate(ibx_automation.TIRE_BRANDS_B2B[:11]):
+            sheet[f"D{start_row + offset}"] = brand
+        for category, row in other_rows.items():
+            sheet[f"D{row}"] = category
+    return _save(workbook)
+
+
+def make_addresses(rng: np.random.Generator, rows: int) -> list:
+    """Delivery addresses drawn from a few thousand distinct ones, some missing."""
+
+    distinct = []
+    for province, districts in PROVINCES.items():
+        for district in districts:
+            for road in ROADS:
+                distinct += [f"[{rng.integers(10000, 99999)}] {province} {district} {road} {n}" for n in range(1, 40, 3)]
+    distinct.append(None)
+    return [distinct[i] for i in rng.integers(0, len(distinct), rows).tolist()]
+
+
+KINDS = {
+    "order": make_order_export,
+    "admin": make_admin_export,
+    "logistics": make_logistics_export,
+    "member_ids": make_member_ids,
+    "consent": make_consent_export,
+    "trial_balance": make_trial_balance,
+    "ledger": make_ledger_export,
+    "ibx_template": make_ibx_template,
+}
+
+
+def generate(kind: str, rows: int, seed: int = 0) -> bytes:
+    """Return the bytes of a synthetic ``kind`` workbook with ``rows`` rows."""
+
+    if kind not in KINDS:
+        raise ValueError(f"Unknown export kind '{kind}'. Choose one of: {', '.join(KINDS)}")
+    return KINDS[kind](rows, seed)
+
+
+def export_path(kind: str, rows: int, seed: int = 0, directory: str = DATA_DIR) -> str:
+    """Return the path of the ``kind`` workbook, generating it on first use."""
+
+    path = os.path.join(directory, f"{kind}-{rows}-{seed}.xlsx")
+    if not os.path.exists(path):
+        os.makedirs(directory, exist_ok=True)
+        data = generate(kind, rows, seed)
+        with open(f"{path}.tmp", "wb") as f:
+            f.write(data)
+        os.replace(f"{path}.tmp", path)
+    return path
+
+
+def _workbook(title: str, header: list, columns: list) -> bytes:
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet(title)
+    sheet.append(header)
+    for row in zip(*columns):
+        sheet.append(row)
+    return _save(workbook)
+
+
+def _save(workbook) -> bytes:
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    return buffer.getvalue()
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Write synthetic uploads to benchmarks/data.")
+    parser.add_argument("--rows", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--kinds", nargs="+", choices=list(KINDS), default=list(KINDS))
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    for rows in args.rows:
+        for kind in args.kinds:
+            print(export_path(kind, rows, args.seed))
+
+
+if __name__ == "__main__":
+    main()
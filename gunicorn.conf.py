@@ -0,0 +1,40 @@
+"""gunicorn settings of the production server (see wsgi.py).
+
+Every web worker owns a job pool of ``AUTOWORLD_JOB_WORKERS`` processes, so
+keep ``AUTOWORLD_WEB_WORKERS`` low and let the threads of each worker serve
+the (short) web requests; the program runs themselves happen in the pools.
+"""
+
+import os
+import time
+
+bind = os.environ.get("AUTOWORLD_BIND", "0.0.0.0:8000")
+workers = int(os.environ.get("AUTOWORLD_WEB_WORKERS", 2))
+worker_class = "gthread"
+threads = int(os.environ.get("AUTOWORLD_WEB_THREADS", 8))
+# Import wsgi.py (pandas, openpyxl, every script) once in the master, then fork.
+preload_app = True
+# Large uploads are spooled to disk inside the request.
+timeout = int(os.environ.get("AUTOWORLD_WEB_TIMEOUT", 300))
+graceful_timeout = timeout
+
+
+def when_ready(server):
+    import wsgi
+
+    server.log.info("Loaded the app and %d modules in %.2fs", len(wsgi.PRELOAD_SECONDS), wsgi.STARTUP_SECONDS)
+
+
+def post_worker_init(worker):
+    # Start the job pool after the fork: its threads and pipes must not be shared between workers.
+    import jobs
+
+    start = time.perf_counter()
+    jobs.warm_up()
+    worker.log.info("Job pool of %d workers ready in %.2fs", jobs.MAX_WORKERS, time.perf_counter() - start)
+
+
+def worker_exit(server, worker):
+    import jobs
+
+    jobs.shutdown()
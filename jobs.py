@@ -0,0 +1,602 @@
+"""Background job queue for program runs.
+
+Program runs are CPU-bound pandas/openpyxl work, so running them inside the
+request thread blocks every other user. :func:`submit` spools the uploaded
+files to disk, hands the run to a bounded process pool and returns a job id
+straight away. The job state lives in ``JOB_DIR/<job_id>/status.json`` and
+the finished output next to it, so any web process can answer status and
+download requests.
+
+:func:`submit_batch` runs one program over many files (or the members of
+a zip archive) in parallel and packs the outputs into a single zip with a
+per-file manifest.
+
+Every run is measured (phase durations, rows, sizes, peak memory) and
+appended to the run log of :mod:`metrics`.
+
+The pool starts on the first job unless :func:`warm_up` starts it earlier;
+the production entry point (``wsgi.py``) does that in every web worker so
+no request waits for the fork server or for the imports of the scripts.
+"""
+
+from __future__ import annotations
+
+import csv
+import importlib
+import io
+import json
+import multiprocessing
+import os
+import pkgutil
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import traceback
+import uuid
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+
+import metrics
+from scripts import phase_timer
+
+JOB_DIR = os.environ.get(
+    "AUTOWORLD_JOB_DIR", os.path.join(tempfile.gettempdir(), "autoworld_jobs")
+)
+MAX_WORKERS = int(os.environ.get("AUTOWORLD_JOB_WORKERS", os.cpu_count() or 2))
+MAX_PENDING_JOBS = int(os.environ.get("AUTOWORLD_MAX_PENDING_JOBS", MAX_WORKERS * 4))
+JOB_TTL_SECONDS = int(os.environ.get("AUTOWORLD_JOB_TTL_SECONDS", 60 * 60))
+# Copy size when moving an upload into the job directory; uploads are never read whole.
+SPOOL_BUFFER_BYTES = 1024 * 1024
+
+SCRIPTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "scripts")
+# Imported once by the fork server so each worker starts with them loaded:
+# the libraries and every script module a job can import.
+PRELOAD_MODULES = ["pandas", "openpyxl"] + sorted(
+    f"scripts.{module.name}" for module in pkgutil.iter_modules([SCRIPTS_DIR])
+)
+
+RESULT_FILE = "result"
+RESULT_FRAME = f"{RESULT_FILE}.pkl"
+MANIFEST_NAME = "manifest.csv"
+ZIP_MIMETYPE = "application/zip"
+XLSX_MIMETYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+_pool = None
+_warm = False
+_pool_lock = threading.Lock()
+_status_lock = threading.Lock()
+_active = set()
+
+
+class QueueFullError(RuntimeError):
+    """Raised when too many jobs are already queued or running."""
+
+
+class Upload:
+    """Picklable reference to an uploaded file spooled to disk."""
+
+    def __init__(self, path: str, filename: str):
+        self.path = path
+        self.filename = filename
+
+    def open(self):
+        """Open the spooled file, exposing ``filename`` like a FileStorage."""
+
+        stream = open(self.path, "rb")
+        stream.filename = self.filename
+        return stream
+
+
+def submit(module_name: str, func_name: str, *args, download_name: str | None = None,
+           meta: dict | None = None) -> str:
+    """Queue ``scripts.<module_name>.<func_name>(*args)`` and return a job id.
+
+    Uploaded files (anything with ``save`` and ``filename``) among ``args``
+    are written to the job directory and reopened inside the worker.
+    """
+
+    prune()
+    slot = _reserve(object())
+    try:
+        job_id = uuid.uuid4().hex
+        job_dir = os.path.join(JOB_DIR, job_id)
+        os.makedirs(job_dir)
+        args = [_spool(job_dir, i, arg) for i, arg in enumerate(args)]
+        _write_status(job_dir, {
+            "id": job_id,
+            "program": module_name,
+            "state": "queued",
+            "download_name": download_name,
+            "meta": meta or {},
+            "created": time.time(),
+        })
+        future = _submit(_run, job_dir, module_name, func_name, args)
+    except BaseException:
+        _release(slot)
+        raise
+    future.add_done_callback(partial(_finish, job_dir, slot))
+    return job_id
+
+
+def submit_batch(module_name: str, func_name: str, uploads: list,
+                 download_name: str | None = None, combine: str | None = None) -> str:
+    """Queue ``scripts.<module_name>.<func_name>(file)`` for every uploaded file.
+
+    ``.zip`` uploads are expanded and each member is processed as its own
+    file. The runs are spread over the worker pool; once all of them have
+    finished the outputs and a ``manifest.csv`` are packed into one zip.
+
+    With ``combine``, the per-file results are instead passed to
+    ``scripts.<module_name>.<combine>(names, results)`` in one more worker
+    run, whose output becomes the job result. Every file must succeed.
+    """
+
+    prune()
+    batch = _reserve(_Batch(0))
+    try:
+        job_id = uuid.uuid4().hex
+        job_dir = os.path.join(JOB_DIR, job_id)
+        os.makedirs(job_dir)
+        inputs = []
+        for upload in uploads:
+            if upload.filename.lower().endswith(".zip"):
+                inputs.extend(_spool_zip(job_dir, upload, start=len(inputs)))
+            else:
+                inputs.append(_spool(job_dir, len(inputs), upload))
+        if not inputs:
+            shutil.rmtree(job_dir, ignore_errors=True)
+            raise ValueError("No files to process were found in the upload.")
+
+        _write_status(job_dir, {
+            "id": job_id,
+            "program": module_name,
+            "state": "running",
+            "download_name": download_name,
+            "mimetype": XLSX_MIMETYPE if combine else ZIP_MIMETYPE,
+            "meta": {},
+            "combine": combine,
+            "created": time.time(),
+            "files": [{"name": upload.filename, "state": "queued"} for upload in inputs],
+        })
+        batch.remaining = len(inputs)
+        futures = [_submit(_run_item, job_dir, module_name, func_name, [upload], index)
+                   for index, upload in enumerate(inputs)]
+    except BaseException:
+        _release(batch)
+        raise
+    for index, future in enumerate(futures):
+        future.add_done_callback(partial(_finish_item, job_dir, index, batch))
+    return job_id
+
+
+def status(job_id: str) -> dict | None:
+    """Return the status record of a job, or ``None`` if it is unknown."""
+
+    job_dir = _job_dir(job_id)
+    if job_dir is None:
+        return None
+    try:
+        with open(os.path.join(job_dir, "status.json"), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def result_path(job_id: str) -> str | None:
+    """Return the path of a finished job's output file."""
+
+    job = status(job_id)
+    if not job or job["state"] != "done":
+        return None
+    name = RESULT_FRAME if job.get("kind") == "frame" else RESULT_FILE
+    return os.path.join(_job_dir(job_id), name)
+
+
+def load_frame(job_id: str):
+    """Return the DataFrame produced by a finished job."""
+
+    import pandas as pd
+
+    return pd.read_pickle(result_path(job_id))
+
+
+def prune(ttl: int | None = None) -> None:
+    """Delete job directories not touched for ``ttl`` seconds."""
+
+    ttl = JOB_TTL_SECONDS if ttl is None else ttl
+    cutoff = time.time() - ttl
+    try:
+        entries = list(os.scandir(JOB_DIR))
+    except OSError:
+        return
+    for entry in entries:
+        try:
+            if entry.is_dir() and entry.stat().st_mtime < cutoff:
+                shutil.rmtree(entry.path, ignore_errors=True)
+        except OSError:
+            continue
+
+
+def preload() -> dict:
+    """Import ``PRELOAD_MODULES`` into this process; returns the seconds each import took."""
+
+    seconds = {}
+    for name in PRELOAD_MODULES:
+        start = time.perf_counter()
+        importlib.import_module(name)
+        seconds[name] = time.perf_counter() - start
+    return seconds
+
+
+def warm_up() -> None:
+    """Start the worker pool and all of its workers now instead of on the first job.
+
+    Blocks until every worker has answered, so afterwards a job only waits
+    for a free worker, never for the fork server or its imports.
+    """
+
+    global _warm
+    for future in [_submit(os.getpid) for _ in range(MAX_WORKERS)]:
+        future.result()
+    _warm = True
+
+
+def readiness() -> dict:
+    """Whether this process can take jobs without start-up delays, and why not."""
+
+    missing = [name for name in PRELOAD_MODULES if name not in sys.modules]
+    try:
+        os.makedirs(JOB_DIR, exist_ok=True)
+        job_dir_writable = os.access(JOB_DIR, os.W_OK)
+    except OSError:
+        job_dir_writable = False
+    return {
+        "ready": not missing and _warm and job_dir_writable,
+        "modules_missing": missing,
+        "pool_started": _warm,
+        "workers": MAX_WORKERS,
+        "job_dir_writable": job_dir_writable,
+    }
+
+
+def shutdown() -> None:
+    """Stop the worker pool, waiting for running jobs."""
+
+    global _pool, _warm
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=True)
+            _pool = None
+            _warm = False
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            methods = multiprocessing.get_all_start_methods()
+            if "forkserver" in methods:
+                ctx = multiprocessing.get_context("forkserver")
+                ctx.set_forkserver_preload(PRELOAD_MODULES)
+            else:
+                ctx = multiprocessing.get_context("spawn")
+            _pool = ProcessPoolExecutor(max_workers=MAX_WORKERS, mp_context=ctx)
+        return _pool
+
+
+def _submit(fn, *args):
+    """Submit ``fn(*args)`` to the pool, replacing the pool if a dead worker broke it."""
+
+    pool = _get_pool()
+    try:
+        future = pool.submit(fn, *args)
+    except BrokenProcessPool:
+        _discard_pool(pool)
+        pool = _get_pool()
+        future = pool.submit(fn, *args)
+    future.add_done_callback(partial(_check_pool, pool))
+    return future
+
+
+def _check_pool(pool: ProcessPoolExecutor, future) -> None:
+    # A worker that died (killed for memory, crashed) breaks the whole pool;
+    # drop it as soon as one of its runs reports that, not on the next submit.
+    if not future.cancelled() and isinstance(future.exception(), BrokenProcessPool):
+        _discard_pool(pool)
+
+
+def _discard_pool(pool: ProcessPoolExecutor) -> None:
+    """Forget ``pool`` if it is still the current one; the next submit starts a new pool."""
+
+    global _pool, _warm
+    with _pool_lock:
+        if _pool is not pool:
+            return
+        _pool = None
+        rewarm, _warm = _warm, False
+    pool.shutdown(wait=False, cancel_futures=True)
+    if rewarm:
+        # Not ready until the replacement pool is up again; start it now rather than on the next job.
+        threading.Thread(target=warm_up, daemon=True).start()
+
+
+def _reserve(slot):
+    """Count ``slot`` against ``MAX_PENDING_JOBS``, or raise QueueFullError if the queue is full."""
+
+    with _pool_lock:
+        if len(_active) >= MAX_PENDING_JOBS:
+            raise QueueFullError("The server is busy processing other files. Please try again shortly.")
+        _active.add(slot)
+    return slot
+
+
+def _release(slot) -> None:
+    with _pool_lock:
+        _active.discard(slot)
+
+
+def _run(job_dir: str, module_name: str, func_name: str, args: list) -> dict:
+    """Worker entry point: run the program and store its output."""
+
+    started = time.time()
+    _update_status(job_dir, state="running", started=started)
+    queued = started - _read_status(job_dir)["created"]
+    return _execute(job_dir, module_name, func_name, args, RESULT_FILE, queued=queued)
+
+
+def _run_item(job_dir: str, module_name: str, func_name: str, args: list, index: int) -> dict:
+    """Worker entry point for one file of a batch."""
+
+    queued = time.time() - _read_status(job_dir)["created"]
+    return _execute(job_dir, module_name, func_name, args, f"{RESULT_FILE}_{index}", queued=queued)
+
+
+def _run_combine(job_dir: str, module_name: str, func_name: str, names: list) -> dict:
+    """Worker entry point: merge the per-file results of a batch.
+
+    DataFrame results are loaded back; file results are passed as paths.
+    """
+
+    import pandas as pd
+
+    results = []
+    for index in range(len(names)):
+        path = os.path.join(job_dir, f"{RESULT_FILE}_{index}")
+        results.append(pd.read_pickle(f"{path}.pkl") if os.path.exists(f"{path}.pkl") else path)
+    return _execute(job_dir, module_name, func_name, [names, results], RESULT_FILE)
+
+
+def _execute(job_dir: str, module_name: str, func_name: str, args: list, output_name: str,
+             queued: float | None = None) -> dict:
+    """Run the program, store its output and append the run to the metrics log."""
+
+    record = {
+        "job": os.path.basename(job_dir),
+        "program": module_name,
+        "function": func_name,
+        "queued_seconds": round(queued, 3) if queued is not None else None,
+        "upload_bytes": sum(os.path.getsize(arg.path) for arg in args if isinstance(arg, Upload)),
+    }
+    metrics.reset_peak_memory()
+    start = time.perf_counter()
+    with phase_timer.collect() as run:
+        try:
+            info = _run_program(job_dir, module_name, func_name, args, output_name)
+        except Exception as e:
+            record.update(status="error", error=f"{type(e).__name__}: {e}", traceback=traceback.format_exc())
+            raise
+        else:
+            record.update(status="ok", output_bytes=info["size"])
+        finally:
+            total = time.perf_counter() - start
+            parse, serialize = run.seconds.get("parse", 0.0), run.seconds.get("serialize", 0.0)
+            seconds = {"parse": parse, "compute": max(total - parse - serialize, 0.0),
+                       "serialize": serialize, "total": total}
+            record.update(seconds={name: round(value, 4) for name, value in seconds.items()},
+                          rows=run.rows, peak_memory_bytes=metrics.peak_memory_bytes())
+            metrics.append(record)
+    return info
+
+
+def _run_program(job_dir: str, module_name: str, func_name: str, args: list, output_name: str) -> dict:
+    streams = []
+    call_args = []
+    for arg in args:
+        if isinstance(arg, Upload):
+            arg = arg.open()
+            streams.append(arg)
+        call_args.append(arg)
+
+    try:
+        module = importlib.import_module(f"scripts.{module_name}")
+        result = getattr(module, func_name)(*call_args)
+    finally:
+        for stream in streams:
+            stream.close()
+
+    if result is None:
+        raise ValueError(
+            f"The '{module_name}' script ran but did not produce an output file. This might "
+            "happen if the input data was empty or did not meet the script's criteria."
+        )
+    with phase_timer.phase("serialize"):
+        if hasattr(result, "to_pickle"):
+            # RESULT_FRAME for a plain job, result_<i>.pkl for a batch item.
+            path = os.path.join(job_dir, f"{output_name}.pkl")
+            result.to_pickle(path)
+            return {"kind": "frame", "size": os.path.getsize(path)}
+
+        with open(os.path.join(job_dir, output_name), "wb") as f:
+            shutil.copyfileobj(result, f)
+            size = f.tell()
+        return {"kind": "file", "size": size}
+
+
+def _finish(job_dir: str, slot, future) -> None:
+    _release(slot)
+    try:
+        info = future.result()
+    except Exception as e:
+        _update_status(job_dir, state="error", error=str(e), finished=time.time())
+    else:
+        _update_status(job_dir, state="done", finished=time.time(), **info)
+
+
+class _Batch:
+    """Counts the outstanding runs of a batch job."""
+
+    def __init__(self, remaining: int):
+        self.remaining = remaining
+        self.lock = threading.Lock()
+
+    def finish_one(self) -> bool:
+        """Mark one run as finished; return True when it was the last."""
+
+        with self.lock:
+            self.remaining -= 1
+            return self.remaining == 0
+
+
+def _finish_item(job_dir: str, index: int, batch: _Batch, future) -> None:
+    try:
+        future.result()
+    except Exception as e:
+        item = {"state": "error", "error": str(e)}
+    else:
+        item = {"state": "done"}
+
+    with _status_lock:
+        record = _read_status(job_dir)
+        record["files"][index].update(item)
+        _write_status(job_dir, record)
+
+    if batch.finish_one():
+        _release(batch)
+        if record.get("combine"):
+            _submit_combine(job_dir, record)
+            return
+        try:
+            size = _pack_batch(job_dir, record)
+        except Exception as e:
+            _update_status(job_dir, state="error", error=str(e), finished=time.time())
+        else:
+            _update_status(job_dir, state="done", kind="file", size=size, finished=time.time())
+
+
+def _submit_combine(job_dir: str, record: dict) -> None:
+    failed = [item["name"] for item in record["files"] if item["state"] != "done"]
+    if failed:
+        _update_status(job_dir, state="error", finished=time.time(),
+                       error=f"{len(failed)} file(s) could not be processed: {', '.join(failed)}")
+        return
+    slot = object()
+    with _pool_lock:
+        _active.add(slot)  # the batch's own slot was just released; this run is not refused
+    try:
+        future = _submit(_run_combine, job_dir, record["program"], record["combine"],
+                         [item["name"] for item in record["files"]])
+    except Exception as e:
+        _release(slot)
+        _update_status(job_dir, state="error", error=str(e), finished=time.time())
+        return
+    future.add_done_callback(partial(_finish, job_dir, slot))
+
+
+def _pack_batch(job_dir: str, record: dict) -> int:
+    """Zip the outputs of a finished batch together with a manifest."""
+
+    program = record["program"]
+    manifest = io.StringIO()
+    writer = csv.writer(manifest)
+    writer.writerow(["file", "status", "output", "error"])
+
+    used_names = set()
+    result_path = os.path.join(job_dir, RESULT_FILE)
+    with zipfile.ZipFile(result_path, "w", zipfile.ZIP_DEFLATED) as archive:
+        for index, item in enumerate(record["files"]):
+            if item["state"] != "done":
+                writer.writerow([item["name"], "error", "", item.get("error", "")])
+                continue
+            output_name = f"processed_{program}_{os.path.basename(item['name'])}"
+            if output_name in used_names:
+                output_name = f"{index + 1}_{output_name}"
+            used_names.add(output_name)
+            archive.write(os.path.join(job_dir, f"{RESULT_FILE}_{index}"), output_name)
+            writer.writerow([item["name"], "success", output_name, ""])
+        # utf-8-sig so Excel shows Korean file names correctly.
+        archive.writestr(MANIFEST_NAME, manifest.getvalue().encode("utf-8-sig"))
+    return os.path.getsize(result_path)
+
+
+def _spool(job_dir: str, index: int, arg):
+    if not (hasattr(arg, "save") and hasattr(arg, "filename")):
+        return arg
+    path = os.path.join(job_dir, f"input_{index}")
+    arg.save(path, buffer_size=SPOOL_BUFFER_BYTES)
+    return Upload(path, arg.filename)
+
+
+def _spool_zip(job_dir: str, upload, start: int) -> list:
+    """Extract the files of an uploaded zip archive into the job directory."""
+
+    archive_path = os.path.join(job_dir, f"archive_{start}.zip")
+    upload.save(archive_path, buffer_size=SPOOL_BUFFER_BYTES)
+    spooled = []
+    try:
+        with zipfile.ZipFile(archive_path) as archive:
+            for info in archive.infolist():
+                name = _zip_member_name(info)
+                base = os.path.basename(name)
+                if info.is_dir() or name.startswith("__MACOSX/") or not base or base.startswith((".", "~$")):
+                    continue
+                path = os.path.join(job_dir, f"input_{start + len(spooled)}")
+                with archive.open(info) as src, open(path, "wb") as dst:
+                    shutil.copyfileobj(src, dst)
+                spooled.append(Upload(path, base))
+    except zipfile.BadZipFile:
+        raise ValueError(f"'{upload.filename}' is not a valid zip archive.")
+    finally:
+        os.remove(archive_path)
+    return spooled
+
+
+def _zip_member_name(info: zipfile.ZipInfo) -> str:
+    # Archives made by Windows Explorer store Korean names as cp949 without
+    # the UTF-8 flag, which zipfile decodes as cp437.
+    if info.flag_bits & 0x800:
+        return info.filename
+    try:
+        return info.filename.encode("cp437").decode("cp949")
+    except (UnicodeEncodeError, UnicodeDecodeError):
+        return info.filename
+
+
+def _job_dir(job_id: str) -> str | None:
+    # Job ids are uuid4 hex strings; anything else could escape JOB_DIR.
+    if len(job_id) != 32 or not all(c in "0123456789abcdef" for c in job_id):
+        return None
+    return os.path.join(JOB_DIR, job_id)
+
+
+def _write_status(job_dir: str, record: dict) -> None:
+    path = os.path.join(job_dir, "status.json")
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(record, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def _read_status(job_dir: str) -> dict:
+    with open(os.path.join(job_dir, "status.json"), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _update_status(job_dir: str, **changes) -> None:
+    with _status_lock:
+        record = _read_status(job_dir)
+        record.update(changes)
+        _write_status(job_dir, record)
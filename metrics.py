@@ -0,0 +1,215 @@
+"""Run metrics of the program jobs.
+
+Every program run in a job worker appends one JSON line to ``LOG_PATH``::
+
+    {"time": "...", "job": "<job id>", "program": "margin_by_tire", "function": "process_file",
+     "status": "ok" | "error", "error": "...", "traceback": "...", "queued_seconds": 0.2,
+     "seconds": {"parse": 4.1, "compute": 0.6, "serialize": 1.3, "total": 6.0},
+     "rows": 120000, "upload_bytes": 9830400, "output_bytes": 41230, "peak_memory_bytes": 812000000}
+
+``parse`` and ``serialize`` are the time spent in the shared readers and
+writers (see :mod:`scripts.phase_timer`), ``serialize`` also covers storing
+the result in the job directory, and ``compute`` is the rest of the run.
+``rows`` counts the input rows loaded. ``peak_memory_bytes`` is the peak
+resident size of the worker during the run on Linux, where the peak can be
+reset per run, and the worker's lifetime peak elsewhere.
+
+The log is the single source of the ``/metrics`` endpoint: :func:`render`
+turns it into Prometheus text (a run counter plus histograms), reading only
+the lines appended since the previous scrape. Every web process reads the
+same file, so all of them report the runs of every worker.
+"""
+
+from __future__ import annotations
+
+import bisect
+import datetime
+import json
+import os
+import sys
+import threading
+
+LOG_PATH = os.environ.get(
+    "AUTOWORLD_METRICS_LOG",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "run_metrics.jsonl"),
+)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+DURATION_BUCKETS = [0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600]
+BYTE_BUCKETS = [2 ** n for n in range(16, 32, 2)]  # 64 KiB .. 1 GiB
+MEMORY_BUCKETS = [2 ** n for n in range(26, 34)]  # 64 MiB .. 8 GiB
+ROW_BUCKETS = [1_000, 10_000, 100_000, 1_000_000, 10_000_000]
+
+# Histogram name -> (record field, help text, buckets). Durations are handled per phase.
+HISTOGRAMS = {
+    "autoworld_run_queue_seconds": ("queued_seconds", "Time a run waited for a free worker.", DURATION_BUCKETS),
+    "autoworld_run_upload_bytes": ("upload_bytes", "Size of the uploaded input files of a run.", BYTE_BUCKETS),
+    "autoworld_run_output_bytes": ("output_bytes", "Size of the output of a run.", BYTE_BUCKETS),
+    "autoworld_run_input_rows": ("rows", "Input rows loaded by a run.", ROW_BUCKETS),
+    "autoworld_run_peak_memory_bytes": ("peak_memory_bytes", "Peak resident memory of the worker during a run.",
+                                        MEMORY_BUCKETS),
+}
+DURATION_HISTOGRAM = "autoworld_run_duration_seconds"
+RUNS_COUNTER = "autoworld_runs_total"
+
+
+def append(record: dict, path: str | None = None) -> None:
+    """Append ``record`` as one JSON line; the log never fails a run."""
+
+    path = path or LOG_PATH
+    line = json.dumps({"time": datetime.datetime.now().isoformat(timespec="seconds"), **record},
+                      ensure_ascii=False, default=str) + "\n"
+    try:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        # One write() of the whole line in append mode, so concurrent workers never interleave.
+        fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, line.encode("utf-8"))
+        finally:
+            os.close(fd)
+    except OSError:
+        pass
+
+
+def reset_peak_memory() -> None:
+    """Start a new peak-memory measurement for this process (Linux only)."""
+
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def peak_memory_bytes() -> int | None:
+    """Peak resident memory since :func:`reset_peak_memory`, or of the process lifetime."""
+
+    try:
+        with open("/proc/self/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class Histogram:
+    """Cumulative histogram in the Prometheus layout."""
+
+    def __init__(self, buckets: list):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # the last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def lines(self, name: str, labels: dict) -> list:
+        lines = []
+        cumulative = 0
+        for bound, count in zip([*self.buckets, "+Inf"], self.counts):
+            cumulative += count
+            lines.append(f"{name}_bucket{_labels({**labels, 'le': bound})} {cumulative}")
+        lines.append(f"{name}_sum{_labels(labels)} {float(self.sum)!r}")
+        lines.append(f"{name}_count{_labels(labels)} {self.count}")
+        return lines
+
+
+class RunLog:
+    """Aggregates of the run log, updated from the lines appended since the last read.
+
+    A log that shrank or was replaced (rotation) is read again from the
+    start; Prometheus treats the drop as a counter reset.
+    """
+
+    def __init__(self, path: str | None = None):
+        self.path = path or LOG_PATH
+        self.lock = threading.Lock()
+        self._reset(None)
+
+    def _reset(self, inode) -> None:
+        self.inode = inode
+        self.offset = 0
+        self.runs = {}
+        self.histograms = {name: {} for name in [DURATION_HISTOGRAM, *HISTOGRAMS]}
+
+    def refresh(self) -> None:
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return
+        if stat.st_ino != self.inode or stat.st_size < self.offset:
+            self._reset(stat.st_ino)
+        with open(self.path, "rb") as f:
+            f.seek(self.offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # still being written; read it on the next scrape
+                self.offset += len(line)
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                self.add(record)
+
+    def add(self, record: dict) -> None:
+        program = str(record.get("program", "unknown"))
+        run_key = (program, str(record.get("function", "")), str(record.get("status", "ok")))
+        self.runs[run_key] = self.runs.get(run_key, 0) + 1
+        for phase_name, seconds in (record.get("seconds") or {}).items():
+            self._observe(DURATION_HISTOGRAM, (program, phase_name), seconds, DURATION_BUCKETS)
+        for name, (field, _, buckets) in HISTOGRAMS.items():
+            self._observe(name, (program,), record.get(field), buckets)
+
+    def _observe(self, name: str, key: tuple, value, buckets: list) -> None:
+        if isinstance(value, (int, float)):
+            series = self.histograms[name]
+            if key not in series:
+                series[key] = Histogram(buckets)
+            series[key].observe(value)
+
+    def render(self) -> str:
+        """Prometheus text exposition of the aggregates."""
+
+        with self.lock:
+            self.refresh()
+            lines = [f"# HELP {RUNS_COUNTER} Program runs by program, function and outcome.",
+                     f"# TYPE {RUNS_COUNTER} counter"]
+            for (program, function, status), count in sorted(self.runs.items()):
+                lines.append(f"{RUNS_COUNTER}{_labels({'program': program, 'function': function, 'status': status})} {count}")
+
+            lines += [f"# HELP {DURATION_HISTOGRAM} Wall time of program runs by phase.",
+                      f"# TYPE {DURATION_HISTOGRAM} histogram"]
+            for (program, phase_name), histogram in sorted(self.histograms[DURATION_HISTOGRAM].items()):
+                lines += histogram.lines(DURATION_HISTOGRAM, {"program": program, "phase": phase_name})
+
+            for name, (_, help_text, _) in HISTOGRAMS.items():
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+                for (program,), histogram in sorted(self.histograms[name].items()):
+                    lines += histogram.lines(name, {"program": program})
+            return "\n".join(lines) + "\n"
+
+
+_run_log = RunLog()
+
+
+def render() -> str:
+    """Render ``LOG_PATH`` for the ``/metrics`` endpoint."""
+
+    return _run_log.render()
+
+
+def _labels(labels: dict) -> str:
+    def escape(value) -> str:
+        return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+    return "{" + ",".join(f'{key}="{escape(value)}"' for key, value in labels.items()) + "}"
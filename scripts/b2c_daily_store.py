@@ -0,0 +1,173 @@
+"""Persistent per-day aggregates for the B2C weekly report.
+
+``b2c_weekly_p`` is rerun every morning on a month-to-date export that has
+grown by one day. Instead of re-aggregating the whole history each time, the
+per-day totals (by segment and group key, e.g. tire sales by channel) and the
+distinct keys needed for unique counts (customers, order numbers) are kept in
+a small SQLite database. Only days that are new, or whose rows changed since
+they were stored (the last day of yesterday's export is usually partial),
+are aggregated again.
+
+Each stored day carries a digest of its rows, so a corrected re-export
+replaces the affected days automatically. ``STORE_VERSION`` is part of the
+digest and must be bumped whenever the aggregation itself changes.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import datetime
+import os
+import sqlite3
+
+import pandas as pd
+
+STORE_PATH = os.environ.get(
+    "AUTOWORLD_B2C_STORE",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "b2c_daily.sqlite3"),
+)
+STORE_VERSION = 2
+
+# Value columns of the daily totals: report name -> column name in SQLite.
+VALUE_COLUMNS = {"주문수량": "quantity", "상품주문금액": "order_amount", "장착비": "install_fee", "실결제금액": "paid_amount"}
+
+# Stay below SQLite's default limit on bound parameters per statement.
+_BATCH = 500
+
+_SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS days (
+        day         TEXT PRIMARY KEY,
+        digest      TEXT NOT NULL,
+        ingested_at TEXT NOT NULL
+    )""",
+    f"""CREATE TABLE IF NOT EXISTS daily_totals (
+        day       TEXT NOT NULL,
+        segment   TEXT NOT NULL,
+        group_key TEXT,
+        {", ".join(f"{name} REAL NOT NULL" for name in VALUE_COLUMNS.values())}
+    )""",
+    """CREATE TABLE IF NOT EXISTS daily_keys (
+        day       TEXT NOT NULL,
+        segment   TEXT NOT NULL,
+        group_key TEXT,
+        key       TEXT NOT NULL
+    )""",
+    "CREATE INDEX IF NOT EXISTS daily_totals_day ON daily_totals (day)",
+    "CREATE INDEX IF NOT EXISTS daily_keys_day ON daily_keys (day)",
+]
+
+
+@contextlib.contextmanager
+def connect(path: str | None = None):
+    """Open the store, creating it on first use; commits on success."""
+
+    path = path or STORE_PATH
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30)
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+        for statement in _SCHEMA:
+            conn.execute(statement)
+        with conn:
+            yield conn
+    finally:
+        conn.close()
+
+
+def day_digests(df: pd.DataFrame, day_col: str) -> pd.Series:
+    """Return an order-independent digest of the rows of every day, indexed by day."""
+
+    row_hashes = pd.util.hash_pandas_object(df.drop(columns=[day_col]), index=False)
+    grouped = row_hashes.groupby(df[day_col].to_numpy())
+    sums, counts = grouped.sum(), grouped.size()
+    return pd.Series(
+        [f"v{STORE_VERSION}:{count}:{total}" for total, count in zip(sums.to_numpy(), counts.to_numpy())],
+        index=sums.index,
+    )
+
+
+def sync(df: pd.DataFrame, day_col: str, aggregate, path: str | None = None):
+    """Bring the store up to date with ``df`` and return the aggregates of its days.
+
+    Parameters
+    ----------
+    df: pandas.DataFrame
+        Cleaned export rows; ``day_col`` holds the order date (datetime).
+    day_col: str
+        Name of the date column.
+    aggregate: callable
+        ``aggregate(rows) -> (totals, keys)`` for the rows of the days that
+        need (re-)ingesting. ``totals`` has ``day_col``, ``segment``,
+        ``group_key`` and the ``VALUE_COLUMNS``; ``keys`` has ``day_col``,
+        ``segment``, ``group_key`` and ``key``.
+
+    Returns
+    -------
+    tuple[pandas.DataFrame, pandas.DataFrame]
+        ``(totals, keys)`` for exactly the days present in ``df``.
+
+    The digest check, the replacement of stale days and the read-back run in
+    one ``BEGIN IMMEDIATE`` transaction, so a concurrent upload of the same
+    days can neither slip in between nor leave the result mixing two uploads.
+    """
+
+    digests = day_digests(df, day_col)
+    day_labels = pd.Index(digests.index).strftime("%Y-%m-%d")
+    wanted = dict(zip(day_labels, digests.to_numpy()))
+
+    with connect(path) as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        stored = dict(_select_days(conn, "SELECT day, digest FROM days", list(wanted)))
+        stale = [day for day, digest in wanted.items() if stored.get(day) != digest]
+        if stale:
+            stale_dates = pd.to_datetime(stale)
+            totals, keys = aggregate(df[df[day_col].isin(stale_dates)])
+            _replace_days(conn, stale, {day: wanted[day] for day in stale}, totals, keys, day_col)
+
+        totals = pd.DataFrame(
+            _select_days(conn, f"SELECT day, segment, group_key, {', '.join(VALUE_COLUMNS.values())} "
+                               "FROM daily_totals", list(wanted)),
+            columns=[day_col, "segment", "group_key", *VALUE_COLUMNS],
+        )
+        keys = pd.DataFrame(
+            _select_days(conn, "SELECT day, segment, group_key, key FROM daily_keys", list(wanted)),
+            columns=[day_col, "segment", "group_key", "key"],
+        )
+
+    for frame in (totals, keys):
+        frame[day_col] = pd.to_datetime(frame[day_col], format="%Y-%m-%d")
+    return totals, keys
+
+
+def _select_days(conn, query: str, days: list) -> list:
+    rows = []
+    for start in range(0, len(days), _BATCH):
+        batch = days[start:start + _BATCH]
+        rows.extend(conn.execute(f"{query} WHERE day IN ({','.join('?' * len(batch))})", batch))
+    return rows
+
+
+def _replace_days(conn, days: list, digests: dict, totals: pd.DataFrame, keys: pd.DataFrame, day_col: str) -> None:
+    for table in ("daily_totals", "daily_keys", "days"):
+        for start in range(0, len(days), _BATCH):
+            batch = days[start:start + _BATCH]
+            conn.execute(f"DELETE FROM {table} WHERE day IN ({','.join('?' * len(batch))})", batch)
+
+    now = datetime.datetime.now().isoformat(timespec="seconds")
+    conn.executemany("INSERT INTO days (day, digest, ingested_at) VALUES (?, ?, ?)",
+                     [(day, digest, now) for day, digest in digests.items()])
+    conn.executemany(
+        f"INSERT INTO daily_totals (day, segment, group_key, {', '.join(VALUE_COLUMNS.values())}) "
+        f"VALUES ({', '.join('?' * (3 + len(VALUE_COLUMNS)))})",
+        _records(totals, [day_col, "segment", "group_key", *VALUE_COLUMNS], day_col),
+    )
+    conn.executemany(
+        "INSERT INTO daily_keys (day, segment, group_key, key) VALUES (?, ?, ?, ?)",
+        _records(keys, [day_col, "segment", "group_key", "key"], day_col),
+    )
+
+
+def _records(frame: pd.DataFrame, columns: list, day_col: str) -> list:
+    frame = frame[columns].astype(object).assign(**{day_col: frame[day_col].dt.strftime("%Y-%m-%d")})
+    frame = frame.astype(object).where(frame.notna(), None)
+    return list(frame.itertuples(index=False, name=None))
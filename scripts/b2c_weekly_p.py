@@ -1,9 +1,96 @@
 # /scripts/b2c_weekly_p.py
 import pandas as pd
 import numpy as np
-import io
 from datetime import date
-import calendar
+
+from . import b2c_daily_store
+from .business_calendar import classify_days, remaining_days_in_month
+from .excel_reader import read_excel_columns
+from .excel_writer import StreamingWorkbook
+
+INPUT_COLUMNS = [
+    '주문일', '주문번호', '고객id', '상품타입', '브랜드', '패턴', '주문채널', '주문상품',
+    '주문수량', '상품주문금액', '실결제금액', '장착비'
+]
+
+VALUE_COLUMNS = ['주문수량', '상품주문금액', '장착비', '실결제금액']
+
+# Group label of rows with a blank 주문채널/브랜드/상품타입; the original string cleaning turned them into 'nan'.
+MISSING_GROUP_KEY = 'nan'
+
+# Distinct-key segments for unique counts: name -> (row segment, key column).
+KEY_SEGMENTS = {'tire_customers': ('tire_channel', '고객id'), 'oil_orders': ('oil', '주문번호')}
+
+def split_segments(df):
+    """
+    Splits cleaned export rows into the report segments.
+
+    Returns a dict mapping a segment name to ``(frame, group_col)``; ``group_col``
+    is ``None`` for blocks without a breakdown.
+    """
+    df_tire = df[(df['상품타입'] == '타이어') & (df['브랜드'] != '기타')].copy()
+    df_alignment = df[df['상품타입'] == '휠얼라인먼트']
+
+    if '패턴' in df_tire.columns and '브랜드' in df_tire.columns:
+        brands = df_tire['브랜드'].cat
+        df_tire['Analysis_Brand'] = brands.set_categories(brands.categories.union(['굿이어 (쿠퍼)', '굿이어 (기타)']))
+        is_goodyear = df_tire['브랜드'] == '굿이어'
+        contains_cooper = df_tire['패턴'].str.contains('쿠퍼', na=False)
+        df_tire.loc[is_goodyear & contains_cooper, 'Analysis_Brand'] = '굿이어 (쿠퍼)'
+        df_tire.loc[is_goodyear & ~contains_cooper, 'Analysis_Brand'] = '굿이어 (기타)'
+    else:
+        df_tire['Analysis_Brand'] = df_tire['브랜드'] if '브랜드' in df_tire.columns else 'Unknown'
+
+    df_etc = df[df['상품타입'].isin(['배터리', '세차권', '와이퍼'])]
+    df_oil_filtered = df[(df['상품타입'] == '엔진오일') & (df['주문상품'].str.contains('오일필터', na=False))]
+    return {
+        'tire_channel': (df_tire, '주문채널'),
+        'tire_brand': (df_tire, 'Analysis_Brand'),
+        'etc': (df_etc, '상품타입'),
+        'oil': (df_oil_filtered, None),
+        'alignment': (df_alignment, None),
+    }
+
+def group_keys(frame, group_col):
+    """
+    The group key of every row, blank keys labelled ``MISSING_GROUP_KEY``.
+
+    The daily store cannot keep missing keys apart from each other, and the
+    report lists blank channels and brands as a group of their own.
+    """
+    if not group_col:
+        return ''
+    keys = frame[group_col].astype(object)
+    return keys.where(keys.notna(), MISSING_GROUP_KEY)
+
+def aggregate_by_day(segments, value_cols):
+    """
+    Sums ``value_cols`` per (segment, 주문일, group key) in one groupby.
+
+    Blank group keys are summed under ``MISSING_GROUP_KEY``, so the groups of
+    a segment always add up to the segment's total.
+    """
+    parts = []
+    for segment, (frame, group_col) in segments.items():
+        part = frame[['주문일'] + value_cols]
+        parts.append(part.assign(segment=segment, group_key=group_keys(frame, group_col)))
+    rows = pd.concat(parts, ignore_index=True)
+    return rows.groupby(['segment', '주문일', 'group_key'], dropna=False)[value_cols].sum()
+
+def aggregate_days(df):
+    """
+    Per-day totals and distinct keys of ``df`` in the layout of ``b2c_daily_store``.
+    """
+    segments = split_segments(df)
+    totals = aggregate_by_day(segments, VALUE_COLUMNS).reset_index()
+    parts = []
+    for name, (source, key_col) in KEY_SEGMENTS.items():
+        frame, group_col = segments[source]
+        part = pd.DataFrame({'주문일': frame['주문일'], 'segment': name,
+                             'group_key': group_keys(frame, group_col), 'key': frame[key_col]})
+        part = part.dropna(subset=['key'])
+        parts.append(part.assign(key=part['key'].astype(str)).drop_duplicates())
+    return totals, pd.concat(parts, ignore_index=True)
 
 def process_file(input_stream):
     """
@@ -14,50 +101,24 @@ def process_file(input_stream):
     prediction_sheet_name = 'Prediction_Analysis'
 
     try:
-        df = pd.read_excel(input_stream, engine='openpyxl')
+        # The order schema strips the label columns into categoricals, parses the amounts and 주문일.
+        df = read_excel_columns(input_stream, usecols=INPUT_COLUMNS, schema='order')
 
         # --- 1. Data Cleaning and Preparation ---
-        for col in ['상품타입', '브랜드', '패턴', '주문채널', '주문상품']:
-            if col in df.columns:
-                df[col] = df[col].astype(str).str.strip()
+        if '주문상품' in df.columns:
+            df['주문상품'] = df['주문상품'].astype(str).str.strip()
 
-        numeric_cols = ['주문수량', '상품주문금액', '실결제금액', '장착비']
-        for col in numeric_cols:
-            if col in df.columns:
-                df[col] = df[col].astype(str).str.replace(',', '', regex=False)
-                df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0).astype(float)
-
-        df['주문일'] = pd.to_datetime(df['주문일'], format='%Y%m%d', errors='coerce')
         df.dropna(subset=['주문일'], inplace=True)
 
-        holidays_2025 = [
-            date(2025, 1, 1), date(2025, 1, 28), date(2025, 1, 29), date(2025, 1, 30),
-            date(2025, 3, 1), date(2025, 5, 5), date(2025, 5, 6), date(2025, 6, 3), 
-            date(2025, 6, 6), date(2025, 8, 15), date(2025, 10, 3), date(2025, 10, 6), 
-            date(2025, 10, 7), date(2025, 10, 8), date(2025, 10, 9), date(2025, 12, 25)
-        ]
-
-        def get_day_type(d):
-            d_date = d.date()
-            return 'Weekend' if d_date in holidays_2025 or d.weekday() >= 5 else 'Weekday'
-
-        df['Day_Type'] = df['주문일'].apply(get_day_type)
-
     except Exception as e:
         raise ValueError(f"File Read/Clean Error: {e}")
 
     # --- 2. Perform All Historical Analysis Tasks ---
-    df_tire = df[(df['상품타입'] == '타이어') & (df['브랜드'] != '기타')].copy()
-    df_alignment = df[df['상품타입'] == '휠얼라인먼트'].copy()
-
-    if '패턴' in df_tire.columns and '브랜드' in df_tire.columns:
-        df_tire['Analysis_Brand'] = df_tire['브랜드']
-        is_goodyear = df_tire['브랜드'] == '굿이어'
-        contains_cooper = df_tire['패턴'].str.contains('쿠퍼', na=False)
-        df_tire.loc[is_goodyear & contains_cooper, 'Analysis_Brand'] = '굿이어 (쿠퍼)'
-        df_tire.loc[is_goodyear & ~contains_cooper, 'Analysis_Brand'] = '굿이어 (기타)'
-    else:
-        df_tire['Analysis_Brand'] = df_tire['브랜드'] if '브랜드' in df_tire.columns else 'Unknown'
+    # Only days not yet in the daily store (or whose rows changed) are aggregated again;
+    # every table below is built from the stored per-day totals of the days in this file.
+    totals, keys = b2c_daily_store.sync(df, '주문일', aggregate_days)
+    totals['Day_Type'] = classify_days(totals['주문일'])
+    keys['Day_Type'] = classify_days(keys['주문일'])
 
     def adjust_for_vat(df, cols):
         df_adj = df.copy()
@@ -68,8 +129,14 @@ def process_file(input_stream):
 
     r_cols_financial = ['상품주문금액', '실결제금액', '장착비']
 
+    def segment_rows(frame, segment):
+        return frame[frame['segment'] == segment]
+
+    def segment_totals(segment, group_by_col, cols):
+        return segment_rows(totals, segment).groupby('group_key', dropna=False)[cols].sum().rename_axis(group_by_col).reset_index()
+
     # 1. Tire Sales by Channel
-    result1_base = df_tire.groupby('주문채널').agg(주문수량=('주문수량', 'sum'), 상품주문금액=('상품주문금액', 'sum'), 실결제금액=('실결제금액', 'sum')).reset_index()
+    result1_base = segment_totals('tire_channel', '주문채널', ['주문수량', '상품주문금액', '실결제금액'])
     cols1_to_process = [col for col in r_cols_financial if col in result1_base.columns]
     result1_adj = adjust_for_vat(result1_base, cols1_to_process)
     result1_adj[cols1_to_process] = result1_adj[cols1_to_process].round(-3)
@@ -77,9 +144,7 @@ def process_file(input_stream):
     result1 = pd.concat([result1_adj, pd.DataFrame([{'주문채널': '합계', **sum1}])], ignore_index=True) if not result1_adj.empty else result1_adj
 
     # 2. Other Product Sales
-    product_types_2 = ['배터리', '세차권', '와이퍼']
-    df_etc = df[df['상품타입'].isin(product_types_2)].copy()
-    result2_base = df_etc.groupby('상품타입').agg(주문수량=('주문수량', 'sum'), 상품주문금액=('상품주문금액', 'sum'), 장착비=('장착비', 'sum'), 실결제금액=('실결제금액', 'sum')).reset_index()
+    result2_base = segment_totals('etc', '상품타입', ['주문수량', '상품주문금액', '장착비', '실결제금액'])
     cols2_to_process = [col for col in r_cols_financial if col in result2_base.columns]
     result2_adj = adjust_for_vat(result2_base, cols2_to_process)
     result2_adj[cols2_to_process] = result2_adj[cols2_to_process].round(-3)
@@ -87,8 +152,8 @@ def process_file(input_stream):
     result2 = pd.concat([result2_adj, pd.DataFrame([{'상품타입': '합계', **sum2}])], ignore_index=True) if not result2_adj.empty else result2_adj
 
     # 3. Engine Oil Sales
-    df_oil_filtered = df[(df['상품타입'] == '엔진오일') & (df['주문상품'].str.contains('오일필터', na=False))].copy()
-    result3_base = pd.DataFrame({'개수(count)': [df_oil_filtered['주문번호'].nunique()], '주문수량': [df_oil_filtered['주문수량'].sum()], '상품주문금액': [df_oil_filtered['상품주문금액'].sum()], '실결제금액': [df_oil_filtered['실결제금액'].sum()]})
+    oil_totals = segment_rows(totals, 'oil')
+    result3_base = pd.DataFrame({'개수(count)': [segment_rows(keys, 'oil_orders')['key'].nunique()], '주문수량': [oil_totals['주문수량'].sum()], '상품주문금액': [oil_totals['상품주문금액'].sum()], '실결제금액': [oil_totals['실결제금액'].sum()]})
     cols3_to_process = [col for col in r_cols_financial if col in result3_base.columns]
     result3 = adjust_for_vat(result3_base, cols3_to_process)
     result3[cols3_to_process] = result3[cols3_to_process].round(-3)
@@ -98,7 +163,7 @@ def process_file(input_stream):
     unrounded_sum2 = adjust_for_vat(result2_base, cols2_to_process).sum(numeric_only=True)
     val_1 = unrounded_sum1.get('실결제금액', 0) - unrounded_sum1.get('상품주문금액', 0)
     val_2 = unrounded_sum2.get('실결제금액', 0) - unrounded_sum2.get('상품주문금액', 0) - unrounded_sum2.get('장착비', 0)
-    val_3 = df_oil_filtered['주문수량'].sum() * 25000
+    val_3 = oil_totals['주문수량'].sum() * 25000
     total_val = val_1 + val_2 + val_3
     result4 = pd.DataFrame({
         '구분': ['타이어 용역가치 (1)', '기타상품 용역가치 (2)', '엔진오일 용역가치 (3)', '총 용역가치'],
@@ -107,12 +172,12 @@ def process_file(input_stream):
     result4['금액'] = result4['금액'].apply(lambda x: f"{x:,.0f}")
 
     # 5. Customer Analysis
-    result5_base = df_tire.groupby('주문채널')['고객id'].nunique().reset_index().rename(columns={'고객id': '고유고객수'})
+    result5_base = segment_rows(keys, 'tire_customers').groupby('group_key', dropna=False)['key'].nunique().rename_axis('주문채널').reset_index(name='고유고객수')
     sum5 = result5_base.sum(numeric_only=True)
     result5 = pd.concat([result5_base, pd.DataFrame([{'주문채널': '합계', **sum5}])], ignore_index=True) if not result5_base.empty else result5_base
 
     # 6. Tire Sales by Brand
-    result6_base = df_tire.groupby('Analysis_Brand').agg(주문수량=('주문수량', 'sum'), 상품주문금액=('상품주문금액', 'sum'), 실결제금액=('실결제금액', 'sum')).reset_index()
+    result6_base = segment_totals('tire_brand', 'Analysis_Brand', ['주문수량', '상품주문금액', '실결제금액'])
     cols6_to_process = [col for col in r_cols_financial if col in result6_base.columns]
     result6_adj = adjust_for_vat(result6_base, cols6_to_process)
     result6_adj[cols6_to_process] = result6_adj[cols6_to_process].round(-3)
@@ -121,7 +186,7 @@ def process_file(input_stream):
     result6 = pd.concat([result6_adj, pd.DataFrame([{'브랜드': '합계', **sum6}])], ignore_index=True) if not result6_adj.empty else result6_adj
 
     # 7. Alignment Analysis
-    alignment_quantity = df_alignment['주문수량'].sum()
+    alignment_quantity = segment_rows(totals, 'alignment')['주문수량'].sum()
     alignment_value = alignment_quantity * 3000
     result7 = pd.DataFrame({'상품타입': ['휠얼라인먼트'], '주문수량 합계': [alignment_quantity], '계산결과 (수량*3000)': [f"{np.round(alignment_value, -3):,.0f}"]})
 
@@ -133,148 +198,150 @@ def process_file(input_stream):
         remaining_weekdays, remaining_weekends = 0, 0
     else:
         latest_date_in_data = df['주문일'].max().date()
-        _, num_days_in_month = calendar.monthrange(latest_date_in_data.year, latest_date_in_data.month)
-        start_day_for_prediction = latest_date_in_data.day + 1
-        remaining_weekdays = sum(1 for i in range(start_day_for_prediction, num_days_in_month + 1) if date(latest_date_in_data.year, latest_date_in_data.month, i).weekday() < 5 and date(latest_date_in_data.year, latest_date_in_data.month, i) not in holidays_2025)
-        remaining_weekends = sum(1 for i in range(start_day_for_prediction, num_days_in_month + 1) if date(latest_date_in_data.year, latest_date_in_data.month, i).weekday() >= 5 or date(latest_date_in_data.year, latest_date_in_data.month, i) in holidays_2025)
+        remaining_weekdays, remaining_weekends = remaining_days_in_month(latest_date_in_data)
 
     prediction_blocks = []
 
-    def generate_grouped_prediction(df_filtered, group_by_col, agg_dict, title, numeric_cols, cols_to_divide=[], cols_to_round=[]):
-        df_weekday = df_filtered[df_filtered['Day_Type'] == 'Weekday']; weekdays_in_data = df_weekday['주문일'].nunique(); weekday_pred_df = pd.DataFrame()
-        if weekdays_in_data > 0:
-            hist_wd = df_weekday.groupby(group_by_col).agg(agg_dict)
-            if not hist_wd.empty:
-                cols_div = [c for c in cols_to_divide if c in hist_wd.columns]
-                hist_wd = adjust_for_vat(hist_wd, cols_div)
-                avg_wd = hist_wd[numeric_cols].div(weekdays_in_data); pred_wd = avg_wd.multiply(remaining_weekdays); total_wd = hist_wd[numeric_cols].add(pred_wd)
-                cols_rnd = [c for c in cols_to_round if c in total_wd.columns]
-                total_wd[cols_rnd] = total_wd[cols_rnd].round(-3)
-                total_wd.loc['합계'] = total_wd.sum(); weekday_pred_df = total_wd
-
-        df_weekend = df_filtered[df_filtered['Day_Type'] == 'Weekend']; weekends_in_data = df_weekend['주문일'].nunique(); weekend_pred_df = pd.DataFrame()
-        if weekends_in_data > 0:
-            hist_we = df_weekend.groupby(group_by_col).agg(agg_dict)
-            if not hist_we.empty:
-                cols_div = [c for c in cols_to_divide if c in hist_we.columns]
-                hist_we = adjust_for_vat(hist_we, cols_div)
-                avg_we = hist_we[numeric_cols].div(weekends_in_data); pred_we = avg_we.multiply(remaining_weekends); total_we = hist_we[numeric_cols].add(pred_we)
-                cols_rnd = [c for c in cols_to_round if c in total_we.columns]
-                total_we[cols_rnd] = total_we[cols_rnd].round(-3)
-                total_we.loc['합계'] = total_we.sum(); weekend_pred_df = total_we
-        prediction_blocks.append({'title': title, 'weekday_df': weekday_pred_df, 'weekend_df': weekend_pred_df, 'wd_count': weekdays_in_data, 'we_count': weekends_in_data})
-
-    def generate_scalar_prediction(df_filtered, agg_dict, title, multipliers={}, cols_to_divide=[], cols_to_round=[]):
-        df_weekday = df_filtered[df_filtered['Day_Type'] == 'Weekday']; weekdays_in_data = df_weekday['주문일'].nunique(); weekday_pred_df = pd.DataFrame()
-        if weekdays_in_data > 0:
-            hist = df_weekday.agg(agg_dict); hist = pd.Series(hist)
-            cols_div = [c for c in cols_to_divide if c in hist.index]
-            for col in cols_div: hist[col] /= 1.1
-            avg = hist / weekdays_in_data; pred = avg * remaining_weekdays; total = hist + pred
-            for col, mult in multipliers.items(): total[col] *= mult
-            cols_rnd = [c for c in cols_to_round if c in total.index]
-            total[cols_rnd] = total[cols_rnd].round(-3)
-            weekday_pred_df = pd.DataFrame(total).T
-
-        df_weekend = df_filtered[df_filtered['Day_Type'] == 'Weekend']; weekends_in_data = df_weekend['주문일'].nunique(); weekend_pred_df = pd.DataFrame()
-        if weekends_in_data > 0:
-            hist = df_weekend.agg(agg_dict); hist = pd.Series(hist)
-            cols_div = [c for c in cols_to_divide if c in hist.index]
-            for col in cols_div: hist[col] /= 1.1
-            avg = hist / weekends_in_data; pred = avg * remaining_weekends; total = hist + pred
-            for col, mult in multipliers.items(): total[col] *= mult
-            cols_rnd = [c for c in cols_to_round if c in total.index]
-            total[cols_rnd] = total[cols_rnd].round(-3)
-            weekend_pred_df = pd.DataFrame(total).T
-        prediction_blocks.append({'title': title, 'weekday_df': weekday_pred_df, 'weekend_df': weekend_pred_df, 'wd_count': weekdays_in_data, 'we_count': weekends_in_data})
+    # The stored daily totals, indexed by (segment, Day_Type, 주문일, group key), feed every block below.
+    daily_totals = totals.set_index(['segment', 'Day_Type', '주문일', 'group_key']).sort_index()
+    # Unique customers cannot be summed across days, so they are counted from the stored keys.
+    customers_by_channel = segment_rows(keys, 'tire_customers').groupby(['Day_Type', 'group_key'], dropna=False)['key'].nunique()
+
+    def daily_slice(segment, day_type):
+        """Daily totals of one segment and day type, and how many order dates they cover."""
+        try:
+            day_totals = daily_totals.loc[(segment, day_type)]
+        except KeyError:
+            return None, 0
+        return day_totals, day_totals.index.get_level_values('주문일').nunique()
+
+    def grouped_history(segment, day_type, group_by_col, agg_dict, distinct_customers=False):
+        """Sums ``agg_dict`` per group, or counts unique customers per channel if ``distinct_customers``."""
+        day_totals, days_in_data = daily_slice(segment, day_type)
+        if days_in_data == 0:
+            return pd.DataFrame(), 0
+        if distinct_customers:
+            hist = customers_by_channel.get(day_type, pd.Series(dtype='int64')).to_frame('고객id')
+        else:
+            hist = day_totals.groupby(level='group_key', dropna=False)[list(agg_dict)].sum()
+        hist.index.name = group_by_col
+        return hist, days_in_data
+
+    def generate_grouped_prediction(segment, group_by_col, agg_dict, title, numeric_cols, cols_to_divide=[], cols_to_round=[], distinct_customers=False):
+        frames, counts = {}, {}
+        for day_type, remaining_days in [('Weekday', remaining_weekdays), ('Weekend', remaining_weekends)]:
+            hist, days_in_data = grouped_history(segment, day_type, group_by_col, agg_dict, distinct_customers)
+            counts[day_type], frames[day_type] = days_in_data, pd.DataFrame()
+            if days_in_data > 0 and not hist.empty:
+                cols_div = [c for c in cols_to_divide if c in hist.columns]
+                hist = adjust_for_vat(hist, cols_div)
+                avg = hist[numeric_cols].div(days_in_data); pred = avg.multiply(remaining_days); total = hist[numeric_cols].add(pred)
+                cols_rnd = [c for c in cols_to_round if c in total.columns]
+                total[cols_rnd] = total[cols_rnd].round(-3)
+                total.loc['합계'] = total.sum(); frames[day_type] = total
+        prediction_blocks.append({'title': title, 'weekday_df': frames['Weekday'], 'weekend_df': frames['Weekend'], 'wd_count': counts['Weekday'], 'we_count': counts['Weekend']})
+
+    def generate_scalar_prediction(segment, agg_dict, title, multipliers={}, cols_to_divide=[], cols_to_round=[]):
+        frames, counts = {}, {}
+        for day_type, remaining_days in [('Weekday', remaining_weekdays), ('Weekend', remaining_weekends)]:
+            day_totals, days_in_data = daily_slice(segment, day_type)
+            counts[day_type], frames[day_type] = days_in_data, pd.DataFrame()
+            if days_in_data > 0:
+                hist = day_totals[list(agg_dict)].sum()
+                cols_div = [c for c in cols_to_divide if c in hist.index]
+                for col in cols_div: hist[col] /= 1.1
+                avg = hist / days_in_data; pred = avg * remaining_days; total = hist + pred
+                for col, mult in multipliers.items(): total[col] *= mult
+                cols_rnd = [c for c in cols_to_round if c in total.index]
+                total[cols_rnd] = total[cols_rnd].round(-3)
+                frames[day_type] = pd.DataFrame(total).T
+        prediction_blocks.append({'title': title, 'weekday_df': frames['Weekday'], 'weekend_df': frames['Weekend'], 'wd_count': counts['Weekday'], 'we_count': counts['Weekend']})
     
-    def generate_service_value_prediction(df_tire, df_etc, df_oil, remaining_weekdays, remaining_weekends):
-        weekday_pred_df, weekend_pred_df = pd.DataFrame(), pd.DataFrame()
-        df_tire_wd = df_tire[df_tire['Day_Type'] == 'Weekday']; weekdays_in_data = df_tire_wd['주문일'].nunique()
-        if weekdays_in_data > 0:
-            hist_v1 = (df_tire_wd['실결제금액'].sum() - df_tire_wd['상품주문금액'].sum()) / 1.1
-            hist_v2 = (df_etc[df_etc['Day_Type'] == 'Weekday']['실결제금액'].sum() - df_etc[df_etc['Day_Type'] == 'Weekday']['상품주문금액'].sum() - df_etc[df_etc['Day_Type'] == 'Weekday']['장착비'].sum()) / 1.1
-            hist_v3 = df_oil[df_oil['Day_Type'] == 'Weekday']['주문수량'].sum() * 25000
-            total_v1 = hist_v1 + (hist_v1 / weekdays_in_data * remaining_weekdays); total_v2 = hist_v2 + (hist_v2 / weekdays_in_data * remaining_weekdays); total_v3 = hist_v3 + (hist_v3 / weekdays_in_data * remaining_weekdays)
-            weekday_pred_df = pd.DataFrame({'금액': [total_v1, total_v2, total_v3, total_v1 + total_v2 + total_v3]}, index=['타이어 용역가치 (1)', '기타상품 용역가치 (2)', '엔진오일 용역가치 (3)', '총 용역가치'])
-            weekday_pred_df['금액'] = weekday_pred_df['금액'].round(-3)
-
-        df_tire_we = df_tire[df_tire['Day_Type'] == 'Weekend']; weekends_in_data = df_tire_we['주문일'].nunique()
-        if weekends_in_data > 0:
-            hist_v1 = (df_tire_we['실결제금액'].sum() - df_tire_we['상품주문금액'].sum()) / 1.1
-            hist_v2 = (df_etc[df_etc['Day_Type'] == 'Weekend']['실결제금액'].sum() - df_etc[df_etc['Day_Type'] == 'Weekend']['상품주문금액'].sum() - df_etc[df_etc['Day_Type'] == 'Weekend']['장착비'].sum()) / 1.1
-            hist_v3 = df_oil[df_oil['Day_Type'] == 'Weekend']['주문수량'].sum() * 25000
-            total_v1 = hist_v1 + (hist_v1 / weekends_in_data * remaining_weekends); total_v2 = hist_v2 + (hist_v2 / weekends_in_data * remaining_weekends); total_v3 = hist_v3 + (hist_v3 / weekends_in_data * remaining_weekends)
-            weekend_pred_df = pd.DataFrame({'금액': [total_v1, total_v2, total_v3, total_v1 + total_v2 + total_v3]}, index=['타이어 용역가치 (1)', '기타상품 용역가치 (2)', '엔진오일 용역가치 (3)', '총 용역가치'])
-            weekend_pred_df['금액'] = weekend_pred_df['금액'].round(-3)
-
-        prediction_blocks.append({'title': '4. 용역 가치 분석 - 예측', 'weekday_df': weekday_pred_df, 'weekend_df': weekend_pred_df, 'wd_count': weekdays_in_data, 'we_count': weekends_in_data})
+    def generate_service_value_prediction():
+        frames, counts = {}, {}
+        for day_type, remaining_days in [('Weekday', remaining_weekdays), ('Weekend', remaining_weekends)]:
+            tire, days_in_data = daily_slice('tire_channel', day_type)
+            counts[day_type], frames[day_type] = days_in_data, pd.DataFrame()
+            if days_in_data > 0:
+                etc, _ = daily_slice('etc', day_type)
+                oil, _ = daily_slice('oil', day_type)
+                etc_sum = etc.sum() if etc is not None else pd.Series(0.0, index=VALUE_COLUMNS)
+                hist_v1 = (tire['실결제금액'].sum() - tire['상품주문금액'].sum()) / 1.1
+                hist_v2 = (etc_sum['실결제금액'] - etc_sum['상품주문금액'] - etc_sum['장착비']) / 1.1
+                hist_v3 = (oil['주문수량'].sum() if oil is not None else 0) * 25000
+                total_v1 = hist_v1 + (hist_v1 / days_in_data * remaining_days); total_v2 = hist_v2 + (hist_v2 / days_in_data * remaining_days); total_v3 = hist_v3 + (hist_v3 / days_in_data * remaining_days)
+                pred_df = pd.DataFrame({'금액': [total_v1, total_v2, total_v3, total_v1 + total_v2 + total_v3]}, index=['타이어 용역가치 (1)', '기타상품 용역가치 (2)', '엔진오일 용역가치 (3)', '총 용역가치'])
+                pred_df['금액'] = pred_df['금액'].round(-3)
+                frames[day_type] = pred_df
+
+        prediction_blocks.append({'title': '4. 용역 가치 분석 - 예측', 'weekday_df': frames['Weekday'], 'weekend_df': frames['Weekend'], 'wd_count': counts['Weekday'], 'we_count': counts['Weekend']})
 
     # --- Generate all prediction blocks ---
-    generate_grouped_prediction(df_tire, '주문채널', {'주문수량': 'sum', '상품주문금액': 'sum', '실결제금액': 'sum'}, "1. 타이어 판매 현황 (by 주문채널) - 예측", ['주문수량', '상품주문금액', '실결제금액'], cols_to_divide=r_cols_financial, cols_to_round=r_cols_financial)
-    generate_grouped_prediction(df_etc, '상품타입', {'주문수량': 'sum', '상품주문금액': 'sum', '장착비': 'sum', '실결제금액': 'sum'}, "2. 기타 상품 판매 현황 - 예측", ['주문수량', '상품주문금액', '장착비', '실결제금액'], cols_to_divide=r_cols_financial, cols_to_round=r_cols_financial)
-    generate_scalar_prediction(df_oil_filtered, {'주문수량': 'sum', '상품주문금액':'sum', '실결제금액':'sum'}, '3. 엔진오일(오일필터) 주문 내역 (집계) - 예측', cols_to_divide=r_cols_financial, cols_to_round=r_cols_financial)
-    generate_service_value_prediction(df_tire, df_etc, df_oil_filtered, remaining_weekdays, remaining_weekends)
-    generate_grouped_prediction(df_tire, '주문채널', {'고객id': 'nunique'}, "5. 타이어 구매 고객 분석 - 예측", ['고객id'])
-    generate_grouped_prediction(df_tire, 'Analysis_Brand', {'주문수량': 'sum', '상품주문금액': 'sum', '실결제금액': 'sum'}, "6. 타이어 판매 현황 (by 브랜드) - 예측", ['주문수량', '상품주문금액', '실결제금액'], cols_to_divide=r_cols_financial, cols_to_round=r_cols_financial)
-    generate_scalar_prediction(df_alignment, {'주문수량': 'sum'}, "7. 휠얼라이먼트 분석 - 예측", multipliers={'주문수량': 3000}, cols_to_round=['주문수량'])
+    generate_grouped_prediction('tire_channel', '주문채널', {'주문수량': 'sum', '상품주문금액': 'sum', '실결제금액': 'sum'}, "1. 타이어 판매 현황 (by 주문채널) - 예측", ['주문수량', '상품주문금액', '실결제금액'], cols_to_divide=r_cols_financial, cols_to_round=r_cols_financial)
+    generate_grouped_prediction('etc', '상품타입', {'주문수량': 'sum', '상품주문금액': 'sum', '장착비': 'sum', '실결제금액': 'sum'}, "2. 기타 상품 판매 현황 - 예측", ['주문수량', '상품주문금액', '장착비', '실결제금액'], cols_to_divide=r_cols_financial, cols_to_round=r_cols_financial)
+    generate_scalar_prediction('oil', {'주문수량': 'sum', '상품주문금액':'sum', '실결제금액':'sum'}, '3. 엔진오일(오일필터) 주문 내역 (집계) - 예측', cols_to_divide=r_cols_financial, cols_to_round=r_cols_financial)
+    generate_service_value_prediction()
+    generate_grouped_prediction('tire_channel', '주문채널', {'고객id': 'nunique'}, "5. 타이어 구매 고객 분석 - 예측", ['고객id'], distinct_customers=True)
+    generate_grouped_prediction('tire_brand', 'Analysis_Brand', {'주문수량': 'sum', '상품주문금액': 'sum', '실결제금액': 'sum'}, "6. 타이어 판매 현황 (by 브랜드) - 예측", ['주문수량', '상품주문금액', '실결제금액'], cols_to_divide=r_cols_financial, cols_to_round=r_cols_financial)
+    generate_scalar_prediction('alignment', {'주문수량': 'sum'}, "7. 휠얼라이먼트 분석 - 예측", multipliers={'주문수량': 3000}, cols_to_round=['주문수량'])
 
     # --- 4. Save All Results to Excel file in memory ---
-    output_buffer = io.BytesIO()
-    with pd.ExcelWriter(output_buffer, engine='openpyxl') as writer:
-        # Write Historical Analysis Sheet
-        current_row = 0
-        for df_to_write, title in historical_results:
-            if not df_to_write.empty:
-                pd.DataFrame([title]).to_excel(writer, sheet_name=output_sheet_name, startrow=current_row, header=False, index=False)
-                df_to_write.to_excel(writer, sheet_name=output_sheet_name, startrow=current_row + 2, index=False)
-                current_row += len(df_to_write) + 5
-
-        # Write Prediction Analysis Sheet
-        pred_row = 0
-        for block in prediction_blocks:
-            pd.DataFrame([block['title']]).to_excel(writer, sheet_name=prediction_sheet_name, startrow=pred_row, header=False, index=False)
+    # Blocks are streamed top to bottom, so each sheet is written in row order.
+    workbook = StreamingWorkbook()
+    # Write Historical Analysis Sheet
+    current_row = 0
+    for df_to_write, title in historical_results:
+        if not df_to_write.empty:
+            sheet = workbook.sheet(output_sheet_name)
+            sheet.write_row([title], startrow=current_row)
+            sheet.write_frame(df_to_write, startrow=current_row + 2, index=False)
+            current_row += len(df_to_write) + 5
+
+    # Write Prediction Analysis Sheet
+    pred_row = 0
+    for block in prediction_blocks:
+        sheet = workbook.sheet(prediction_sheet_name)
+        sheet.write_row([block['title']], startrow=pred_row)
+        pred_row += 2
+
+        if not block['weekday_df'].empty:
+            sheet.write_row([f"평일 최종 예측 (데이터 {block['wd_count']}일, 남은 평일 {remaining_weekdays}일)"], startrow=pred_row)
+            sheet.write_frame(block['weekday_df'], startrow=pred_row + 1, index=True)
+            pred_row += len(block['weekday_df']) + 3
+
+        if not block['weekend_df'].empty:
+            sheet.write_row([f"주말 최종 예측 (데이터 {block['we_count']}일, 남은 주말 {remaining_weekends}일)"], startrow=pred_row)
+            sheet.write_frame(block['weekend_df'], startrow=pred_row + 1, index=True)
+            pred_row += len(block['weekend_df']) + 3
+
+        # Calculate and Write the Combined Total
+        wd_df, we_df = block['weekday_df'], block['weekend_df']
+        if wd_df.empty and we_df.empty:
             pred_row += 2
-
-            if not block['weekday_df'].empty:
-                pd.DataFrame([f"평일 최종 예측 (데이터 {block['wd_count']}일, 남은 평일 {remaining_weekdays}일)"]).to_excel(writer, sheet_name=prediction_sheet_name, startrow=pred_row, header=False, index=False)
-                block['weekday_df'].to_excel(writer, sheet_name=prediction_sheet_name, startrow=pred_row + 1, index=True)
-                pred_row += len(block['weekday_df']) + 3
-
-            if not block['weekend_df'].empty:
-                pd.DataFrame([f"주말 최종 예측 (데이터 {block['we_count']}일, 남은 주말 {remaining_weekends}일)"]).to_excel(writer, sheet_name=prediction_sheet_name, startrow=pred_row, header=False, index=False)
-                block['weekend_df'].to_excel(writer, sheet_name=prediction_sheet_name, startrow=pred_row + 1, index=True)
-                pred_row += len(block['weekend_df']) + 3
-
-            # Calculate and Write the Combined Total
-            wd_df, we_df = block['weekday_df'], block['weekend_df']
-            if wd_df.empty and we_df.empty:
-                pred_row += 2
-                continue
-
-            if not wd_df.empty and not we_df.empty: combined_df = wd_df.add(we_df, fill_value=0)
-            elif not wd_df.empty: combined_df = wd_df.copy()
-            else: combined_df = we_df.copy()
-
-            if '총 용역가치' in combined_df.index:
-                total_to_write = combined_df.loc[['총 용역가치']]
-            elif '합계' in combined_df.index:
-                total_to_write = combined_df.loc[['합계']]
-            else:
-                total_to_write = combined_df
-
-            if not total_to_write.empty:
-                total_to_write.index = ['평일+주말 총합계']
-                
-                if block['title'] == '4. 용역 가치 분석 - 예측':
-                    total_to_write['금액'] = total_to_write['금액'].apply(lambda x: f"{x:,.0f}")
-                if block['title'] == '7. 휠얼라이먼트 분석 - 예측':
-                    total_to_write.rename(columns={'주문수량': '계산결과 (수량*3000)'}, inplace=True)
-                    total_to_write['계산결과 (수량*3000)'] = total_to_write['계산결과 (수량*3000)'].apply(lambda x: f"{x:,.0f}")
-
-                pd.DataFrame(["▶ 평일+주말 통합 예측 결과"]).to_excel(writer, sheet_name=prediction_sheet_name, startrow=pred_row, header=False, index=False)
-                total_to_write.to_excel(writer, sheet_name=prediction_sheet_name, startrow=pred_row + 1, index=True)
-                pred_row += len(total_to_write) + 4
-
-    output_buffer.seek(0)
-    return output_buffer
\ No newline at end of file
+            continue
+
+        if not wd_df.empty and not we_df.empty: combined_df = wd_df.add(we_df, fill_value=0)
+        elif not wd_df.empty: combined_df = wd_df.copy()
+        else: combined_df = we_df.copy()
+
+        if '총 용역가치' in combined_df.index:
+            total_to_write = combined_df.loc[['총 용역가치']]
+        elif '합계' in combined_df.index:
+            total_to_write = combined_df.loc[['합계']]
+        else:
+            total_to_write = combined_df
+
+        if not total_to_write.empty:
+            total_to_write.index = ['평일+주말 총합계']
+            
+            if block['title'] == '4. 용역 가치 분석 - 예측':
+                total_to_write['금액'] = total_to_write['금액'].apply(lambda x: f"{x:,.0f}")
+            if block['title'] == '7. 휠얼라이먼트 분석 - 예측':
+                total_to_write.rename(columns={'주문수량': '계산결과 (수량*3000)'}, inplace=True)
+                total_to_write['계산결과 (수량*3000)'] = total_to_write['계산결과 (수량*3000)'].apply(lambda x: f"{x:,.0f}")
+
+            sheet.write_row(["▶ 평일+주말 통합 예측 결과"], startrow=pred_row)
+            sheet.write_frame(total_to_write, startrow=pred_row + 1, index=True)
+            pred_row += len(total_to_write) + 4
+
+    return workbook.save()
\ No newline at end of file
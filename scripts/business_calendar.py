@@ -0,0 +1,102 @@
+"""Business-day calendar shared by the weekly reports.
+
+A day is a business day ("Weekday") when it falls Monday to Friday and is
+not a public holiday; every other day counts as "Weekend". Holidays come
+from the multi-year ``HOLIDAYS`` table below, extended by an optional file
+named by ``AUTOWORLD_HOLIDAYS_FILE`` (one ``YYYY-MM-DD`` date per line,
+``#`` starts a comment), so new years or company days off can be added
+without a code change.
+
+Classification and counting go through a numpy ``busdaycalendar``, so a whole
+date column is classified in one vectorized call.
+"""
+
+from __future__ import annotations
+
+import calendar
+import datetime
+import os
+
+import numpy as np
+import pandas as pd
+
+WEEKDAY = "Weekday"
+WEEKEND = "Weekend"
+
+# Korean public holidays, including substitute holidays.
+HOLIDAYS = {
+    2024: [
+        "2024-01-01", "2024-02-09", "2024-02-10", "2024-02-11", "2024-02-12",
+        "2024-03-01", "2024-04-10", "2024-05-05", "2024-05-06", "2024-05-15",
+        "2024-06-06", "2024-08-15", "2024-09-16", "2024-09-17", "2024-09-18",
+        "2024-10-01", "2024-10-03", "2024-10-09", "2024-12-25",
+    ],
+    2025: [
+        "2025-01-01", "2025-01-28", "2025-01-29", "2025-01-30", "2025-03-01",
+        "2025-05-05", "2025-05-06", "2025-06-03", "2025-06-06", "2025-08-15",
+        "2025-10-03", "2025-10-06", "2025-10-07", "2025-10-08", "2025-10-09",
+        "2025-12-25",
+    ],
+    2026: [
+        "2026-01-01", "2026-02-16", "2026-02-17", "2026-02-18", "2026-03-01",
+        "2026-03-02", "2026-05-05", "2026-05-24", "2026-05-25", "2026-06-03",
+        "2026-06-06", "2026-08-15", "2026-08-17", "2026-09-24", "2026-09-25",
+        "2026-09-26", "2026-09-28", "2026-10-03", "2026-10-05", "2026-10-09",
+        "2026-12-25",
+    ],
+    2027: [
+        "2027-01-01", "2027-02-06", "2027-02-07", "2027-02-08", "2027-02-09",
+        "2027-03-01", "2027-05-05", "2027-05-13", "2027-06-06", "2027-08-15",
+        "2027-08-16", "2027-09-14", "2027-09-15", "2027-09-16", "2027-10-03",
+        "2027-10-04", "2027-10-09", "2027-10-11", "2027-12-25", "2027-12-27",
+    ],
+}
+HOLIDAYS_FILE = os.environ.get("AUTOWORLD_HOLIDAYS_FILE")
+
+
+def load_holidays(path: str | None = None) -> np.ndarray:
+    """Return the sorted holiday dates of ``HOLIDAYS`` plus those in ``path``."""
+
+    dates = [day for days in HOLIDAYS.values() for day in days]
+    if path:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                line = line.split("#", 1)[0].strip()
+                if line:
+                    dates.append(line)
+    return np.unique(np.array(dates, dtype="datetime64[D]"))
+
+
+BUSINESS_CALENDAR = np.busdaycalendar(weekmask="1111100", holidays=load_holidays(HOLIDAYS_FILE))
+
+
+def classify_days(dates: pd.Series) -> pd.Series:
+    """Label every date of ``dates`` as ``"Weekday"`` or ``"Weekend"``.
+
+    Missing dates stay missing.
+    """
+
+    days = dates.to_numpy(dtype="datetime64[ns]").astype("datetime64[D]")
+    valid = ~np.isnat(days)
+    is_business = np.zeros(len(days), dtype=bool)
+    is_business[valid] = np.is_busday(days[valid], busdaycal=BUSINESS_CALENDAR)
+    labels = np.where(is_business, WEEKDAY, WEEKEND).astype(object)
+    labels[~valid] = None
+    return pd.Series(labels, index=dates.index)
+
+
+def remaining_days_in_month(day: datetime.date) -> tuple[int, int]:
+    """Count business and non-business days after ``day`` until its month ends.
+
+    Returns
+    -------
+    tuple[int, int]
+        ``(business_days, weekend_days)``; together they are the number of
+        days left in the month.
+    """
+
+    _, days_in_month = calendar.monthrange(day.year, day.month)
+    start = np.datetime64(day, "D") + 1
+    end = np.datetime64(day.replace(day=days_in_month), "D") + 1
+    business_days = int(np.busday_count(start, end, busdaycal=BUSINESS_CALENDAR))
+    return business_days, days_in_month - day.day - business_days
@@ -0,0 +1,148 @@
+"""Persistent vendor -> category mapping for the P&L categorizer.
+
+Categorizing a month used to require uploading the whole previous month's
+report just to rebuild the ``거래처명`` -> ``구분`` map, and vendors that
+skipped a month lost their category. The map now lives in a small SQLite
+database on local disk: every run upserts the categories it learned and the
+current month is categorized with one bulk lookup, so the previous-month
+upload is optional.
+
+The store can be exported to and imported from a two-column CSV
+(``거래처명``, ``구분``) for backups or manual corrections.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import csv
+import datetime
+import io
+import os
+import sqlite3
+
+STORE_PATH = os.environ.get(
+    "AUTOWORLD_CATEGORY_DB",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "pl_categories.sqlite3"),
+)
+
+VENDOR_HEADER = "거래처명"
+CATEGORY_HEADER = "구분"
+
+# Stay below SQLite's default limit on bound parameters per statement.
+_LOOKUP_BATCH = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS vendor_categories (
+    vendor     TEXT PRIMARY KEY,
+    category   TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+)
+"""
+
+
+@contextlib.contextmanager
+def connect(path: str | None = None):
+    """Open the store, creating the database file and table on first use.
+
+    The connection commits on success, rolls back on error and is closed on
+    exit. WAL mode lets concurrent workers read while one of them writes.
+    """
+
+    path = path or STORE_PATH
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30)
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(_SCHEMA)
+        with conn:
+            yield conn
+    finally:
+        conn.close()
+
+
+def lookup(vendors, path: str | None = None) -> dict:
+    """Return ``{vendor: category}`` for the given vendor names that are stored."""
+
+    vendors = list(dict.fromkeys(vendors))
+    found = {}
+    with connect(path) as conn:
+        for start in range(0, len(vendors), _LOOKUP_BATCH):
+            batch = vendors[start:start + _LOOKUP_BATCH]
+            placeholders = ",".join("?" * len(batch))
+            found.update(conn.execute(
+                f"SELECT vendor, category FROM vendor_categories WHERE vendor IN ({placeholders})",
+                batch,
+            ))
+    return found
+
+
+def upsert(category_map: dict, path: str | None = None) -> int:
+    """Insert or overwrite the given ``{vendor: category}`` entries.
+
+    Returns
+    -------
+    int
+        Number of entries written.
+    """
+
+    now = datetime.datetime.now().isoformat(timespec="seconds")
+    rows = [(vendor, category, now) for vendor, category in category_map.items()]
+    with connect(path) as conn:
+        conn.executemany(
+            "INSERT INTO vendor_categories (vendor, category, updated_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(vendor) DO UPDATE SET "
+            "category = excluded.category, updated_at = excluded.updated_at",
+            rows,
+        )
+    return len(rows)
+
+
+def count(path: str | None = None) -> int:
+    """Number of vendors in the store."""
+
+    with connect(path) as conn:
+        return conn.execute("SELECT COUNT(*) FROM vendor_categories").fetchone()[0]
+
+
+def export_csv(path: str | None = None) -> io.BytesIO:
+    """Dump the whole store as a UTF-8 (with BOM, for Excel) CSV buffer."""
+
+    text = io.StringIO()
+    writer = csv.writer(text)
+    writer.writerow([VENDOR_HEADER, CATEGORY_HEADER, "updated_at"])
+    with connect(path) as conn:
+        writer.writerows(conn.execute(
+            "SELECT vendor, category, updated_at FROM vendor_categories ORDER BY vendor"
+        ))
+    return io.BytesIO(text.getvalue().encode("utf-8-sig"))
+
+
+def import_csv(file_stream, path: str | None = None) -> int:
+    """Upsert the rows of a CSV with ``거래처명`` and ``구분`` columns.
+
+    Extra columns (such as ``updated_at`` in an export) are ignored and rows
+    with a blank vendor or category are skipped.
+
+    Returns
+    -------
+    int
+        Number of entries written.
+    """
+
+    data = file_stream.read()
+    if isinstance(data, bytes):
+        try:
+            data = data.decode("utf-8-sig")
+        except UnicodeDecodeError:
+            data = data.decode("cp949")
+    reader = csv.DictReader(io.StringIO(data))
+    if not reader.fieldnames or not {VENDOR_HEADER, CATEGORY_HEADER} <= set(reader.fieldnames):
+        raise ValueError(f"The CSV must have '{VENDOR_HEADER}' and '{CATEGORY_HEADER}' columns.")
+
+    category_map = {}
+    for row in reader:
+        vendor = (row[VENDOR_HEADER] or "").strip()
+        category = (row[CATEGORY_HEADER] or "").strip()
+        if vendor and category:
+            category_map[vendor] = category
+    return upsert(category_map, path)
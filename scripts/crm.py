@@ -7,10 +7,36 @@ It is designed to be used by the Flask application where two files are
 uploaded and an Excel workbook is returned in memory.
 """
 
+import codecs
 import io
 import re
 import pandas as pd
 
+from .excel_writer import write_frames
+from .phase_timer import add_rows, timed
+from .schemas import apply_schema
+from .upload_cache import UploadData
+
+# The vectorized helpers use Arrow string kernels (RE2) when available; RE2
+# spells Python's Unicode ``\d`` as ``\p{Nd}``.
+try:
+    import pyarrow  # noqa: F401
+    _TEXT_DTYPE, _DIGIT_CLASS = "string[pyarrow]", r"\p{Nd}"
+except ImportError:
+    _TEXT_DTYPE, _DIGIT_CLASS = object, r"\d"
+_DIGIT = f"[{_DIGIT_CLASS}]"
+
+# xlsx (zip) and legacy xls (OLE2) signatures; anything else is parsed as text.
+_EXCEL_MAGIC = (b"PK\x03\x04", b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1")
+_NON_ASCII = re.compile(rb"[\x80-\xff]")
+
+# euc-kr is a subset of cp949, so it needs no separate attempt; latin-1
+# decodes anything and is the last resort.
+CSV_ENCODINGS = ["utf-8", "cp949", "latin-1"]
+SNIFF_BYTES = 64 * 1024
+CHUNK_BYTES = 64 * 1024 * 1024
+CHUNK_ROWS = 200_000
+
 
 def clean_tirepick_id(text: str) -> str | None:
     """Return the numeric portion of a *tirepick* identifier.
@@ -43,6 +69,36 @@ def format_phone_number(num) -> str:
     return s_num
 
 
+def clean_tirepick_ids(values: pd.Series) -> pd.Series:
+    """Vectorized :func:`clean_tirepick_id` for a whole column."""
+
+    text = _as_text(values)
+    has_digits = text.str.contains(_DIGIT, regex=True).fillna(False).astype(bool)
+    first_run = text.str.replace(rf"(?s)^[^{_DIGIT_CLASS}]*({_DIGIT}+).*$", r"\1", regex=True)
+    return first_run.astype(object).where(has_digits, None)
+
+
+def format_phone_numbers(values: pd.Series) -> pd.Series:
+    """Vectorized :func:`format_phone_number` for a whole column."""
+
+    digits = (
+        _as_text(values)
+        .str.replace(".0", "", regex=False)
+        .str.strip()
+        .str.replace(f"[^{_DIGIT_CLASS}]", "", regex=True)
+    )
+    needs_zero = (digits.str.len() == 10) & digits.str.startswith("1")
+    digits = digits.mask(needs_zero, "0" + digits)
+    return digits.where(values.notna(), "").astype(object)
+
+
+def _as_text(values: pd.Series) -> pd.Series:
+    # ``str()`` of every value as a string column; missing values stay missing.
+    if _TEXT_DTYPE is object:
+        return values.map(str, na_action="ignore").astype(object)
+    return values.astype(_TEXT_DTYPE)
+
+
 def find_user_id_column(df: pd.DataFrame) -> str | None:
     """Locate a column containing a ``user_id`` field.
 
@@ -61,32 +117,101 @@ def find_user_id_column(df: pd.DataFrame) -> str | None:
     return None
 
 
-def try_read_csv(file_bytes: bytes, separator: str) -> pd.DataFrame | None:
-    """Attempt to read CSV/TSV data using multiple encodings.
+def sniff_format(file_bytes) -> tuple[str, str | None, str | None]:
+    """Decide how to parse an upload from its leading bytes.
 
-    Parameters
-    ----------
-    file_bytes: bytes
-        Raw file content.
-    separator: str
-        Column separator, e.g. `,` or ``\t``.
+    ``file_bytes`` may be any bytes-like object supporting ``find``, such as
+    the memory map of an :class:`~scripts.upload_cache.UploadData`.
+
+    Returns
+    -------
+    tuple
+        ``(kind, encoding, separator)`` where ``kind`` is ``"excel"`` or
+        ``"csv"``. Encoding and separator are ``None`` for Excel files.
     """
 
-    encodings_to_try = ["utf-8", "cp949", "euc-kr", "latin-1"]
-    for enc in encodings_to_try:
+    if file_bytes[:8].startswith(_EXCEL_MAGIC):
+        return "excel", None, None
+
+    encoding = _sniff_encoding(file_bytes)
+    head = file_bytes[:SNIFF_BYTES].decode(encoding, errors="ignore")
+    first_line = head.lstrip("\ufeff").split("\n", 1)[0]
+    separator = "\t" if first_line.count("\t") > first_line.count(",") else ","
+    return "csv", encoding, separator
+
+
+def _sniff_encoding(file_bytes) -> str:
+    if file_bytes[:3] == b"\xef\xbb\xbf":
+        return "utf-8-sig"
+    # Headers are often ASCII while the data is not, so judge the encoding on
+    # the bytes from the line holding the first non-ASCII byte onwards.
+    match = _NON_ASCII.search(file_bytes)
+    if match is None:
+        return "utf-8"
+    start = file_bytes.rfind(b"\n", 0, match.start()) + 1
+    sample = file_bytes[start:start + SNIFF_BYTES]
+    for enc in CSV_ENCODINGS[:-1]:
         try:
-            return pd.read_csv(
-                io.BytesIO(file_bytes),
+            # Incremental decoding tolerates a character cut at the sample's end.
+            codecs.getincrementaldecoder(enc)().decode(sample, final=False)
+        except UnicodeDecodeError:
+            continue
+        return enc
+    return CSV_ENCODINGS[-1]
+
+
+def read_delimited(file_bytes, encoding: str, separator: str, usecols=None,
+                   dtype=None) -> pd.DataFrame:
+    """Parse CSV/TSV content with the C engine in a single pass.
+
+    ``file_bytes`` is bytes or an :class:`~scripts.upload_cache.UploadData`,
+    whose file is then parsed directly instead of a copy of its content.
+
+    Inputs larger than ``CHUNK_BYTES`` are read ``CHUNK_ROWS`` rows at a time
+    so the parser's buffers stay bounded; with ``usecols`` only the projected
+    columns of each chunk are kept. Should the sniffed encoding still fail
+    further into the file, the next candidate in ``CSV_ENCODINGS`` is used.
+    """
+
+    candidates = [encoding] + CSV_ENCODINGS[CSV_ENCODINGS.index(encoding) + 1:] \
+        if encoding in CSV_ENCODINGS else [encoding] + CSV_ENCODINGS
+    upload = file_bytes if isinstance(file_bytes, UploadData) else UploadData(file_bytes)
+    chunksize = CHUNK_ROWS if len(upload) > CHUNK_BYTES else None
+    for enc in candidates:
+        try:
+            reader = pd.read_csv(
+                upload.stream(),
                 sep=separator,
                 quotechar='"',
                 on_bad_lines="warn",
-                engine="python",
+                engine="c",
                 encoding=enc,
-                dtype={"고객전화번호": str},
+                usecols=usecols,
+                dtype=dtype,
+                chunksize=chunksize,
             )
-        except (UnicodeDecodeError, pd.errors.ParserError):
+            if chunksize is None:
+                return reader
+            with reader:
+                return pd.concat(reader, ignore_index=True)
+        except UnicodeDecodeError:
             continue
-    return None
+    raise ValueError("File could not be decoded as CSV/TSV text.")
+
+
+@timed("parse")
+def _read_dataset(file_stream, name: str, excel_kwargs: dict, csv_kwargs: dict) -> pd.DataFrame:
+    with UploadData(file_stream) as upload:
+        kind, encoding, separator = sniff_format(upload.buffer)
+        try:
+            if kind == "excel":
+                df = pd.read_excel(upload.stream(), **excel_kwargs)
+            else:
+                df = read_delimited(upload, encoding, separator, **csv_kwargs)
+        except (ValueError, pd.errors.ParserError) as e:
+            raise ValueError(f"{name} could not be read as Excel, CSV, or TSV: {e}")
+    add_rows(len(df))
+    return df
 
 
 def process_files(file1, file2) -> io.BytesIO:
@@ -103,21 +228,13 @@ def process_files(file1, file2) -> io.BytesIO:
         In-memory Excel file containing the merged contacts list.
     """
 
-    # Read raw bytes once so we can retry with different loaders.
-    file1_bytes = file1.read()
-    file2_bytes = file2.read()
-
     # --- Dataset 1 ---
-    df1 = None
-    try:
-        df1 = pd.read_excel(io.BytesIO(file1_bytes), usecols=[1], header=None)
-        df1.columns = ["user_id_raw"]
-    except Exception:
-        df1 = try_read_csv(file1_bytes, ",")
-        if df1 is None:
-            df1 = try_read_csv(file1_bytes, "\t")
-        if df1 is None:
-            raise ValueError("Dataset 1 could not be read as Excel, CSV, or TSV.")
+    # Uploads on disk are sniffed through a memory map and parsed from the file itself.
+    df1 = _read_dataset(
+        file1, "Dataset 1",
+        excel_kwargs={"usecols": [1], "header": None, "names": ["user_id_raw"]},
+        csv_kwargs={"dtype": {"고객전화번호": str}},
+    )
 
     user_id_col = find_user_id_column(df1)
     if not user_id_col:
@@ -125,29 +242,26 @@ def process_files(file1, file2) -> io.BytesIO:
     if "user_id_raw" not in df1.columns:
         df1 = df1[[user_id_col]].rename(columns={user_id_col: "user_id_raw"})
 
-    df1["user_id"] = df1["user_id_raw"].apply(clean_tirepick_id)
+    df1["user_id"] = clean_tirepick_ids(df1["user_id_raw"])
     df1_ids = df1.dropna(subset=["user_id"])[["user_id"]].drop_duplicates()
     if df1_ids.empty:
         raise ValueError("No valid 'tirepick' IDs found in Dataset 1.")
 
     # --- Dataset 2 ---
-    df2 = None
-    try:
-        df2 = pd.read_excel(io.BytesIO(file2_bytes), dtype={"고객전화번호": str})
-    except Exception:
-        df2 = try_read_csv(file2_bytes, ",")
-        if df2 is None:
-            df2 = try_read_csv(file2_bytes, "\t")
-        if df2 is None:
-            raise ValueError("Dataset 2 could not be read as Excel, CSV, or TSV.")
-
     required_cols = ["고객id", "푸시수신동의", "이메일", "고객전화번호"]
+    df2 = _read_dataset(
+        file2, "Dataset 2",
+        excel_kwargs={"dtype": {"고객전화번호": str}},
+        csv_kwargs={"dtype": {"고객전화번호": str}, "usecols": lambda col: col in required_cols},
+    )
+
     if not all(col in df2.columns for col in required_cols):
         raise ValueError(
             f"Dataset 2 missing required columns. Needs: {required_cols}"
         )
+    apply_schema(df2, "consent")
 
-    df2["고객전화번호"] = df2["고객전화번호"].apply(format_phone_number)
+    df2["고객전화번호"] = format_phone_numbers(df2["고객전화번호"])
     df2_filtered = df2[df2["푸시수신동의"] == "O"].copy()
     df2_filtered["고객id"] = df2_filtered["고객id"].astype(str)
 
@@ -162,8 +276,5 @@ def process_files(file1, file2) -> io.BytesIO:
         columns={"이메일": "식별자", "고객전화번호": "수신자번호"}, inplace=True
     )
 
-    output = io.BytesIO()
-    result_df.to_excel(output, index=False)
-    output.seek(0)
-    return output
+    return write_frames({"Sheet1": result_df})
 
@@ -0,0 +1,156 @@
+"""Column-projecting Excel loader.
+
+Most programs only need a handful of columns from very wide (100+ column)
+order exports, yet ``pd.read_excel`` decodes every cell into an object
+column first. :func:`read_excel_columns` streams the first worksheet with
+openpyxl's read-only ``iter_rows(values_only=True)`` and only keeps the
+declared columns, so unused cells are never materialised. The result
+mirrors ``pd.read_excel`` for the kept columns: trailing blank rows are
+dropped, integral floats become ints and the default NA strings become NaN.
+
+Parsed frames go through :mod:`scripts.upload_cache`, keyed by the
+projection, so repeated runs skip the parse entirely. A ``schema`` from
+:mod:`scripts.schemas` is applied before the frame is cached.
+"""
+
+from __future__ import annotations
+
+import openpyxl
+import pandas as pd
+
+from .phase_timer import timed
+from .schemas import SCHEMA_VERSION, SCHEMAS, apply_schema
+from .upload_cache import UploadData, cached_parse
+
+# Strings pandas treats as missing by default (see ``na_values`` in
+# ``pandas.read_excel``).
+DEFAULT_NA_VALUES = frozenset([
+    "", " ", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan",
+    "1.#IND", "1.#QNAN", "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a",
+    "nan", "null",
+])
+
+_XLSX_MAGIC = b"PK\x03\x04"
+
+
+@timed("parse")
+def read_excel_columns(file_stream, usecols=None, exclude=None, dtype=None, schema=None) -> pd.DataFrame:
+    """Read only the requested columns of the first sheet of a workbook.
+
+    Parameters
+    ----------
+    file_stream: file-like object, path or bytes
+        Uploaded workbook.
+    usecols: list[str] | None
+        Header names to keep. Names missing from the file are ignored so
+        callers can report them with their own messages. ``None`` keeps
+        every column not listed in ``exclude``.
+    exclude: list[str] | None
+        Header names to drop.
+    dtype: dict[str, type | str] | None
+        Per-column dtypes. ``str`` columns skip type inference entirely,
+        others are converted with ``astype`` once the column is built.
+    schema: str | None
+        Name of a :data:`scripts.schemas.SCHEMAS` entry applied to the
+        parsed frame.
+
+    Returns
+    -------
+    pandas.DataFrame
+        Frame with the kept columns in their original order.
+    """
+
+    usecols = list(usecols) if usecols is not None else None
+    exclude = list(exclude) if exclude else []
+    dtype = dict(dtype or {})
+    options = {"reader": "columns", "usecols": usecols, "exclude": exclude, "dtype": dtype}
+    with UploadData(file_stream) as upload:
+        if schema is None:
+            return cached_parse(upload.buffer, options, lambda: _parse(upload, usecols, exclude, dtype))
+        options["schema"] = [SCHEMA_VERSION, SCHEMAS[schema]]
+        return cached_parse(upload.buffer, options,
+                            lambda: apply_schema(_parse(upload, usecols, exclude, dtype), schema))
+
+
+def _parse(upload: UploadData, usecols, exclude, dtype) -> pd.DataFrame:
+    wanted = set(usecols) if usecols is not None else None
+    unwanted = set(exclude)
+
+    def keep(label) -> bool:
+        return (wanted is None or label in wanted) and label not in unwanted
+
+    if upload.buffer[:len(_XLSX_MAGIC)] != _XLSX_MAGIC:
+        # Legacy .xls and other formats: let pandas pick the engine.
+        return pd.read_excel(upload.stream(), usecols=keep, dtype=dtype or None)
+
+    wb = openpyxl.load_workbook(upload.stream(), read_only=True, data_only=True)
+    try:
+        rows = wb.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return pd.DataFrame()
+
+        labels = _header_labels(header)
+        selected = [(i, label) for i, label in enumerate(labels) if keep(label)]
+        columns = [[] for _ in selected]
+        appenders = [(i, col.append) for (i, _), col in zip(selected, columns)]
+
+        pending_blank = 0
+        for row in rows:
+            if row.count(None) == len(row):
+                # pandas keeps blank rows between data but trims trailing ones.
+                pending_blank += 1
+                continue
+            for _ in range(pending_blank):
+                for _, append in appenders:
+                    append(None)
+            pending_blank = 0
+            width = len(row)
+            for i, append in appenders:
+                append(_convert_cell(row[i]) if i < width else None)
+    finally:
+        wb.close()
+
+    frame = {}
+    for (_, label), values in zip(selected, columns):
+        frame[label] = _build_column(values, dtype.get(label))
+    return pd.DataFrame(frame, columns=[label for _, label in selected])
+
+
+def _header_labels(header) -> list:
+    """Name header cells the way ``pd.read_excel`` does."""
+
+    labels, seen = [], {}
+    for i, value in enumerate(header):
+        label = f"Unnamed: {i}" if value is None else _convert_cell(value)
+        if label in seen:
+            seen[label] += 1
+            label = f"{label}.{seen[label]}"
+        else:
+            seen[label] = 0
+        labels.append(label)
+    return labels
+
+
+def _convert_cell(value):
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def _build_column(values: list, dtype) -> pd.Series:
+    if dtype is str or dtype == "str":
+        values = [None if v is None or (isinstance(v, str) and v in DEFAULT_NA_VALUES)
+                  else str(v) for v in values]
+        return pd.Series(values, dtype=object)
+
+    series = pd.Series(values)
+    if series.dtype == object or pd.api.types.is_string_dtype(series.dtype):
+        series = series.mask(series.isin(DEFAULT_NA_VALUES))
+        try:
+            series = pd.to_numeric(series)
+        except (ValueError, TypeError):
+            series = series.infer_objects()
+    if dtype is not None:
+        series = series.astype(dtype)
+    return series
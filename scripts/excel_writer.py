@@ -0,0 +1,269 @@
+"""Streaming xlsx output shared by all programs.
+
+``DataFrame.to_excel`` through ``pd.ExcelWriter(engine="openpyxl")`` builds a
+cell object for every value before anything is saved, so large outputs are
+slow to write and spike memory. :class:`StreamingWorkbook` uses openpyxl's
+write-only mode instead: rows are serialised as they are appended, so
+frames are written chunk by chunk and never held twice.
+
+Rows can only be appended, so blocks must be written top to bottom.
+``startrow`` arguments are 0-based like ``to_excel``.
+
+The zip compression of the saved file is configurable (see
+``COMPRESSION_LEVELS``); ``"fast"`` is the default and ``"stored"`` skips
+compression entirely for the quickest possible save.
+
+Cells are styled by name (see ``STYLES``) while they are written: each style
+is registered once per workbook as an openpyxl ``NamedStyle`` and assigned to
+the ``WriteOnlyCell`` objects of its column, so number formats are given per
+column to ``write_frame`` instead of being set cell by cell after the data is
+in place. Assigning a named style is one lookup, while setting a font or
+border on a cell hashes it again for every cell.
+
+Saving with a chosen compression goes through
+``openpyxl.writer.excel.ExcelWriter``, the one openpyxl module used beyond
+the public workbook API; ``tests/test_excel_writer.py`` covers it.
+"""
+
+from __future__ import annotations
+
+import datetime
+import io
+import os
+import zipfile
+import numpy as np
+import openpyxl
+import pandas as pd
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Border, Font, NamedStyle, Side
+from openpyxl.writer.excel import ExcelWriter
+
+from .phase_timer import timed
+
+# name -> (zip method, compresslevel)
+COMPRESSION_LEVELS = {
+    "stored": (zipfile.ZIP_STORED, None),
+    "fast": (zipfile.ZIP_DEFLATED, 1),
+    "default": (zipfile.ZIP_DEFLATED, 6),
+    "best": (zipfile.ZIP_DEFLATED, 9),
+}
+DEFAULT_COMPRESSION = os.environ.get("AUTOWORLD_XLSX_COMPRESSION", "fast")
+
+# Rows converted to Python objects at a time when writing a frame.
+CHUNK_ROWS = 10_000
+
+_TEMPORAL_TYPES = (datetime.date, datetime.time, datetime.timedelta)
+
+# Same look as the header cells pandas writes.
+_THIN = Side(style="thin")
+HEADER_FONT = Font(bold=True)
+HEADER_BORDER = Border(left=_THIN, right=_THIN, top=_THIN, bottom=_THIN)
+HEADER_ALIGNMENT = Alignment(horizontal="center", vertical="top")
+TITLE_FONT = Font(name="Calibri", size=12, bold=True)
+
+# Named cell styles: name -> openpyxl cell attributes. A style argument is one
+# of these names or a tuple of names, applied left to right. In the saved file
+# they are the workbook's "report <name>" cell styles.
+STYLES = {
+    "header": {"font": HEADER_FONT, "border": HEADER_BORDER, "alignment": HEADER_ALIGNMENT},
+    "title": {"font": TITLE_FONT},
+    "integer": {"number_format": "#,##0"},
+    "percent": {"number_format": "0.0%"},
+    "accounting": {"number_format": '#,##0;"- "#,##0;0'},
+}
+
+
+class StreamingSheet:
+    """A write-only worksheet that tracks the next free row."""
+
+    def __init__(self, worksheet):
+        self.worksheet = worksheet
+        self.next_row = 0  # 0-based, like ``to_excel(startrow=...)``
+        self._style_names = {}
+
+    def skip_to(self, startrow: int | None) -> None:
+        """Append blank rows until ``startrow`` is the next row written."""
+
+        if startrow is None:
+            return
+        if startrow < self.next_row:
+            raise ValueError(
+                f"Row {startrow} was already written on sheet '{self.worksheet.title}'; "
+                "streaming sheets must be written top to bottom."
+            )
+        while self.next_row < startrow:
+            self.worksheet.append([])
+            self.next_row += 1
+
+    def append(self, values) -> None:
+        """Append one row of plain values or prepared cells."""
+
+        self.worksheet.append(values)
+        self.next_row += 1
+
+    @timed("serialize")
+    def write_row(self, values, startrow: int | None = None, style=None) -> None:
+        """Write one row of values, optionally in the named ``style``."""
+
+        self.skip_to(startrow)
+        values = [_to_excel_value(v) for v in values]
+        if style is not None:
+            values = [self.cell(v, style) for v in values]
+        self.append(values)
+
+    @timed("serialize")
+    def write_frame(self, df: pd.DataFrame, startrow: int | None = None, index: bool = False,
+                    header: bool = True, index_label=None, column_styles: dict | None = None,
+                    index_label_style="header") -> None:
+        """Write ``df`` the way ``df.to_excel`` would, starting at ``startrow``.
+
+        Parameters
+        ----------
+        column_styles: dict | None
+            ``{column label: style}`` for the data cells of those columns;
+            missing values stay empty cells without a style.
+        index_label_style:
+            Style of the index label cells of the header row.
+        """
+
+        self.skip_to(startrow)
+        index_width = df.index.nlevels if index else 0
+        column_styles = column_styles or {}
+        # Positions and named styles of the styled columns, looked up once per frame.
+        styled_columns = [(index_width + i, self._named_style(column_styles[col]))
+                          for i, col in enumerate(df.columns) if col in column_styles]
+
+        if header:
+            if index:
+                labels = index_label if index_label is not None else df.index.names
+                if not isinstance(labels, (list, tuple)):
+                    labels = [labels]
+                labels = list(labels) + [None] * (index_width - len(labels))
+            else:
+                labels = []
+            header_cells = [self.cell(_to_excel_value(label), index_label_style) for label in labels]
+            header_cells += [self._header_cell(col) for col in df.columns]
+            self.append(header_cells)
+
+        for start in range(0, len(df), CHUNK_ROWS):
+            chunk = df.iloc[start:start + CHUNK_ROWS]
+            values = chunk.astype(object).where(chunk.notna(), None).to_numpy().tolist()
+            for keys, row in zip(chunk.index if index else [None] * len(values), values):
+                if index:
+                    keys = keys if isinstance(keys, tuple) else (keys,)
+                    row = [self._header_cell(k) for k in keys] + row
+                for col_idx, style_name in styled_columns:
+                    # Missing values stay empty cells without a style.
+                    if row[col_idx] is not None:
+                        row[col_idx] = self._styled_cell(row[col_idx], style_name)
+                self.append(row)
+
+    def cell(self, value, style=None) -> WriteOnlyCell:
+        """Return a cell for ``value`` in the named ``style`` (see ``STYLES``)."""
+
+        if style is None:
+            return WriteOnlyCell(self.worksheet, value=value)
+        return self._styled_cell(value, self._named_style(style))
+
+    def _styled_cell(self, value, style_name: str) -> WriteOnlyCell:
+        cell = WriteOnlyCell(self.worksheet)
+        cell.style = style_name
+        # Bound after the style, so a date still gets a date number format.
+        cell.value = value
+        return cell
+
+    def _named_style(self, style) -> str:
+        """Return the name of the workbook's cell style for ``style``, registering it on first use."""
+
+        names = (style,) if isinstance(style, str) else tuple(style)
+        if names not in self._style_names:
+            attributes = {}
+            for name in names:
+                if name not in STYLES:
+                    raise ValueError(f"Unknown cell style '{name}'. Choose from: {', '.join(STYLES)}")
+                attributes.update(STYLES[name])
+            style_name = f"report {'+'.join(names)}"
+            workbook = self.worksheet.parent
+            if style_name not in workbook.named_styles:
+                workbook.add_named_style(NamedStyle(name=style_name, **attributes))
+            self._style_names[names] = style_name
+        return self._style_names[names]
+
+    def _header_cell(self, value) -> WriteOnlyCell:
+        return self.cell(_to_excel_value(value), "header")
+
+
+class StreamingWorkbook:
+    """Write-only workbook saved to an in-memory buffer.
+
+    Parameters
+    ----------
+    compression: str | None
+        One of ``COMPRESSION_LEVELS``; defaults to ``DEFAULT_COMPRESSION``.
+    """
+
+    def __init__(self, compression: str | None = None):
+        self.workbook = openpyxl.Workbook(write_only=True)
+        self.compression = compression or DEFAULT_COMPRESSION
+        self._sheets = {}
+
+    def sheet(self, name: str) -> StreamingSheet:
+        """Return the sheet called ``name``, creating it on first use."""
+
+        if name not in self._sheets:
+            self._sheets[name] = StreamingSheet(self.workbook.create_sheet(title=name))
+        return self._sheets[name]
+
+    @timed("serialize")
+    def save(self) -> io.BytesIO:
+        """Serialise the workbook and return the rewound buffer."""
+
+        if not self.workbook.worksheets:
+            self.workbook.create_sheet()
+        return save_workbook(self.workbook, self.compression)
+
+
+@timed("serialize")
+def save_workbook(workbook, compression: str | None = None) -> io.BytesIO:
+    """Save any openpyxl workbook to a rewound buffer with the given compression."""
+
+    compression = compression or DEFAULT_COMPRESSION
+    if compression not in COMPRESSION_LEVELS:
+        raise ValueError(
+            f"Unknown compression '{compression}'. Choose one of: {', '.join(COMPRESSION_LEVELS)}"
+        )
+    method, level = COMPRESSION_LEVELS[compression]
+
+    output_buffer = io.BytesIO()
+    archive = zipfile.ZipFile(output_buffer, "w", method, compresslevel=level, allowZip64=True)
+    workbook.properties.modified = datetime.datetime.now(tz=datetime.timezone.utc).replace(tzinfo=None)
+    ExcelWriter(workbook, archive).save()
+    output_buffer.seek(0)
+    return output_buffer
+
+
+@timed("serialize")
+def write_frames(frames: dict, index: bool = False, compression: str | None = None) -> io.BytesIO:
+    """Write each ``{sheet_name: DataFrame}`` item to its own sheet."""
+
+    book = StreamingWorkbook(compression)
+    for sheet_name, df in frames.items():
+        book.sheet(sheet_name).write_frame(df, index=index)
+    return book.save()
+
+
+def _to_excel_value(value):
+    if value is None:
+        return None
+    if isinstance(value, (list, tuple, dict, set)):
+        return str(value)
+    try:
+        if pd.isna(value):
+            return None
+    except (TypeError, ValueError):
+        pass
+    if isinstance(value, np.datetime64):
+        return pd.Timestamp(value).to_pydatetime()
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
@@ -2,7 +2,15 @@
 import pandas as pd
 import openpyxl
 import numpy as np
-import io
+import contextlib
+import hashlib
+import os
+from collections import OrderedDict
+
+from .excel_reader import read_excel_columns
+from .excel_writer import save_workbook
+from .phase_timer import phase
+from .upload_cache import UploadData
 
 # --- All Configuration Constants (Copied from original script) ---
 # B2B Config
@@ -44,9 +52,73 @@ TIRE_OUTPUT_END_ROW_B2C = 14
 OTHER_CATEGORY_ROW_MAPPING_B2C = {'배터리': 17, '기타상품': 18, '용역': 21}
 OTHER_CATEGORY_NAME_COLUMN_B2C = 'D'
 
+# Every input column either data type can use; the rest of the export is never decoded.
+INPUT_COLUMNS = sorted(set(
+    B2B_INPUT_REQ_COLS + B2C_INPUT_REQ_COLS + VALUE_COLS_TO_CHECK_AND_AGGREGATE_B2B
+    + VALUE_COLS_TO_CHECK_AND_AGGREGATE_B2C + ['상품가', '타이어가격']
+))
+INPUT_DTYPES = {'상태': str, 'Brand': str, 'Part No': str}
+
+# --- Categorization engine ---
+# Brand -> category lookups compiled from the lists above. A brand in several
+# lists keeps the category of the first one, like the original if-chains.
+ITEM_CATEGORIES = ['Tire', '배터리', '엔진오일', '밸브', '밸런스납', '폐타이어', '기타상품', '용역']
+DEFAULT_ITEM_CATEGORY = '기타상품'
+SERVICE_CATEGORY = '용역'
+SERVICE_PART_NO_PREFIX = 'B'
+
+
+def compile_brand_lookup(category_brands):
+    """Builds a (brand index, category codes) pair from [(category, brands), ...]."""
+    lookup = {}
+    for category, brands in category_brands:
+        for brand in brands:
+            lookup.setdefault(brand, ITEM_CATEGORIES.index(category))
+    return pd.Index(list(lookup)), np.array(list(lookup.values()), dtype=np.int8)
+
+
+BRAND_LOOKUP_B2B = compile_brand_lookup([
+    ('Tire', TIRE_BRANDS_B2B),
+    ('배터리', BATTERY_BRANDS_B2B),
+    ('엔진오일', ENGINE_OIL_BRANDS_B2B),
+    ('밸브', VALVE_BRANDS_B2B),
+    ('밸런스납', BALANCE_WEIGHT_BRANDS_B2B),
+    ('폐타이어', WASTE_TIRE_BRANDS_B2B),
+])
+# B2C checks batteries before tires.
+BRAND_LOOKUP_B2C = compile_brand_lookup([
+    ('배터리', BATTERY_BRANDS_B2C),
+    ('Tire', TIRE_BRANDS_B2C),
+])
+
+
+def categorize_items(brands, brand_lookup, part_numbers=None):
+    """
+    Assigns an item category to every row in one vectorized step.
+
+    Brands are matched (after stripping) against the compiled lookup; unknown
+    brands fall back to '기타상품'. When ``part_numbers`` is given, rows whose
+    Part No starts with 'B' are '용역' regardless of brand.
+
+    Returns a categorical Series aligned with ``brands``.
+    """
+    brand_index, brand_codes = brand_lookup
+    positions = brand_index.get_indexer(brands.astype(str).str.strip())
+    codes = np.where(positions >= 0, brand_codes[positions], ITEM_CATEGORIES.index(DEFAULT_ITEM_CATEGORY))
+    if part_numbers is not None:
+        is_service = (part_numbers.astype(str).str.strip().str.upper()
+                      .str.startswith(SERVICE_PART_NO_PREFIX).fillna(False).to_numpy(dtype=bool))
+        codes = np.where(is_service, ITEM_CATEGORIES.index(SERVICE_CATEGORY), codes)
+    return pd.Series(pd.Categorical.from_codes(codes, categories=ITEM_CATEGORIES), index=brands.index)
+
+
+# Parsed templates kept per worker process (see cached_template).
+TEMPLATE_CACHE_SIZE = int(os.environ.get("AUTOWORLD_TEMPLATE_CACHE_SIZE", 4))
+_template_cache = OrderedDict()
+
 
 def load_and_prepare_first_file(file_stream, data_type):
-    df = pd.read_excel(file_stream, engine='openpyxl')
+    df = read_excel_columns(file_stream, usecols=INPUT_COLUMNS, dtype=INPUT_DTYPES)
     
     if data_type == 'b2b':
         required_initial_cols = B2B_INPUT_REQ_COLS
@@ -102,24 +174,14 @@ def aggregate_data(df_filtered, data_type):
         aggregated_by_brand = df_filtered.groupby('Brand', dropna=False)[cols_to_agg].sum().reset_index()
         aggregated_by_brand['쿠폰'] = aggregated_by_brand.get('상품쿠폰', 0) + aggregated_by_brand.get('배송비쿠폰', 0)
         
-        def categorize_brand_b2b(brand):
-            brand_str = str(brand).strip()
-            if brand_str in TIRE_BRANDS_B2B: return 'Tire'
-            if brand_str in BATTERY_BRANDS_B2B: return '배터리'
-            if brand_str in ENGINE_OIL_BRANDS_B2B: return '엔진오일'
-            if brand_str in VALVE_BRANDS_B2B: return '밸브'
-            if brand_str in BALANCE_WEIGHT_BRANDS_B2B: return '밸런스납'
-            if brand_str in WASTE_TIRE_BRANDS_B2B: return '폐타이어'
-            return '기타상품'
-            
-        aggregated_by_brand['Category'] = aggregated_by_brand['Brand'].apply(categorize_brand_b2b)
+        aggregated_by_brand['Category'] = categorize_items(aggregated_by_brand['Brand'], BRAND_LOOKUP_B2B)
         tire_data_agg = aggregated_by_brand[aggregated_by_brand['Category'] == 'Tire'].copy()
         other_data_agg = aggregated_by_brand[aggregated_by_brand['Category'] != 'Tire'].copy()
         
         other_category_summary = pd.DataFrame()
         if not other_data_agg.empty:
             cols_for_category_agg = [col for col in aggregated_by_brand.columns if col not in ['Brand', 'Category', '상품쿠폰', '배송비쿠폰']]
-            other_category_summary = other_data_agg.groupby('Category')[cols_for_category_agg].sum().reset_index()
+            other_category_summary = other_data_agg.groupby('Category', observed=True)[cols_for_category_agg].sum().reset_index()
     
     else: # b2c
         # B2C Aggregation Logic
@@ -127,19 +189,13 @@ def aggregate_data(df_filtered, data_type):
         if 'Part No' not in df_filtered.columns or 'Brand' not in df_filtered.columns:
             raise ValueError("B2C 처리에 'Part No' 또는 'Brand' 컬럼이 필요합니다.")
         
-        def categorize_b2c_item(row):
-            if str(row.get('Part No', '')).strip().upper().startswith('B'): return '용역'
-            if str(row.get('Brand', '')).strip() in BATTERY_BRANDS_B2C: return '배터리'
-            if str(row.get('Brand', '')).strip() in TIRE_BRANDS_B2C: return 'Tire'
-            return '기타상품'
-            
-        df_filtered['Category'] = df_filtered.apply(categorize_b2c_item, axis=1)
+        df_filtered['Category'] = categorize_items(df_filtered['Brand'], BRAND_LOOKUP_B2C, df_filtered['Part No'])
         
         tire_data_raw = df_filtered[df_filtered['Category'] == 'Tire']
         tire_data_agg = tire_data_raw.groupby('Brand')[cols_to_agg].sum().reset_index() if not tire_data_raw.empty else pd.DataFrame()
 
         other_categories_raw = df_filtered[df_filtered['Category'] != 'Tire']
-        other_category_summary = other_categories_raw.groupby('Category')[cols_to_agg].sum().reset_index() if not other_categories_raw.empty else pd.DataFrame()
+        other_category_summary = other_categories_raw.groupby('Category', observed=True)[cols_to_agg].sum().reset_index() if not other_categories_raw.empty else pd.DataFrame()
 
         for df in [tire_data_agg, other_category_summary]:
             if not df.empty:
@@ -166,12 +222,21 @@ def aggregate_data(df_filtered, data_type):
     return tire_data_final, other_category_final
 
 
-def update_template_file(template_stream, tire_data, other_data, data_type, sheet_name):
-    # This function replaces the xlwings logic with openpyxl
-    wb = openpyxl.load_workbook(template_stream)
+def fill_template_sheet(wb, tire_data, other_data, data_type, sheet_name, writes=None):
+    """
+    Writes the aggregated data of one data type into a sheet of a loaded template.
+
+    When ``writes`` is given, the original value of every cell written is
+    recorded in it (see ``cached_template``) before the cell is changed.
+    """
     if sheet_name not in wb.sheetnames:
         raise ValueError(f"시트 '{sheet_name}'를 템플릿 파일에서 찾을 수 없습니다. 사용 가능한 시트: {', '.join(wb.sheetnames)}")
     sheet = wb[sheet_name]
+
+    def write(coordinate, value):
+        if writes is not None:
+            _record_original(writes, sheet, coordinate)
+        sheet[coordinate].value = value
     
     # Get Type-Specific Configurations
     if data_type == 'b2b':
@@ -190,7 +255,7 @@ def update_template_file(template_stream, tire_data, other_data, data_type, shee
                 data_row = tire_data_dict[brand_in_sheet.strip()]
                 for data_col_name, sheet_col_letter in tire_map.items():
                     value = data_row.get(data_col_name, 0)
-                    sheet[f"{sheet_col_letter}{row_num}"].value = float(value) if pd.notna(value) else 0
+                    write(f"{sheet_col_letter}{row_num}", float(value) if pd.notna(value) else 0)
 
     # Update Other Category Data
     if other_data is not None and not other_data.empty:
@@ -200,17 +265,65 @@ def update_template_file(template_stream, tire_data, other_data, data_type, shee
                 data_row = other_data_dict[category_name]
                 for data_col_name, sheet_col_letter in other_map.items():
                      value = data_row.get(data_col_name, 0)
-                     sheet[f"{sheet_col_letter}{row_num}"].value = float(value) if pd.notna(value) else 0
+                     write(f"{sheet_col_letter}{row_num}", float(value) if pd.notna(value) else 0)
+
+
+def update_template_file(template_stream, tire_data, other_data, data_type, sheet_name):
+    # This function replaces the xlwings logic with openpyxl
+    with cached_template(template_stream) as (wb, writes):
+        fill_template_sheet(wb, tire_data, other_data, data_type, sheet_name, writes)
+        # Save to memory buffer
+        return save_workbook(wb)
 
-    # Save to memory buffer
-    output_buffer = io.BytesIO()
-    wb.save(output_buffer)
-    output_buffer.seek(0)
-    return output_buffer
 
+@contextlib.contextmanager
+def cached_template(template_stream):
+    """
+    Yields the parsed template workbook, reusing the one parsed earlier for identical bytes.
 
-def process_files(data_type, sheet_name, input_file, template_file):
-    """Main function to orchestrate the processing."""
+    Parsing the template with openpyxl is the slowest step of a run, and the
+    same monthly template is uploaded over and over. Workbooks are kept per
+    worker process, keyed by the SHA-256 of the file, for the last
+    ``TEMPLATE_CACHE_SIZE`` templates. Callers record every cell they change in
+    the yielded ``writes`` dict, and those cells are put back on exit so the
+    cached workbook always matches the uploaded file. If the block raises, the
+    workbook is dropped instead and the next run parses the template again.
+    """
+    with UploadData(template_stream) as upload:
+        key = hashlib.sha256(upload.buffer).hexdigest()
+        wb = _template_cache.pop(key, None)
+        if wb is None:
+            with phase("parse"):
+                wb = openpyxl.load_workbook(upload.stream())
+
+    writes = {}
+    # An exception raised in the block propagates from here, so a workbook
+    # left half-written is never put back into the cache.
+    yield wb, writes
+    try:
+        _restore_originals(writes)
+    except Exception:
+        return  # never reuse a workbook that could not be reset
+    _template_cache[key] = wb
+    while len(_template_cache) > TEMPLATE_CACHE_SIZE:
+        _template_cache.popitem(last=False)
+
+
+def _record_original(writes, sheet, coordinate):
+    key = (sheet.title, coordinate)
+    if key not in writes:
+        cell = sheet[coordinate]
+        writes[key] = (cell, cell.value)
+
+
+def _restore_originals(writes):
+    # A cell the template did not have stays behind empty and unstyled, which
+    # openpyxl does not write out.
+    for cell, value in writes.values():
+        cell.value = value
+
+
+def _aggregate_for_template(data_type, input_file):
     df_prepared = load_and_prepare_first_file(input_file, data_type)
     if df_prepared is None:
         raise ValueError(f"{data_type.upper()} 유형의 처리할 데이터가 없습니다.")
@@ -219,5 +332,33 @@ def process_files(data_type, sheet_name, input_file, template_file):
     if (processed_tire_data is None or processed_tire_data.empty) and \
        (processed_other_data is None or processed_other_data.empty):
         raise ValueError("집계 후 업데이트할 데이터가 없습니다.")
-        
+    return processed_tire_data, processed_other_data
+
+
+def process_files(data_type, sheet_name, input_file, template_file):
+    """Main function to orchestrate the processing."""
+    processed_tire_data, processed_other_data = _aggregate_for_template(data_type, input_file)
     return update_template_file(template_file, processed_tire_data, processed_other_data, data_type, sheet_name)
+
+
+def process_combined(template_file, data_types, sheet_names, *input_files):
+    """
+    Fills several (data_type, sheet_name, input_file) runs into one template.
+
+    The template is loaded and saved once for all runs, e.g. the B2B and B2C
+    sheets of the monthly IBX file in a single request.
+    """
+    if not (len(data_types) == len(sheet_names) == len(input_files)) or not input_files:
+        raise ValueError("각 입력 파일마다 데이터 유형과 시트 이름이 필요합니다.")
+
+    aggregated = []
+    for data_type, input_file in zip(data_types, input_files):
+        try:
+            aggregated.append(_aggregate_for_template(data_type, input_file))
+        except ValueError as e:
+            raise ValueError(f"[{data_type.upper()}] {e}")
+
+    with cached_template(template_file) as (wb, writes):
+        for data_type, sheet_name, (tire_data, other_data) in zip(data_types, sheet_names, aggregated):
+            fill_template_sheet(wb, tire_data, other_data, data_type, sheet_name, writes)
+        return save_workbook(wb)
@@ -1,8 +1,9 @@
 # /scripts/margin_by_tire.py
 import pandas as pd
 import numpy as np
-import io
-from openpyxl.styles import Font
+
+from .excel_reader import read_excel_columns
+from .excel_writer import StreamingWorkbook
 
 # -- Data Mappings --
 BLACK_CIRCLE_MAP = {
@@ -17,13 +18,20 @@ TIREPICK_MAP = {
     '7988101842': '타이어픽', 'TIREPICK': '타이어픽'
 }
 
+INPUT_COLUMNS = ['주문일자', '상태', 'Brand', '주문ID', '수량', '타이어가격', '정산금액', '판매금액']
+
+STATUS_FILTER = ['배송', '완료', '입금', '확정', '준비']
+BRAND_FILTER = [
+    '피렐리', '금호', '한국', '넥센', '라우펜', '콘티넨탈',
+    '브리지스톤', '미쉐린', '굿이어', '요코하마', '던롭', '프레데터', '쿠퍼'
+]
+VALUES_TO_AGG = ['수량', '정산금액', '상품가', '판매금액']
+FINAL_COLUMNS = ['수량', '정산금액', '개당매입가', '판매금액', '개당판매가', '개당마진', '총마진', '마진율']
+
 # --- Helper Functions for Data Processing ---
 
 def create_new_columns(df):
     """Adds new columns and adjusts for VAT."""
-    for col in ['수량', '타이어가격', '정산금액', '판매금액']:
-        df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
-    
     df['정산금액'] = df['정산금액'] / 1.1
     df['판매금액'] = df['판매금액'] / 1.1
     df['상품가'] = (df['수량'] * df['타이어가격']) / 1.1
@@ -32,141 +40,100 @@ def create_new_columns(df):
     df['타이어픽'] = df['주문ID'].astype(str).map(TIREPICK_MAP)
     return df
 
-def add_calculations_and_sort(pivot_table):
-    """Adds calculated columns, rounds values, sorts, and reorders the pivot table."""
-    if pivot_table.empty:
-        return pivot_table
+def slice_rows(df, mask, index):
+    """Sums the rows selected by ``mask`` by ``index`` and appends the 총합계 row.
 
-    total_row = pivot_table.loc[['총합계']].copy() if '총합계' in pivot_table.index else None
-    pivot_table = pivot_table.drop('총합계', errors='ignore')
+    Each pivot sums the rows themselves in their original order, as
+    ``pd.pivot_table`` did, so the totals (and the margins derived from them)
+    round exactly as before; summing pre-aggregated partial sums would not.
+    """
+    pivot_table = df.loc[mask, VALUES_TO_AGG].groupby(df.loc[mask, index], observed=True).sum()
+    pivot_table.index = pivot_table.index.astype(object)
+    if not pivot_table.empty: pivot_table.loc['총합계'] = pivot_table.sum()
+    return pivot_table
 
-    with np.errstate(divide='ignore', invalid='ignore'):
-        pivot_table['개당매입가'] = (pivot_table['정산금액'] / pivot_table['수량']).replace([np.inf, -np.inf], 0).fillna(0)
-        pivot_table['개당판매가'] = (pivot_table['판매금액'] / pivot_table['수량']).replace([np.inf, -np.inf], 0).fillna(0)
-        pivot_table['개당마진'] = pivot_table['개당판매가'] - pivot_table['개당매입가']
-        pivot_table['총마진'] = pivot_table['개당마진'] * pivot_table['수량']
-        pivot_table['마진율'] = (pivot_table['총마진'] / pivot_table['판매금액']).replace([np.inf, -np.inf], 0).fillna(0)
-    
-    pivot_table = pivot_table.sort_values(by='총마진', ascending=False)
-    
-    if total_row is not None:
-        with np.errstate(divide='ignore', invalid='ignore'):
-            total_row['개당매입가'] = (total_row['정산금액'] / total_row['수량']).replace([np.inf, -np.inf], 0).fillna(0)
-            total_row['개당판매가'] = (total_row['판매금액'] / total_row['수량']).replace([np.inf, -np.inf], 0).fillna(0)
-            total_row['개당마진'] = total_row['개당판매가'] - total_row['개당매입가']
-            total_row['총마진'] = total_row['개당마진'] * total_row['수량']
-            total_row['마진율'] = (total_row['총마진'] / total_row['판매금액']).replace([np.inf, -np.inf], 0).fillna(0)
+def add_margin_columns(table):
+    """Adds the per-unit and margin columns to every row of ``table`` at once."""
+    def ratio(numerator, denominator):
+        return (numerator / denominator).replace([np.inf, -np.inf], 0).fillna(0)
 
+    with np.errstate(divide='ignore', invalid='ignore'):
+        table['개당매입가'] = ratio(table['정산금액'], table['수량'])
+        table['개당판매가'] = ratio(table['판매금액'], table['수량'])
+        table['개당마진'] = table['개당판매가'] - table['개당매입가']
+        table['총마진'] = table['개당마진'] * table['수량']
+        table['마진율'] = ratio(table['총마진'], table['판매금액'])
+    return table
+
+def round_values(table):
+    """Rounds amounts to thousands and per-unit prices to integers."""
     for col in ['정산금액', '판매금액', '총마진']:
-        if col in pivot_table.columns: pivot_table[col] = pivot_table[col].round(-3).astype(np.int64)
-        if total_row is not None and col in total_row.columns: total_row[col] = total_row[col].round(-3).astype(np.int64)
-
+        table[col] = table[col].round(-3).astype(np.int64)
     for col in ['상품가', '개당매입가', '개당판매가', '개당마진']:
-        if col in pivot_table.columns: pivot_table[col] = pivot_table[col].round().astype(np.int64)
-        if total_row is not None and col in total_row.columns: total_row[col] = total_row[col].round().astype(np.int64)
-            
-    if total_row is not None:
-        pivot_table = pd.concat([pivot_table, total_row])
-
-    final_columns = ['수량', '정산금액', '개당매입가', '판매금액', '개당판매가', '개당마진', '총마진', '마진율']
-    for col in final_columns:
-        if col not in pivot_table.columns: pivot_table[col] = 0
-    return pivot_table[final_columns]
+        table[col] = table[col].round().astype(np.int64)
+    return table
+
+def add_calculations_and_sort(pivot_tables):
+    """Adds calculated columns to all pivot tables in one pass, then sorts, rounds and reorders each."""
+    filled = [i for i, pivot_table in enumerate(pivot_tables) if not pivot_table.empty]
+    if not filled:
+        return list(pivot_tables)
+
+    combined = add_margin_columns(pd.concat([pivot_tables[i] for i in filled], keys=filled))
+    results = list(pivot_tables)
+    for i in filled:
+        pivot_table = combined.loc[i]
+        # Sort on the unrounded 총마진; the 총합계 row stays last.
+        body = pivot_table.drop('총합계').sort_values(by='총마진', ascending=False)
+        pivot_table = round_values(pd.concat([body, pivot_table.loc[['총합계']]]))
+        pivot_table.index.name = pivot_tables[i].index.name
+        results[i] = pivot_table[FINAL_COLUMNS]
+    return results
 
 def create_pivot_tables(df):
-    """Creates the four required pivot tables."""
-    status_filter = ['배송', '완료', '입금', '확정', '준비']
-    brand_filter = [
-        '피렐리', '금호', '한국', '넥센', '라우펜', '콘티넨탈',
-        '브리지스톤', '미쉐린', '굿이어', '요코하마', '던롭', '프레데터', '쿠퍼'
-    ]
-    values_to_agg = ['수량', '정산금액', '상품가', '판매금액']
-    
-    filtered_df = df[df['상태'].isin(status_filter) & df['Brand'].isin(brand_filter)]
-
-    pivot1 = pd.pivot_table(filtered_df, values=values_to_agg, index='Brand', aggfunc='sum')
-    if not pivot1.empty: pivot1.loc['총합계'] = pivot1.sum()
-    pivot1 = add_calculations_and_sort(pivot1)
-
-    df_b2b = filtered_df[filtered_df['타이어픽'].isna()]
-    pivot2 = pd.pivot_table(df_b2b, values=values_to_agg, index='Brand', aggfunc='sum')
-    if not pivot2.empty: pivot2.loc['총합계'] = pivot2.sum()
-    pivot2 = add_calculations_and_sort(pivot2)
-
-    df_tirepick = filtered_df[filtered_df['타이어픽'] == '타이어픽']
-    pivot3 = pd.pivot_table(df_tirepick, values=values_to_agg, index='Brand', aggfunc='sum')
-    if not pivot3.empty: pivot3.loc['총합계'] = pivot3.sum()
-    pivot3 = add_calculations_and_sort(pivot3)
-
-    df_b2b_channels = df[df['블랙서클'].notna()]
-    pivot4 = pd.pivot_table(df_b2b_channels, values=values_to_agg, index='블랙서클', aggfunc='sum')
-    if not pivot4.empty: pivot4.loc['총합계'] = pivot4.sum()
-    pivot4 = add_calculations_and_sort(pivot4)
-
-    return pivot1, pivot2, pivot3, pivot4
-
-def apply_number_formats(sheet, pivot_table, start_row):
-    """Applies number formatting to the Excel sheet."""
-    if pivot_table.empty: return
-    
-    int_format, percent_format = '#,##0', '0.0%'
-    try:
-        margin_rate_col_idx = list(pivot_table.columns).index('마진율') + 2
-    except ValueError:
-        margin_rate_col_idx = -1
-
-    for r_idx in range(start_row + 2, start_row + 2 + len(pivot_table)):
-        for c_idx in range(2, len(pivot_table.columns) + 2):
-            cell = sheet.cell(row=r_idx, column=c_idx)
-            if isinstance(cell.value, (int, float, np.number)):
-                cell.number_format = percent_format if cell.column == margin_rate_col_idx else int_format
+    """Creates the four required pivot tables, computing the row filters once."""
+    in_scope = df['상태'].isin(STATUS_FILTER) & df['Brand'].isin(BRAND_FILTER)
+    tirepick = df['타이어픽']
+    return tuple(add_calculations_and_sort([
+        slice_rows(df, in_scope, 'Brand'),
+        slice_rows(df, in_scope & tirepick.isna(), 'Brand'),
+        slice_rows(df, in_scope & (tirepick == '타이어픽'), 'Brand'),
+        slice_rows(df, df['블랙서클'].notna(), '블랙서클'),
+    ]))
 
 def save_to_excel(pivot1, pivot2, pivot3, pivot4, date_range):
     """Saves the pivot tables to a new Excel file in memory."""
-    output_buffer = io.BytesIO()
-    bold_font = Font(name='Calibri', size=12, bold=True)
-
-    with pd.ExcelWriter(output_buffer, engine='openpyxl') as writer:
-        sheet_name_margin, sheet_name_b2b = 'Item별 마진', 'B2B 채널별'
-        
-        start_row_p1 = 2
-        start_row_p2 = start_row_p1 + len(pivot1) + 4 if not pivot1.empty else start_row_p1
-        start_row_p3 = start_row_p2 + len(pivot2) + 4 if not pivot2.empty else start_row_p2
-        start_row_p4 = 2
-
-        if not pivot1.empty: pivot1.to_excel(writer, sheet_name=sheet_name_margin, startrow=start_row_p1)
-        if not pivot2.empty: pivot2.to_excel(writer, sheet_name=sheet_name_margin, startrow=start_row_p2)
-        if not pivot3.empty: pivot3.to_excel(writer, sheet_name=sheet_name_margin, startrow=start_row_p3)
-        if not pivot4.empty: pivot4.to_excel(writer, sheet_name=sheet_name_b2b, startrow=start_row_p4)
-
-        sheet1 = writer.sheets[sheet_name_margin]
-        sheet2 = writer.sheets[sheet_name_b2b]
-        
-        sheet1.cell(row=1, column=1, value=date_range).font = bold_font
-        sheet2.cell(row=1, column=1, value=date_range).font = bold_font
-
-        sheet1.cell(row=start_row_p1 + 1, column=1, value="1. 전체 (Total)").font = bold_font
-        apply_number_formats(sheet1, pivot1, start_row_p1)
-        sheet1.cell(row=start_row_p2 + 1, column=1, value="2. 블랙서클 (Blackcircle)").font = bold_font
-        apply_number_formats(sheet1, pivot2, start_row_p2)
-        sheet1.cell(row=start_row_p3 + 1, column=1, value="3. 타이어픽 (Tire-pick)").font = bold_font
-        apply_number_formats(sheet1, pivot3, start_row_p3)
-        sheet2.cell(row=start_row_p4 + 1, column=1, value="4. B2B 채널별 (B2B by Channel)").font = bold_font
-        apply_number_formats(sheet2, pivot4, start_row_p4)
-
-    output_buffer.seek(0)
-    return output_buffer
+    sheets = {
+        'Item별 마진': [(pivot1, "1. 전체 (Total)"), (pivot2, "2. 블랙서클 (Blackcircle)"), (pivot3, "3. 타이어픽 (Tire-pick)")],
+        'B2B 채널별': [(pivot4, "4. B2B 채널별 (B2B by Channel)")],
+    }
+
+    workbook = StreamingWorkbook()
+    for sheet_name, blocks in sheets.items():
+        sheet = workbook.sheet(sheet_name)
+        sheet.write_row([date_range], style='title')
+        start_row = 2
+        for i, (pivot_table, title) in enumerate(blocks):
+            if not pivot_table.empty:
+                # The block title takes the index label's place in the header row.
+                column_styles = {col: 'percent' if col == '마진율' else 'integer' for col in pivot_table.columns}
+                sheet.write_frame(pivot_table, startrow=start_row, index=True, index_label=title,
+                                  index_label_style=('header', 'title'), column_styles=column_styles)
+                start_row += len(pivot_table) + 4
+            elif i == len(blocks) - 1:
+                sheet.write_row([title], startrow=start_row, style='title')
+    return workbook.save()
 
 # --- Main Function to be Called by the Web App ---
 def process_file(file_stream):
     """Handles the entire process for a single uploaded file."""
     try:
-        df = pd.read_excel(file_stream)
+        # The order schema parses 주문일자 and the amounts and makes 상태/Brand categorical.
+        df = read_excel_columns(file_stream, usecols=INPUT_COLUMNS, schema='order')
         
         date_range_str = "기간 정보를 가져올 수 없습니다."
         if '주문일자' in df.columns:
             try:
-                df['주문일자'] = pd.to_datetime(df['주문일자'], errors='coerce')
                 df.dropna(subset=['주문일자'], inplace=True)
                 min_date = df['주문일자'].min().strftime('%Y-%m-%d')
                 max_date = df['주문일자'].max().strftime('%Y-%m-%d')
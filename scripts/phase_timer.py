@@ -0,0 +1,81 @@
+"""Phase timing of a program run.
+
+The job worker wraps every program run in :func:`collect`. The shared
+readers mark their work as the ``"parse"`` phase and report how many rows
+they loaded with :func:`add_rows`; the shared writers mark theirs as
+``"serialize"``. Whatever is left of the run's wall time is the program's
+own computation.
+
+Phases do not nest: time spent in an inner phase (a writer called by another
+writer, ``openpyxl.load_workbook`` inside a reader) counts towards the
+outermost one only. Outside :func:`collect` everything here is a no-op, so
+the scripts behave the same when called directly.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import functools
+import threading
+import time
+
+_local = threading.local()
+
+
+class RunPhases:
+    """Seconds per phase and rows loaded during one collected run."""
+
+    def __init__(self):
+        self.seconds = {}
+        self.rows = 0
+        self._active = None
+
+
+@contextlib.contextmanager
+def collect():
+    """Collect the phases of everything run inside the block into a :class:`RunPhases`."""
+
+    run = RunPhases()
+    previous = getattr(_local, "run", None)
+    _local.run = run
+    try:
+        yield run
+    finally:
+        _local.run = previous
+
+
+@contextlib.contextmanager
+def phase(name: str):
+    """Count the time spent inside the block towards phase ``name``."""
+
+    run = getattr(_local, "run", None)
+    if run is None or run._active is not None:
+        yield
+        return
+    run._active = name
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        run._active = None
+        run.seconds[name] = run.seconds.get(name, 0.0) + time.perf_counter() - start
+
+
+def timed(name: str):
+    """Decorator form of :func:`phase`."""
+
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with phase(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def add_rows(count: int) -> None:
+    """Add ``count`` loaded input rows to the current run."""
+
+    run = getattr(_local, "run", None)
+    if run is not None:
+        run.rows += count
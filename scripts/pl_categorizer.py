@@ -1,50 +1,80 @@
 # /scripts/pl_categorizer.py
 import openpyxl
 from openpyxl.styles import PatternFill
-import io
+
+from . import category_store
+from .excel_writer import save_workbook
+from .phase_timer import add_rows, phase
 
 # --- Configuration ---
 # openpyxl uses ARGB hex codes for colors. FFFF00 is yellow.
 NEW_VENDOR_COLOR = "FFFF00"
 DEFAULT_CATEGORY = '공통'
 
-def find_column_indices(sheet):
-    """Finds the column index for '거래처명' and '구분' using openpyxl."""
+def header_indices(headers):
+    """Finds the column index for '거래처명' and '구분' in a header row of values."""
+    headers = list(headers)
     vendor_col, category_col = None, None
-    if sheet.max_row < 1:
-        return None, None
-        
-    # Read the first row to find headers
-    headers = [cell.value for cell in sheet[1]]
     try:
         vendor_col = headers.index('거래처명') + 1
-    except (ValueError, TypeError):
+    except ValueError:
         pass
     try:
         category_col = headers.index('구분') + 1
-    except (ValueError, TypeError):
+    except ValueError:
         pass
-        
     return vendor_col, category_col
 
+def find_column_indices(sheet):
+    """Finds the column index for '거래처명' and '구분' using openpyxl."""
+    header = next(sheet.iter_rows(min_row=1, max_row=1, values_only=True), ())
+    return header_indices(header)
+
+def _vendor_rows(sheet, require_category):
+    """
+    Streams (vendor, category) values of a sheet in one iter_rows pass.
+
+    Random access with sheet.cell() re-parses the sheet XML for every call on a
+    read-only workbook, so rows are only ever read sequentially here.
+    """
+    rows = sheet.iter_rows(values_only=True)
+    vendor_col, category_col = header_indices(next(rows, ()))
+    if not vendor_col or (require_category and not category_col):
+        return
+    vendor_idx = vendor_col - 1
+    category_idx = category_col - 1 if category_col else None
+    for row in rows:
+        vendor = row[vendor_idx] if vendor_idx < len(row) else None
+        if category_idx is None:
+            yield vendor, None
+        else:
+            yield vendor, row[category_idx] if category_idx < len(row) else None
+
 def build_category_map(workbook):
     """Builds a category map from the previous month's workbook using openpyxl."""
     category_map = {}
     for sheet in workbook.worksheets:
-        vendor_col, category_col = find_column_indices(sheet)
-
-        if vendor_col and category_col:
-            # Iterate from the second row to skip the header
-            for row_idx in range(2, sheet.max_row + 1):
-                vendor = sheet.cell(row=row_idx, column=vendor_col).value
-                category = sheet.cell(row=row_idx, column=category_col).value
-                
-                if vendor and category:
-                    vendor_str = str(vendor).strip()
-                    if vendor_str not in category_map:
-                        category_map[vendor_str] = str(category).strip()
+        for vendor, category in _vendor_rows(sheet, require_category=True):
+            if vendor and category:
+                vendor_str = str(vendor).strip()
+                if vendor_str not in category_map:
+                    category_map[vendor_str] = str(category).strip()
     return category_map
 
+def collect_vendors(workbook):
+    """Returns the set of vendor names in the current month's workbook."""
+    vendors = set()
+    for sheet in workbook.worksheets:
+        for vendor, _ in _vendor_rows(sheet, require_category=False):
+            if vendor and str(vendor).strip():
+                vendors.add(str(vendor).strip())
+    return vendors
+
+def assigned_categories(workbook):
+    """Returns the categories already filled in the current month's workbook, without the '공통' default."""
+    return {vendor: category for vendor, category in build_category_map(workbook).items()
+            if category != DEFAULT_CATEGORY}
+
 def process_workbook(workbook, category_map):
     """Processes the current month's workbook using openpyxl."""
     # Define the highlight style once
@@ -61,22 +91,22 @@ def process_workbook(workbook, category_map):
             category_col = sheet.max_column + 1
             sheet.cell(row=1, column=category_col).value = '구분'
 
-        # Process rows
-        for row_idx in range(2, sheet.max_row + 1):
-            vendor_cell = sheet.cell(row=row_idx, column=vendor_col)
-            vendor_name = str(vendor_cell.value).strip() if vendor_cell.value else None
+        # Process rows; each row tuple spans every column, including '구분'
+        for row in sheet.iter_rows(min_row=2):
+            vendor_value = row[vendor_col - 1].value
+            vendor_name = str(vendor_value).strip() if vendor_value else None
 
             if not vendor_name:
                 continue
 
-            category_cell = sheet.cell(row=row_idx, column=category_col)
+            category_cell = row[category_col - 1]
             
             if vendor_name in category_map:
                 category_cell.value = category_map[vendor_name]
             else:
                 category_cell.value = DEFAULT_CATEGORY
                 # Highlight the entire row for new vendors
-                for cell in sheet[row_idx]:
+                for cell in row:
                     cell.fill = highlight_fill
     
     # The modified workbook object is returned implicitly
@@ -86,21 +116,45 @@ def process_files(previous_file_stream, current_file_stream):
     """
     Main function to orchestrate building the map and processing the current file.
     Returns the processed file as an in-memory buffer.
+
+    The previous month's file is optional: categories come from the persistent
+    vendor store (see ``category_store``). Categories already assigned in the
+    current month's file (other than the '공통' default) override the store,
+    and an uploaded previous month's file overrides both. The one merged map
+    is written to the output, and its entries for the vendors this run
+    learned about are saved into the store, so the next run agrees with this one.
     """
-    # 1. Build the category map from the previous month's file
-    wb_prev = openpyxl.load_workbook(previous_file_stream, read_only=True)
-    category_map = build_category_map(wb_prev)
-    
-    if not category_map:
-        raise ValueError("Could not build a category map from the 'previous month' file. Please check its format and content.")
+    # 1. Build the category map from the previous month's file, if given
+    previous_map = {}
+    if previous_file_stream is not None:
+        with phase("parse"):
+            wb_prev = openpyxl.load_workbook(previous_file_stream, read_only=True)
+            try:
+                previous_map = build_category_map(wb_prev)
+            finally:
+                wb_prev.close()
+        if not previous_map:
+            raise ValueError("Could not build a category map from the 'previous month' file. Please check its format and content.")
+    elif category_store.count() == 0:
+        raise ValueError("No vendor categories are stored yet. Please upload the previous month's file for the first run.")
 
-    # 2. Process the current month's file using the map
-    wb_curr = openpyxl.load_workbook(current_file_stream)
+    # 2. Look up every vendor of the current month in the store at once
+    with phase("parse"):
+        wb_curr = openpyxl.load_workbook(current_file_stream)
+    add_rows(sum(sheet.max_row for sheet in wb_curr.worksheets))
+    category_map = category_store.lookup(collect_vendors(wb_curr))
+    # Read before process_workbook overwrites the '구분' column
+    assigned_map = assigned_categories(wb_curr)
+    category_map.update(assigned_map)
+    category_map.update(previous_map)
+    learned = {vendor: category_map[vendor] for vendor in {**assigned_map, **previous_map}}
+
+    # 3. Process the current month's file using the map
     processed_wb = process_workbook(wb_curr, category_map)
-    
-    # 3. Save the result to an in-memory buffer
-    output_buffer = io.BytesIO()
-    processed_wb.save(output_buffer)
-    output_buffer.seek(0)
-    
-    return output_buffer
\ No newline at end of file
+
+    # 4. Remember what this run learned for later runs
+    if learned:
+        category_store.upsert(learned)
+
+    # 5. Save the result to an in-memory buffer
+    return save_workbook(processed_wb)
@@ -1,9 +1,13 @@
 # /scripts/pl_converter.py
 import openpyxl
+import os
 import re
-import io
+import pandas as pd
 from openpyxl.utils import get_column_letter
 
+from .excel_writer import StreamingWorkbook, save_workbook
+from .phase_timer import add_rows, phase
+
 # --- Configuration: All constants and helper functions are copied directly ---
 
 def normalize_d1_name(name):
@@ -86,94 +90,111 @@ MAP_D2_TO_D1 = [
     {"d2_display_name": "12. 당 기  순  이  익", "d1_lookup_names": [normalize_d1_name("9. 당 기 순 이 익")], "type": "direct"}
 ]
 
+# --- Compiled mapping plan ---
+
+FOOTER_PATTERN = re.compile(r"^\d{4}/\d{2}/\d{2}\s+(오전|오후)\s+\d{1,2}:\d{2}:\d{2}")
+
+def compile_mapping(mapping):
+    """
+    Compiles a D2 -> D1 mapping into an index-based evaluation plan.
+
+    Every distinct lookup name gets a slot. 'direct' rows become an index into
+    the slot values (-1 when the row stays blank) and 'sum' rows become groups
+    of slot indices, so evaluating the plan is plain list indexing.
+    """
+    slots = {}
+    display_names, direct_index, sum_groups = [], [], []
+    for row_idx, item_map in enumerate(mapping):
+        display_names.append(item_map["d2_display_name"])
+        names = item_map["d1_lookup_names"]
+        indices = [slots.setdefault(name, len(slots)) for name in names]
+        if item_map["type"] == "direct" and indices:
+            direct_index.append(indices[0])
+        else:
+            direct_index.append(-1)
+            if item_map["type"] == "calculation" and item_map.get("op") == "sum":
+                sum_groups.append((row_idx, indices))
+    return {
+        "display_names": display_names,
+        "lookup_keys": list(slots),
+        "direct_index": direct_index,
+        "sum_groups": sum_groups,
+    }
+
+# Compiled once at import; every request only evaluates it.
+MAPPING_PLAN = compile_mapping(MAP_D2_TO_D1)
+
+def evaluate_mapping(data1_lookup, plan=MAPPING_PLAN):
+    """Returns the [d2_display_name, value] rows of the plan for one trial balance."""
+    values = [data1_lookup.get(key) for key in plan["lookup_keys"]]
+    output = [[name, values[idx] if idx >= 0 else None]
+              for name, idx in zip(plan["display_names"], plan["direct_index"])]
+    for row_idx, indices in plan["sum_groups"]:
+        numbers = [values[i] for i in indices if isinstance(values[i], (int, float))]
+        output[row_idx][1] = sum(numbers) if numbers else None
+    return output
+
 # --- Core Logic ---
 
+def _to_number(value):
+    if isinstance(value, (int, float)):
+        return value
+    if isinstance(value, str):
+        try:
+            return float(value.replace(',', ''))
+        except (ValueError, TypeError):
+            pass
+    return None
+
+def parse_trial_balance(sheet):
+    """
+    Builds the normalized account name -> amount lookup in one pass over the sheet.
+
+    Rows are streamed from the top: the '계정명' header marks the start of the
+    data, and the first blank account cell or print-time footer ends it.
+    """
+    rows = sheet.iter_rows(min_row=1, max_col=2, values_only=True)
+    for row in rows:
+        if isinstance(row[0], str) and "계정명" in row[0]:
+            break
+    else:
+        raise ValueError("Could not find the '계정명' header row in the input file.")
+
+    data1_lookup = {}
+    data_rows = 0
+    for row in rows:
+        raw_name = row[0]
+        if raw_name is None or (isinstance(raw_name, str) and FOOTER_PATTERN.match(raw_name)):
+            break
+        data_rows += 1
+        if not raw_name:
+            continue
+
+        normalized_key = normalize_d1_name(str(raw_name))
+        numeric_value = _to_number(row[1] if len(row) > 1 else None)
+        if normalized_key in SUMMABLE_NORMALIZED_KEYS:
+            if numeric_value is not None:
+                data1_lookup[normalized_key] = (data1_lookup.get(normalized_key) or 0) + numeric_value
+        elif normalized_key not in data1_lookup:
+            # For non-summable keys, only the first occurrence counts
+            data1_lookup[normalized_key] = numeric_value
+
+    if not data_rows:
+        raise ValueError("Could not determine the data range after finding the header.")
+    add_rows(data_rows)
+    return data1_lookup
+
 def process_file(input_file):
     """
     Reads an Excel file stream, processes it, adds new sheets, and returns the result.
     """
     try:
-        workbook = openpyxl.load_workbook(input_file)
-        sheet1 = workbook.active
-        
-        data_start_row = None
-        data_end_row = None
-        
-        # Find the start of the data by looking for "계정명"
-        for r_idx, row in enumerate(sheet1.iter_rows(min_row=1, max_col=1, values_only=True), 1):
-            if isinstance(row[0], str) and "계정명" in row[0]:
-                data_start_row = r_idx + 1
-                break
-        
-        if not data_start_row:
-            raise ValueError("Could not find the '계정명' header row in the input file.")
-
-        # Find the end of the data more safely
-        footer_pattern = re.compile(r"^\d{4}/\d{2}/\d{2}\s+(오전|오후)\s+\d{1,2}:\d{2}:\d{2}")
-        for r_idx in range(data_start_row, sheet1.max_row + 2):
-            if r_idx > sheet1.max_row:
-                data_end_row = sheet1.max_row
-                break
-            
-            cell_value = sheet1.cell(row=r_idx, column=1).value
-            if cell_value is None or (isinstance(cell_value, str) and footer_pattern.match(cell_value)):
-                data_end_row = r_idx - 1
-                break
-            
-            if r_idx == sheet1.max_row:
-                data_end_row = r_idx
-                break
-                
-        if not data_end_row or data_end_row < data_start_row:
-            raise ValueError("Could not determine the data range after finding the header.")
-
-        # Populate lookup dictionary from the source data
-        data1_lookup = {}
-        for row_num in range(data_start_row, data_end_row + 1):
-            raw_name = sheet1.cell(row=row_num, column=1).value
-            value_str = sheet1.cell(row=row_num, column=2).value
-            
-            if raw_name:
-                normalized_key = normalize_d1_name(str(raw_name))
-                numeric_value = None
-                if isinstance(value_str, (int, float)):
-                    numeric_value = value_str
-                elif isinstance(value_str, str):
-                    try:
-                        numeric_value = float(value_str.replace(',', ''))
-                    except (ValueError, TypeError):
-                        pass
-
-                # *** CORRECTED LOGIC HERE ***
-                if normalized_key in SUMMABLE_NORMALIZED_KEYS:
-                    if numeric_value is not None:
-                        current_total = data1_lookup.get(normalized_key) or 0
-                        data1_lookup[normalized_key] = current_total + numeric_value
-                else: # For non-summable keys, only add if it's not already there
-                    if normalized_key not in data1_lookup:
-                        data1_lookup[normalized_key] = numeric_value
-
-        # Prepare the new dataset based on the mapping
-        dataset2_raw_output = []
-        for item_map in MAP_D2_TO_D1:
-            d2_name = item_map["d2_display_name"]
-            raw_value = None
-            
-            if item_map["type"] == "direct":
-                lookup_key = item_map["d1_lookup_names"][0] if item_map["d1_lookup_names"] else None
-                if lookup_key:
-                    raw_value = data1_lookup.get(lookup_key)
-            elif item_map["type"] == "calculation" and item_map["op"] == "sum":
-                current_sum = 0
-                has_value = False
-                for lookup_key in item_map["d1_lookup_names"]:
-                    val = data1_lookup.get(lookup_key)
-                    if isinstance(val, (int, float)):
-                        current_sum += val
-                        has_value = True
-                raw_value = current_sum if has_value else None
-            
-            dataset2_raw_output.append([d2_name, raw_value])
+        with phase("parse"):
+            workbook = openpyxl.load_workbook(input_file)
+            data1_lookup = parse_trial_balance(workbook.active)
+
+        # Prepare the new dataset based on the compiled mapping
+        dataset2_raw_output = evaluate_mapping(data1_lookup)
         
         # --- Write "Dataset 2 Output" sheet ---
         number_format = '#,##0;"- "#,##0;0'
@@ -211,12 +232,68 @@ def process_file(input_file):
         sheet3.column_dimensions['B'].width = 20
 
         # Save the modified workbook to an in-memory buffer
-        output_buffer = io.BytesIO()
-        workbook.save(output_buffer)
-        output_buffer.seek(0)
-        return output_buffer
+        return save_workbook(workbook)
 
     except Exception as e:
         # Raise a more informative exception
         raise Exception(f"An error occurred in pl_converter: {e}")
 
+
+# --- Multi-month comparison ---
+
+MONTH_PATTERN = re.compile(r"(20\d{2})[-_. ]?(0[1-9]|1[0-2])(?!\d)")
+COMPARISON_SHEET_NAME = "Monthly Comparison"
+
+def parse_month(input_file):
+    """
+    Parses one monthly trial balance into its D2 values (one per MAP_D2_TO_D1 row).
+
+    Runs as one item of a batch job; the workbook is only read, so it is
+    opened in read-only mode.
+    """
+    with phase("parse"):
+        workbook = openpyxl.load_workbook(input_file, read_only=True, data_only=True)
+        try:
+            data1_lookup = parse_trial_balance(workbook.active)
+        finally:
+            workbook.close()
+    values = [value if isinstance(value, (int, float)) else None
+              for _, value in evaluate_mapping(data1_lookup)]
+    return pd.Series(values, dtype="float64")
+
+def month_label(filename):
+    """Returns 'YYYY-MM' when the file name carries a month, else the file name."""
+    stem = os.path.splitext(os.path.basename(filename))[0]
+    match = MONTH_PATTERN.search(stem)
+    return f"{match.group(1)}-{match.group(2)}" if match else stem
+
+def combine_months(names, results):
+    """
+    Builds one comparison workbook from the parse_month results of a batch.
+
+    Rows are the d2_display_name lines, with one column per month, a YTD total
+    and a month-over-month delta for every month after the first. Months are
+    ordered by the YYYY-MM found in the file names when every file has one.
+    """
+    labels = [month_label(name) for name in names]
+    if len(set(labels)) < len(labels):
+        # Two files for the same month: keep them apart by upload position
+        labels = [f"{i}. {os.path.basename(name)}" for i, name in enumerate(names, 1)]
+    table = pd.concat(results, axis=1, ignore_index=True)
+    table.columns = labels
+    if all(re.fullmatch(r"\d{4}-\d{2}", label) for label in labels):
+        table = table[sorted(labels)]
+
+    ytd = table.sum(axis=1, min_count=1).rename("YTD")
+    deltas = table.diff(axis=1).iloc[:, 1:]
+    deltas.columns = [f"MoM {label}" for label in deltas.columns]
+    report = pd.concat([table, ytd, deltas], axis=1)
+    report.insert(0, "d2_display_name", MAPPING_PLAN["display_names"])
+
+    book = StreamingWorkbook()
+    sheet = book.sheet(COMPARISON_SHEET_NAME)
+    sheet.worksheet.column_dimensions['A'].width = 40
+    for col_idx in range(2, report.shape[1] + 1):
+        sheet.worksheet.column_dimensions[get_column_letter(col_idx)].width = 16
+    sheet.write_frame(report, column_styles={col: 'accounting' for col in report.columns[1:]})
+    return book.save()
@@ -10,28 +10,47 @@ costs by region.
 from __future__ import annotations
 
 import io
-import re
+import numpy as np
 import pandas as pd
 
+from .excel_writer import write_frames
+from .upload_cache import read_excel_cached
 
-def _extract_address_parts(address: str | None) -> tuple[str, str, str]:
-    """Split a Korean address into province, district and road name.
+
+ADDRESS_COLUMNS = ["시/도", "시/군/구", "도로명"]
+
+
+def split_addresses(addresses: pd.Series) -> pd.DataFrame:
+    """Split Korean addresses into province, district and road name.
+
+    Delivery addresses repeat heavily, so every distinct address is parsed
+    once with vectorized string operations (postal code in brackets removed,
+    first three whitespace-separated parts kept) and the results are mapped
+    back to the rows. Missing addresses give empty strings.
 
     Parameters
     ----------
-    address: str | None
-        Full address string possibly containing a postal code in brackets.
-    """
+    addresses: pandas.Series
+        Full address strings possibly containing a postal code in brackets.
 
-    if pd.isna(address):
-        return "", "", ""
-    address_no_zip = re.sub(r"\[\d+\]\s*", "", str(address)).strip()
-    parts = address_no_zip.split()
-    province = parts[0] if len(parts) > 0 else ""
-    district = parts[1] if len(parts) > 1 else ""
-    road = parts[2] if len(parts) > 2 else ""
-    return province, district, road
+    Returns
+    -------
+    pandas.DataFrame
+        ``ADDRESS_COLUMNS`` aligned with ``addresses``.
+    """
 
+    codes, uniques = pd.factorize(addresses)
+    cleaned = (
+        pd.Series(uniques, dtype=object)
+        .astype(str)
+        .str.replace(r"\[\d+\]\s*", "", regex=True)
+        .str.split(n=len(ADDRESS_COLUMNS), expand=True)
+        .reindex(columns=range(len(ADDRESS_COLUMNS)))
+        .fillna("")
+    )
+    # Code -1 (missing address) picks the trailing all-empty row.
+    table = np.vstack([cleaned.to_numpy(dtype=object), [""] * len(ADDRESS_COLUMNS)])
+    return pd.DataFrame(table[codes], index=addresses.index, columns=ADDRESS_COLUMNS)
 
 
 def process_files(logistics_file, admin_file) -> io.BytesIO:
@@ -49,8 +68,8 @@ def process_files(logistics_file, admin_file) -> io.BytesIO:
     """
 
     # --- Load datasets ---
-    logistics_df = pd.read_excel(logistics_file, dtype={"자체 관리코드": str})
-    admin_df = pd.read_excel(admin_file, dtype={"주문번호": str})
+    logistics_df = read_excel_cached(logistics_file, schema="logistics", dtype={"자체 관리코드": str})
+    admin_df = read_excel_cached(admin_file, schema="admin", dtype={"주문번호": str})
     original_admin_df = admin_df.copy()
 
     if "자체 관리코드" in logistics_df.columns:
@@ -80,10 +99,7 @@ def process_files(logistics_file, admin_file) -> io.BytesIO:
     merged_df.rename(columns={"합계비용": "퀵비용"}, inplace=True)
     merged_df.drop(columns=["자체 관리코드"], inplace=True)
 
-    address_parts = merged_df["배송주소"].apply(_extract_address_parts)
-    merged_df[["시/도", "시/군/구", "도로명"]] = pd.DataFrame(
-        address_parts.tolist(), index=merged_df.index
-    )
+    merged_df[ADDRESS_COLUMNS] = split_addresses(merged_df["배송주소"])
 
     processed_admin_df = merged_df.copy()
 
@@ -147,23 +163,13 @@ def process_files(logistics_file, admin_file) -> io.BytesIO:
             pivot_df["평균 퀵비용 (Avg. Quick Fee)"].fillna(0).astype(int)
         )
 
-    # --- Export to Excel in memory ---
-    output = io.BytesIO()
-    with pd.ExcelWriter(output, engine="openpyxl") as writer:
-        original_admin_df.to_excel(
-            writer, sheet_name="주문관리_원본 (Original_Admin)", index=False
-        )
-        processed_admin_df.to_excel(
-            writer, sheet_name="전체 데이터 (Full_Data_Modified)", index=False
-        )
-        if not quick_df.empty:
-            quick_df.to_excel(
-                writer, sheet_name="퀵배송_데이터 (Quick_Data)", index=False
-            )
-        if not pivot_df.empty:
-            pivot_df.to_excel(
-                writer, sheet_name="지역구별_요약 (District_Summary)", index=False
-            )
-
-    output.seek(0)
-    return output
+    # --- Export to Excel in memory (streamed, one row at a time) ---
+    sheets = {
+        "주문관리_원본 (Original_Admin)": original_admin_df,
+        "전체 데이터 (Full_Data_Modified)": processed_admin_df,
+    }
+    if not quick_df.empty:
+        sheets["퀵배송_데이터 (Quick_Data)"] = quick_df
+    if not pivot_df.empty:
+        sheets["지역구별_요약 (District_Summary)"] = pivot_df
+    return write_frames(sheets)
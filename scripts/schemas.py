@@ -0,0 +1,113 @@
+"""Declared column types of the uploaded exports.
+
+Every program used to receive low-cardinality labels (status, brand,
+channel, product type, delivery method, ...) as Python string objects and
+re-clean them with ``.astype(str).str.strip()`` on each use. ``SCHEMAS``
+declares, per export type, which columns are:
+
+``categories``
+    Low-cardinality labels stored as ``category`` (integer codes plus one
+    copy of each label), so ``isin``/``==``/``groupby`` work on the codes.
+    Labels are stripped of surrounding whitespace unless ``strip`` is false.
+``numbers``
+    ``{column: fill}``; thousands separators are removed, unparseable cells
+    become ``fill`` (``None`` keeps them missing). They stay ``int64`` or
+    ``float64``: narrower integers overflow silently in arithmetic.
+``dates``
+    ``{column: format}``; parsed to ``datetime64``, ``None`` lets pandas
+    infer the format. Unparseable cells become ``NaT``.
+
+The loaders in :mod:`scripts.excel_reader` and :mod:`scripts.upload_cache`
+take a ``schema`` name and apply it once, before the parsed frame is cached;
+the spec and ``SCHEMA_VERSION`` are part of the cache key.
+Columns absent from an upload are skipped.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+# Part of the upload cache key; bump it when apply_schema changes the types it produces.
+SCHEMA_VERSION = 2
+
+SCHEMAS = {
+    # Order exports of the tire shop (B2C weekly report, margin by tire).
+    "order": {
+        "categories": ["상태", "Brand", "브랜드", "주문채널", "상품타입", "패턴"],
+        "strip": True,
+        "numbers": {
+            "주문수량": 0, "상품주문금액": 0, "실결제금액": 0, "장착비": 0,
+            "수량": 0, "타이어가격": 0, "정산금액": 0, "판매금액": 0,
+        },
+        "dates": {"주문일": "%Y%m%d", "주문일자": None},
+    },
+    # Courier cost export (quick delivery).
+    "logistics": {
+        "numbers": {"합계비용": None},
+    },
+    # Admin order export (quick delivery); written back verbatim, so not stripped.
+    "admin": {
+        "categories": ["배송방법"],
+        "strip": False,
+    },
+    # Customer marketing-consent export (CRM dataset 2).
+    "consent": {
+        "categories": ["푸시수신동의"],
+        "strip": False,
+    },
+}
+
+
+def apply_schema(df: pd.DataFrame, schema: str) -> pd.DataFrame:
+    """Convert the columns of ``df`` declared by ``SCHEMAS[schema]`` in place.
+
+    Returns
+    -------
+    pandas.DataFrame
+        ``df`` itself, for chaining.
+    """
+
+    if schema not in SCHEMAS:
+        raise ValueError(f"Unknown schema '{schema}'. Choose one of: {', '.join(SCHEMAS)}")
+    spec = SCHEMAS[schema]
+
+    for col in spec.get("categories", []):
+        if col in df.columns:
+            df[col] = to_category(df[col], strip=spec.get("strip", True))
+    for col, fill in spec.get("numbers", {}).items():
+        if col in df.columns:
+            df[col] = to_number(df[col], fill)
+    for col, date_format in spec.get("dates", {}).items():
+        if col in df.columns:
+            df[col] = pd.to_datetime(df[col], format=date_format, errors="coerce")
+    return df
+
+
+def to_category(series: pd.Series, strip: bool = True) -> pd.Series:
+    """Return ``series`` as a ``category`` of string labels, missing values kept.
+
+    Stripping works on the distinct labels only; labels that become equal
+    once stripped share one category. Categories are sorted, so groupings
+    come out in the same order as on the plain strings.
+    """
+
+    values = series.astype("category")
+    labels = values.cat.categories.astype(str)
+    if strip:
+        labels = labels.str.strip()
+    categories = pd.Index(labels.unique()).sort_values()
+    mapping = np.append(categories.get_indexer(labels), -1)
+    codes = mapping[values.cat.codes.to_numpy()]  # code -1 (missing) picks the trailing -1
+    return pd.Series(pd.Categorical.from_codes(codes, categories=categories), index=series.index, name=series.name)
+
+
+def to_number(series: pd.Series, fill=None) -> pd.Series:
+    """Parse ``series`` as numbers; see ``numbers`` in the module docstring."""
+
+    if not pd.api.types.is_numeric_dtype(series.dtype):
+        series = series.astype(str).str.replace(",", "", regex=False)
+    values = pd.to_numeric(series, errors="coerce")
+    if fill is not None:
+        values = values.fillna(fill)
+    return values
@@ -2,47 +2,60 @@
 import pandas as pd
 import io
 
-def analyze_sales_data(file_stream, date_input):
-    """
-    Excel 파일 스트림에서 판매 데이터를 읽어와서 분석하고 결과를 DataFrame으로 반환합니다.
-    
-    Args:
-        file_stream: 업로드된 Excel 파일의 in-memory stream.
-        date_input (str): 'YYYYMMDD' 형식의 분석할 날짜.
-        
-    Returns:
-        pandas.DataFrame: 분석 결과가 담긴 DataFrame.
+from .excel_reader import read_excel_columns
+
+INPUT_COLUMNS = ['상품타입', '주문일', '주문수량', '주문채널', '주문번호']
+PRODUCT_TYPE_TO_FILTER = '타이어'
+
+
+def load_tire_orders(file_stream):
     """
-    product_type_to_filter = '타이어'
+    Excel 파일에서 '타이어' 주문만 읽어 분석에 필요한 형태로 정리합니다.
 
+    '주문일'은 'YYYYMMDD' 문자열로, '주문수량'은 숫자형으로 한 번만 변환합니다.
+    """
     # --- 파일 읽기 및 유효성 검사 ---
     try:
-        df = pd.read_excel(file_stream)
+        df = read_excel_columns(file_stream, usecols=INPUT_COLUMNS, dtype={'주문일': str})
     except Exception as e:
         raise ValueError(f"Excel 파일을 읽는 중 오류가 발생했습니다: {e}")
 
-    required_cols = ['상품타입', '주문일', '주문수량', '주문채널', '주문번호']
-    for col in required_cols:
+    for col in INPUT_COLUMNS:
         if col not in df.columns:
             raise ValueError(f"입력 파일에 필수 컬럼이 없습니다: '{col}'. Excel 파일의 열 이름을 확인해주세요.")
 
     # --- 데이터 필터링 및 처리 ---
     # '상품타입'으로 필터링
-    df_filtered_product = df[df['상품타입'] == product_type_to_filter].copy()
-    if df_filtered_product.empty:
-        return pd.DataFrame() # 필터링 후 데이터가 없으면 빈 DataFrame 반환
+    df = df[df['상품타입'] == PRODUCT_TYPE_TO_FILTER].copy()
 
     # '주문일'을 문자열로 변환하여 정확한 비교 보장
-    df_filtered_product['주문일'] = df_filtered_product['주문일'].astype(str)
+    df['주문일'] = df['주문일'].astype(str)
+
+    # '주문수량'을 숫자형으로 변환
+    df['주문수량'] = pd.to_numeric(df['주문수량'], errors='coerce')
+    return df
+
+
+def analyze_sales_data(file_stream, date_input):
+    """
+    Excel 파일 스트림에서 판매 데이터를 읽어와서 분석하고 결과를 DataFrame으로 반환합니다.
+
+    Args:
+        file_stream: 업로드된 Excel 파일의 in-memory stream.
+        date_input (str): 'YYYYMMDD' 형식의 분석할 날짜.
+
+    Returns:
+        pandas.DataFrame: 분석 결과가 담긴 DataFrame.
+    """
+    df_filtered_product = load_tire_orders(file_stream)
+    if df_filtered_product.empty:
+        return pd.DataFrame() # 필터링 후 데이터가 없으면 빈 DataFrame 반환
 
     # 입력된 날짜로 필터링
-    df_date_filtered = df_filtered_product[df_filtered_product['주문일'] == date_input].copy()
+    df_date_filtered = df_filtered_product[df_filtered_product['주문일'] == date_input]
     if df_date_filtered.empty:
         return pd.DataFrame()
 
-    # '주문수량'을 숫자형으로 변환
-    df_date_filtered['주문수량'] = pd.to_numeric(df_date_filtered['주문수량'], errors='coerce')
-
     # --- 피벗 테이블 생성 ---
     pivot_table = df_date_filtered.groupby('주문채널').agg(
         total_orders=('주문번호', 'nunique'),  # 고유 주문번호 개수
@@ -50,3 +63,54 @@ def analyze_sales_data(file_stream, date_input):
     ).reset_index()
 
     return pivot_table
+
+
+def analyze_sales_range(file_stream, start_date, end_date):
+    """
+    기간 내 모든 날짜를 한 번에 분석하여 날짜 x 주문채널 표를 반환합니다.
+
+    파일은 한 번만 읽고 (주문일, 주문채널)로 한 번만 집계하므로, 조회 일수와
+    관계없이 처리 비용이 같습니다.
+
+    Args:
+        file_stream: 업로드된 Excel 파일의 in-memory stream.
+        start_date (str): 'YYYYMMDD' 형식의 시작 날짜.
+        end_date (str): 'YYYYMMDD' 형식의 종료 날짜 (포함).
+
+    Returns:
+        pandas.DataFrame: '주문일' 행마다 채널별 주문건수/주문수량과 합계 열이 있는 표.
+            주문이 없는 날짜는 0으로 표시되고, 마지막 행은 기간 합계입니다.
+    """
+    try:
+        days = pd.date_range(
+            pd.to_datetime(start_date, format='%Y%m%d'),
+            pd.to_datetime(end_date, format='%Y%m%d'),
+        ).strftime('%Y%m%d')
+    except ValueError:
+        raise ValueError("날짜는 'YYYYMMDD' 형식으로 입력해주세요.")
+    if len(days) == 0:
+        raise ValueError("종료 날짜는 시작 날짜와 같거나 이후여야 합니다.")
+
+    df = load_tire_orders(file_stream)
+    df = df[df['주문일'].isin(days)]
+    if df.empty:
+        return pd.DataFrame()
+
+    grouped = df.groupby(['주문일', '주문채널']).agg(
+        total_orders=('주문번호', 'nunique'),
+        total_quantity=('주문수량', 'sum'),
+    )
+    matrix = grouped.unstack('주문채널', fill_value=0).reindex(days, fill_value=0)
+    matrix = matrix.swaplevel(axis=1).sort_index(axis=1, level=0, sort_remaining=False)
+
+    channels = matrix.columns.get_level_values(0).unique()
+    result = pd.DataFrame(index=matrix.index)
+    for channel in channels:
+        result[f"{channel} 주문건수"] = matrix[(channel, 'total_orders')]
+        result[f"{channel} 주문수량"] = matrix[(channel, 'total_quantity')]
+    result['합계 주문건수'] = matrix.xs('total_orders', axis=1, level=1).sum(axis=1)
+    result['합계 주문수량'] = matrix.xs('total_quantity', axis=1, level=1).sum(axis=1)
+
+    result.loc['합계'] = result.sum()
+    result.index.name = '주문일'
+    return result.reset_index()
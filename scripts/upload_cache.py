@@ -0,0 +1,265 @@
+"""Content-addressed cache of parsed uploads.
+
+The same daily order export is usually uploaded to several programs in a
+row. Parsing the xlsx with openpyxl dominates the run time, so the parsed
+DataFrame is stored on local disk keyed by the SHA-256 of the uploaded bytes
+(plus the read options). Later runs on identical bytes load the cached frame
+instead of parsing the workbook again.
+
+Frames are stored as Feather (Arrow IPC) files when ``pyarrow`` is
+available. Frames Arrow cannot represent, such as object columns mixing
+numbers and text, fall back to pickle. The cache directory is bounded by
+``CACHE_MAX_BYTES`` and the least recently used entries are evicted first.
+
+Uploads are opened through :class:`UploadData`, which memory-maps files on
+disk instead of reading them into a bytes object, so hashing and parsing a
+large upload does not hold a second copy of it in the worker's memory.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import io
+import json
+import mmap
+import os
+import tempfile
+import pandas as pd
+
+from .phase_timer import add_rows, timed
+from .schemas import SCHEMA_VERSION, SCHEMAS, apply_schema
+
+try:
+    import pyarrow  # noqa: F401  (only needed for Feather support)
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+
+CACHE_DIR = os.environ.get(
+    "AUTOWORLD_CACHE_DIR",
+    os.path.join(tempfile.gettempdir(), "autoworld_upload_cache"),
+)
+CACHE_MAX_BYTES = int(os.environ.get("AUTOWORLD_CACHE_MAX_BYTES", 2 * 1024 ** 3))
+
+# Options that do not change the parsed result and must not split the key.
+_IGNORED_OPTIONS = {"engine"}
+_EXTENSIONS = (".feather", ".pkl")
+
+
+def read_upload_bytes(file_stream) -> bytes:
+    """Return the full content of an uploaded file-like object or path."""
+
+    if isinstance(file_stream, (bytes, bytearray, memoryview)):
+        return bytes(file_stream)
+    if isinstance(file_stream, (str, os.PathLike)):
+        with open(file_stream, "rb") as f:
+            return f.read()
+    if hasattr(file_stream, "seek"):
+        file_stream.seek(0)
+    return file_stream.read()
+
+
+class UploadData:
+    """The content of an upload, without copying files on disk into memory.
+
+    ``buffer`` is a read-only bytes-like object to hash or sniff. For paths
+    and real files (such as the job worker's spooled uploads) it is a memory
+    map, whose pages come from the OS page cache rather than the process
+    heap; in-memory streams are read into bytes once. :meth:`stream` returns
+    a rewound binary stream for parsers: the file itself when there is one.
+
+    Use it as a context manager; leaving the block unmaps the file.
+    """
+
+    def __init__(self, file_stream):
+        self.file = None
+        self._map = None
+        self._owned = None
+        if isinstance(file_stream, (bytes, bytearray, memoryview)):
+            self.buffer = bytes(file_stream)
+            return
+        if isinstance(file_stream, (str, os.PathLike)):
+            file_stream = self._owned = open(file_stream, "rb")
+        try:
+            self._map = mmap.mmap(file_stream.fileno(), 0, access=mmap.ACCESS_READ)
+        except (AttributeError, OSError, ValueError):
+            # In-memory streams have no file descriptor; empty files cannot be mapped.
+            self.buffer = read_upload_bytes(file_stream)
+        else:
+            self.buffer = self._map
+            self.file = file_stream
+
+    def __len__(self) -> int:
+        return len(self.buffer)
+
+    def __enter__(self) -> "UploadData":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def stream(self):
+        """Return a binary stream positioned at the start of the content."""
+
+        if self.file is not None:
+            self.file.seek(0)
+            return self.file
+        return io.BytesIO(self.buffer)
+
+    def close(self) -> None:
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        if self._owned is not None:
+            self._owned.close()
+            self._owned = None
+
+
+def cache_key(data, options: dict | None = None) -> str:
+    """Build the cache key for ``data`` (any bytes-like object) parsed with ``options``."""
+
+    digest = hashlib.sha256(data).hexdigest()
+    options = {k: v for k, v in (options or {}).items() if k not in _IGNORED_OPTIONS}
+    if not options:
+        return digest
+    options_blob = json.dumps(options, sort_keys=True, default=repr, ensure_ascii=False)
+    options_digest = hashlib.sha256(options_blob.encode("utf-8")).hexdigest()[:16]
+    return f"{digest}-{options_digest}"
+
+
+def load(key: str) -> pd.DataFrame | None:
+    """Return the cached frame for ``key`` or ``None`` on a miss."""
+
+    for ext in _EXTENSIONS:
+        path = os.path.join(CACHE_DIR, key + ext)
+        try:
+            if ext == ".feather":
+                if not HAS_PYARROW:
+                    continue
+                df = pd.read_feather(path)
+            else:
+                df = pd.read_pickle(path)
+        except FileNotFoundError:
+            continue
+        except Exception:
+            # A truncated or unreadable entry is treated as a miss.
+            _remove(path)
+            continue
+        try:
+            os.utime(path)  # mark as recently used for LRU eviction
+        except OSError:
+            pass
+        return df
+    return None
+
+
+def store(key: str, df: pd.DataFrame) -> None:
+    """Persist ``df`` under ``key`` and evict old entries if needed.
+
+    Failures are swallowed: the cache is an optimisation and must never
+    break a program run.
+    """
+
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+    except OSError:
+        return
+
+    if HAS_PYARROW and _write_atomic(key + ".feather", lambda path: df.to_feather(path)):
+        pass
+    elif not _write_atomic(key + ".pkl", lambda path: df.to_pickle(path)):
+        return
+    evict()
+
+
+def evict(max_bytes: int | None = None) -> None:
+    """Delete least recently used entries until the cache fits ``max_bytes``."""
+
+    max_bytes = CACHE_MAX_BYTES if max_bytes is None else max_bytes
+    try:
+        entries = [e for e in os.scandir(CACHE_DIR) if e.name.endswith(_EXTENSIONS)]
+    except OSError:
+        return
+
+    stats = []
+    for entry in entries:
+        try:
+            st = entry.stat()
+        except OSError:
+            continue
+        stats.append((st.st_mtime, st.st_size, entry.path))
+
+    total = sum(size for _, size, _ in stats)
+    for _, size, path in sorted(stats):
+        if total <= max_bytes:
+            break
+        _remove(path)
+        total -= size
+
+
+def clear() -> None:
+    """Remove every cache entry."""
+
+    evict(max_bytes=0)
+
+
+def cached_parse(data, options: dict | None, parse) -> pd.DataFrame:
+    """Return the frame for ``data``, calling ``parse()`` only on a miss."""
+
+    key = cache_key(data, options)
+    df = load(key)
+    if df is None:
+        df = parse()
+        store(key, df)
+    add_rows(len(df))
+    return df
+
+
+@timed("parse")
+def read_excel_cached(file_stream, schema: str | None = None, **read_kwargs) -> pd.DataFrame:
+    """Drop-in replacement for ``pd.read_excel`` backed by the upload cache.
+
+    Parameters
+    ----------
+    file_stream: file-like object, path or bytes
+        Uploaded workbook.
+    schema: str | None
+        Name of a :data:`scripts.schemas.SCHEMAS` entry applied to the
+        parsed frame before it is cached.
+    **read_kwargs:
+        Passed through to :func:`pandas.read_excel`; they are part of the
+        cache key so differently parsed frames never collide.
+    """
+
+    with UploadData(file_stream) as upload:
+        if schema is None:
+            return cached_parse(
+                upload.buffer, read_kwargs, lambda: pd.read_excel(upload.stream(), **read_kwargs)
+            )
+        options = {**read_kwargs, "schema": [SCHEMA_VERSION, SCHEMAS[schema]]}
+        return cached_parse(
+            upload.buffer, options, lambda: apply_schema(pd.read_excel(upload.stream(), **read_kwargs), schema)
+        )
+
+
+def _write_atomic(filename: str, writer) -> bool:
+    """Write through a temp file so readers never see partial entries."""
+
+    final_path = os.path.join(CACHE_DIR, filename)
+    fd, tmp_path = tempfile.mkstemp(dir=CACHE_DIR, suffix=".tmp")
+    os.close(fd)
+    try:
+        writer(tmp_path)
+        os.replace(tmp_path, final_path)
+        return True
+    except Exception:
+        _remove(tmp_path)
+        return False
+
+
+def _remove(path: str) -> None:
+    try:
+        os.remove(path)
+    except OSError:
+        pass
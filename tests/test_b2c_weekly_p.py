@@ -0,0 +1,63 @@
+"""Rows with a blank channel or brand stay in the B2C weekly report."""
+
+import io
+
+import pandas as pd
+import pytest
+
+from scripts import b2c_daily_store, b2c_weekly_p, upload_cache
+
+
+@pytest.fixture(autouse=True)
+def isolated_state(tmp_path, monkeypatch):
+    monkeypatch.setattr(b2c_daily_store, "STORE_PATH", str(tmp_path / "b2c.sqlite3"))
+    monkeypatch.setattr(upload_cache, "CACHE_DIR", str(tmp_path / "cache"))
+
+
+def _orders(rows):
+    columns = ['주문일', '주문번호', '고객id', '상품타입', '브랜드', '패턴', '주문채널', '주문상품',
+               '주문수량', '상품주문금액', '실결제금액', '장착비']
+    buffer = io.BytesIO()
+    pd.DataFrame(rows, columns=columns).to_excel(buffer, index=False)
+    buffer.seek(0)
+    return buffer
+
+
+def _block(sheet, title):
+    """Rows of the table under ``title`` in the Analysis_Results sheet, up to its 합계 row."""
+    start = sheet.index[sheet[0] == title][0] + 2
+    header = sheet.loc[start].tolist()
+    rows = []
+    for _, row in sheet.loc[start + 1:].iterrows():
+        rows.append(row.tolist())
+        if row[0] == '합계':
+            break
+    return pd.DataFrame(rows, columns=header)
+
+
+def test_blank_channel_and_brand_are_their_own_group():
+    orders = _orders([
+        ['20250303', 'A1', 'c1', '타이어', '금호', 'P1', '앱', 'tire', 2, 200000, 190000, 0],
+        ['20250303', 'A2', 'c2', '타이어', None, 'P2', None, 'tire', 1, 100000, 95000, 0],
+        ['20250304', 'A3', 'c3', '타이어', '한국', 'P3', None, 'tire', 4, 400000, 380000, 0],
+        ['20250304', 'A4', 'c4', '타이어', None, 'P4', '웹', 'tire', 3, 300000, 280000, 0],
+    ])
+    output = b2c_weekly_p.process_file(orders)
+    sheet = pd.read_excel(output, sheet_name='Analysis_Results', header=None, keep_default_na=False)
+
+    channels = _block(sheet, "1. 타이어 판매 현황 (by 주문채널)")
+    assert sorted(channels['주문채널']) == sorted(['nan', '웹', '앱', '합계'])
+    by_channel = channels.set_index('주문채널')['주문수량'].astype(float)
+    assert by_channel['nan'] == 5
+    assert by_channel.drop('합계').sum() == by_channel['합계'] == 10
+
+    brands = _block(sheet, "6. 타이어 판매 현황 (by 브랜드)")
+    by_brand = brands.set_index('브랜드')['주문수량'].astype(float)
+    assert by_brand['nan'] == 4
+    assert by_brand.drop('합계').sum() == by_brand['합계'] == 10
+
+    customers = _block(sheet, "5. 타이어 구매 고객 분석")
+    assert customers.set_index('주문채널')['고유고객수'].astype(float)['nan'] == 2
+
+    prediction = pd.read_excel(output, sheet_name='Prediction_Analysis', header=None, keep_default_na=False)
+    assert (prediction[0] == 'nan').any()
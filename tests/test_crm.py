@@ -0,0 +1,134 @@
+"""The vectorized CRM normalization matches the per-row functions it replaced."""
+
+import io
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from scripts import crm
+
+IDS = [
+    "tirepick_1012345678",
+    "1012345678",
+    1012345678,
+    1012345678.0,
+    "1012345678.0",
+    float("nan"),
+    None,
+    "",
+    "no digits here",
+    "id-٣٤٥٦ (arabic-indic)",
+    "１２３ fullwidth",
+    "first\n123 second 456",
+    "\n\n789",
+    "abc 12 def 34",
+    "  42  ",
+]
+
+PHONES = [
+    "010-1234-5678",
+    "01012345678",
+    "1012345678",
+    1012345678,
+    1012345678.0,
+    "1012345678.0",
+    "10.012345678",
+    float("nan"),
+    None,
+    "",
+    "no digits",
+    "+82 10 1234 5678",
+    "010\n1234\n5678",
+    "１０１２３４５６７８",
+    "٠١٠١٢٣٤٥٦٧٨",
+    "  1099998888  ",
+    "2012345678",
+]
+
+
+@pytest.fixture(params=["arrow", "object"])
+def text_backend(request, monkeypatch):
+    """Run with the Arrow string kernels and with the plain-object fallback."""
+
+    if request.param == "object":
+        monkeypatch.setattr(crm, "_TEXT_DTYPE", object)
+        monkeypatch.setattr(crm, "_DIGIT_CLASS", r"\d")
+        monkeypatch.setattr(crm, "_DIGIT", r"[\d]")
+    elif crm._TEXT_DTYPE is object:
+        pytest.skip("pyarrow is not installed")
+    return request.param
+
+
+def _same(actual, expected):
+    if expected is None or (isinstance(expected, float) and math.isnan(expected)):
+        return actual is None or (isinstance(actual, float) and math.isnan(actual))
+    return actual == expected
+
+
+@pytest.mark.parametrize("value", IDS)
+def test_clean_tirepick_ids_matches_scalar(text_backend, value):
+    result = crm.clean_tirepick_ids(pd.Series([value], dtype=object)).iloc[0]
+    assert _same(result, crm.clean_tirepick_id(value))
+
+
+@pytest.mark.parametrize("value", PHONES)
+def test_format_phone_numbers_matches_scalar(text_backend, value):
+    result = crm.format_phone_numbers(pd.Series([value], dtype=object)).iloc[0]
+    assert result == crm.format_phone_number(value)
+
+
+def test_whole_columns_match_scalar(text_backend):
+    ids = pd.Series(IDS * 3, dtype=object)
+    expected = [crm.clean_tirepick_id(value) for value in ids]
+    assert all(_same(a, b) for a, b in zip(crm.clean_tirepick_ids(ids), expected))
+
+    # Float columns as read from Excel, with missing values.
+    phones = pd.Series([1012345678.0, np.nan, 1099998888.0, 2012345678.0])
+    assert crm.format_phone_numbers(phones).tolist() == [crm.format_phone_number(v) for v in phones]
+
+
+def _old_read_csv(file_bytes, separator):
+    # The python-engine reader the CRM used before sniffing.
+    for enc in ["utf-8", "cp949", "euc-kr", "latin-1"]:
+        try:
+            return pd.read_csv(io.BytesIO(file_bytes), sep=separator, quotechar='"', on_bad_lines="warn",
+                               engine="python", encoding=enc, dtype={"고객전화번호": str})
+        except (UnicodeDecodeError, pd.errors.ParserError):
+            continue
+    return None
+
+
+ROWS = [["고객id", "푸시수신동의", "이메일", "고객전화번호"],
+        ["tirepick_1", "O", "A@example.com", "01012345678"],
+        ["tirepick_2", "X", "b@example.com", "1098765432"],
+        ["tirepick_3", "O", "c@example.com", ""]]
+
+
+@pytest.mark.parametrize("separator, encoding, expected_separator", [
+    (",", "utf-8", ","),
+    ("\t", "utf-8", "\t"),
+    (";", "utf-8", ","),  # not sniffed; read as one column, as before
+    (",", "cp949", ","),
+    ("\t", "utf-8-sig", "\t"),
+])
+def test_sniffed_csv_reads_like_old_reader(separator, encoding, expected_separator):
+    text = "\n".join(separator.join(row) for row in ROWS) + "\n"
+    file_bytes = text.encode(encoding)
+
+    kind, sniffed_encoding, sniffed_separator = crm.sniff_format(file_bytes)
+    assert kind == "csv"
+    assert sniffed_separator == expected_separator
+
+    df = crm.read_delimited(file_bytes, sniffed_encoding, sniffed_separator, dtype={"고객전화번호": str})
+    expected = _old_read_csv(file_bytes, expected_separator)
+    if encoding == "utf-8-sig":
+        expected.columns = [str(col).lstrip("\ufeff") for col in expected.columns]
+    pd.testing.assert_frame_equal(df.astype(object), expected.astype(object), check_dtype=False)
+
+
+def test_sniff_format_detects_excel():
+    buffer = io.BytesIO()
+    pd.DataFrame({"a": [1]}).to_excel(buffer, index=False)
+    assert crm.sniff_format(buffer.getvalue()) == ("excel", None, None)
@@ -0,0 +1,90 @@
+"""StreamingWorkbook output read back with openpyxl.
+
+Styled cells are write-only cells carrying the workbook's "report <name>"
+cell styles, and saving goes through ``openpyxl.writer.excel.ExcelWriter``.
+"""
+
+import datetime
+import io
+import zipfile
+
+import openpyxl
+import pandas as pd
+import pytest
+
+from scripts import excel_writer
+from scripts.excel_writer import StreamingWorkbook, write_frames
+
+
+def _load(buffer):
+    return openpyxl.load_workbook(io.BytesIO(buffer.getvalue()))
+
+
+def test_styles_are_named_workbook_styles():
+    book = StreamingWorkbook()
+    sheet = book.sheet("S")
+    sheet.write_row(["Title"], style="title")
+    sheet.write_frame(pd.DataFrame({"qty": [1, 2]}), column_styles={"qty": "integer"})
+    workbook = _load(book.save())
+    ws = workbook["S"]
+
+    assert {"report title", "report header", "report integer"} <= set(workbook.named_styles)
+    assert ws["A1"].style == "report title"
+    assert ws["A2"].style == "report header"
+    assert ws["A3"].style == ws["A4"].style == "report integer"
+
+
+def test_styled_frame_round_trips():
+    df = pd.DataFrame({
+        "qty": [1200, None, 3],
+        "rate": [0.25, 0.5, None],
+        "when": [datetime.datetime(2024, 1, 2), None, datetime.datetime(2024, 3, 4)],
+        "name": ["a", "b", None],
+    }, index=pd.Index(["x", "y", "z"], name="key"))
+
+    book = StreamingWorkbook()
+    sheet = book.sheet("Report")
+    sheet.write_row(["Title"], style="title")
+    sheet.write_frame(df, startrow=2, index=True, index_label="Block",
+                      index_label_style=("header", "title"),
+                      column_styles={"qty": "integer", "rate": "percent", "when": "integer"})
+    ws = _load(book.save())["Report"]
+
+    assert ws["A1"].value == "Title" and ws["A1"].font.b and ws["A1"].font.sz == 12
+    assert [c.value for c in ws[3]] == ["Block", "qty", "rate", "when", "name"]
+    assert all(c.font.b for c in ws[3])
+    assert ws["A3"].font.sz == 12  # index label: header then title
+    assert ws["A3"].border.left.style == "thin"
+
+    assert [c.value for c in ws[4]] == ["x", 1200, 0.25, datetime.datetime(2024, 1, 2), "a"]
+    assert ws["B4"].number_format == "#,##0"
+    assert ws["C4"].number_format == "0.0%"
+    assert ws["E4"].number_format == "General"
+    assert ws["A4"].font.b  # index cells look like headers
+    # A date bound to a styled column gets a date format without changing the column's style.
+    assert ws["D4"].is_date and ws["D4"].number_format != "#,##0"
+    assert ws["B6"].number_format == "#,##0"
+
+    # Missing values stay empty, unstyled cells.
+    assert ws["B5"].value is None and ws["B5"].number_format == "General"
+    assert ws["C6"].value is None
+
+
+def test_write_frames_matches_pandas_values():
+    df = pd.DataFrame({"a": range(5), "b": list("vwxyz"), "c": [1.5, None, 2.5, None, 0.0]})
+    result = pd.read_excel(write_frames({"S": df}), sheet_name="S")
+    pd.testing.assert_frame_equal(result, df, check_dtype=False)
+
+
+@pytest.mark.parametrize("compression, method", [("stored", zipfile.ZIP_STORED), ("fast", zipfile.ZIP_DEFLATED)])
+def test_save_compression(compression, method):
+    buffer = StreamingWorkbook(compression).save()
+    with zipfile.ZipFile(buffer) as archive:
+        assert {info.compress_type for info in archive.infolist()} == {method}
+
+
+def test_unknown_style_is_rejected():
+    with pytest.raises(ValueError):
+        StreamingWorkbook().sheet("S").write_row(["x"], style="no-such-style")
+    with pytest.raises(ValueError):
+        excel_writer.save_workbook(openpyxl.Workbook(), "no-such-level")
@@ -0,0 +1,64 @@
+"""IBX item categorization matches the per-row if-chains it replaced."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from scripts import ibx_automation as ibx
+from scripts.ibx_automation import (
+    BALANCE_WEIGHT_BRANDS_B2B, BATTERY_BRANDS_B2B, BATTERY_BRANDS_B2C, ENGINE_OIL_BRANDS_B2B,
+    TIRE_BRANDS_B2B, TIRE_BRANDS_B2C, VALVE_BRANDS_B2B, WASTE_TIRE_BRANDS_B2B,
+)
+
+
+def categorize_brand_b2b(brand):
+    brand_str = str(brand).strip()
+    if brand_str in TIRE_BRANDS_B2B: return 'Tire'
+    if brand_str in BATTERY_BRANDS_B2B: return '배터리'
+    if brand_str in ENGINE_OIL_BRANDS_B2B: return '엔진오일'
+    if brand_str in VALVE_BRANDS_B2B: return '밸브'
+    if brand_str in BALANCE_WEIGHT_BRANDS_B2B: return '밸런스납'
+    if brand_str in WASTE_TIRE_BRANDS_B2B: return '폐타이어'
+    return '기타상품'
+
+
+def categorize_b2c_item(row):
+    if str(row.get('Part No', '')).strip().upper().startswith('B'): return '용역'
+    if str(row.get('Brand', '')).strip() in BATTERY_BRANDS_B2C: return '배터리'
+    if str(row.get('Brand', '')).strip() in TIRE_BRANDS_B2C: return 'Tire'
+    return '기타상품'
+
+
+KNOWN_BRANDS = (TIRE_BRANDS_B2B + BATTERY_BRANDS_B2B + ENGINE_OIL_BRANDS_B2B + VALVE_BRANDS_B2B
+                + BALANCE_WEIGHT_BRANDS_B2B + WASTE_TIRE_BRANDS_B2B)
+BRANDS = KNOWN_BRANDS + [
+    '  금호  ', '한국 ', '금호', '금호', '로케트배터리', '로케트배터리',  # padded and duplicate brands
+    np.nan, None, '', 'nan', 'None',  # missing brands
+    '알수없음', 'kixx', 'Unknown Brand', 12345,  # unknown brands
+]
+PART_NUMBERS = ['B-100', 'b-100', '  b200', 'BX', 'A-1', 'P-B1', '', np.nan, None, 12345, 'nan']
+
+
+def test_b2b_matches_if_chain():
+    brands = pd.Series(BRANDS, dtype=object)
+    result = ibx.categorize_items(brands, ibx.BRAND_LOOKUP_B2B)
+    assert result.astype(object).tolist() == [categorize_brand_b2b(brand) for brand in brands]
+    assert result.index.equals(brands.index)
+
+
+@pytest.mark.parametrize("part_number", PART_NUMBERS)
+def test_b2c_matches_if_chain(part_number):
+    df = pd.DataFrame({'Brand': pd.Series(BRANDS, dtype=object), 'Part No': part_number})
+    result = ibx.categorize_items(df['Brand'], ibx.BRAND_LOOKUP_B2C, df['Part No'])
+    assert result.astype(object).tolist() == df.apply(categorize_b2c_item, axis=1).tolist()
+
+
+def test_b2c_mixed_part_numbers_match_if_chain():
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        'Brand': pd.Series(rng.choice(np.array(BRANDS, dtype=object), 500), dtype=object),
+        'Part No': pd.Series(rng.choice(np.array(PART_NUMBERS, dtype=object), 500), dtype=object),
+    }, index=rng.permutation(1000)[:500])
+    result = ibx.categorize_items(df['Brand'], ibx.BRAND_LOOKUP_B2C, df['Part No'])
+    assert result.astype(object).tolist() == df.apply(categorize_b2c_item, axis=1).tolist()
+    assert result.index.equals(df.index)
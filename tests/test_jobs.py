@@ -0,0 +1,186 @@
+"""The job queue end to end, with a real two-worker pool.
+
+Most jobs run ``pl_converter.parse_month`` on synthetic trial balances: it
+is quick and returns a Series (a frame result). Packed batches need file
+results, so they run Margin by Tire on synthetic order exports.
+"""
+
+import io
+import os
+import time
+import zipfile
+
+import openpyxl
+import pandas as pd
+import pytest
+from werkzeug.datastructures import FileStorage
+
+import jobs
+from benchmarks import synthetic_exports
+
+TRIAL_BALANCE = synthetic_exports.make_trial_balance(200)
+ORDERS = synthetic_exports.make_order_export(200)
+
+
+@pytest.fixture(scope="module", autouse=True)
+def job_pool(tmp_path_factory):
+    state_dir = tmp_path_factory.mktemp("jobs")
+    with pytest.MonkeyPatch.context() as mp:
+        # The fork server copies the environment when the pool starts.
+        mp.setenv("AUTOWORLD_METRICS_LOG", str(state_dir / "run_metrics.jsonl"))
+        mp.setenv("AUTOWORLD_CACHE_DIR", str(state_dir / "upload_cache"))
+        mp.setattr(jobs, "JOB_DIR", str(state_dir / "jobs"))
+        mp.setattr(jobs, "MAX_WORKERS", 2)
+        mp.setattr(jobs, "MAX_PENDING_JOBS", 8)
+        yield
+        jobs.shutdown()
+
+
+def _upload(data, filename):
+    return FileStorage(io.BytesIO(data), filename=filename)
+
+
+def _wait(job_id, timeout=120):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = jobs.status(job_id)
+        if job["state"] in ("done", "error"):
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f"job {job_id} did not finish: {jobs.status(job_id)}")
+
+
+def _cp949_zip(members):
+    """A zip whose names are cp949 bytes without the UTF-8 flag, as Windows Explorer writes them."""
+
+    placeholders = {}
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for i, (name, data) in enumerate(members.items()):
+            raw = name.encode("cp949")
+            placeholder = "QXZJ"[i].encode("ascii") * len(raw)
+            placeholders[placeholder] = raw
+            archive.writestr(placeholder.decode("ascii"), data)
+    data = buffer.getvalue()
+    for placeholder, raw in placeholders.items():
+        data = data.replace(placeholder, raw)
+    return data
+
+
+def test_single_job_runs_to_done():
+    job_id = jobs.submit("pl_converter", "parse_month", _upload(TRIAL_BALANCE, "tb.xlsx"),
+                         download_name="out.xlsx", meta={"note": "x"})
+
+    job = _wait(job_id)
+    assert job["state"] == "done", job.get("error")
+    assert (job["kind"], job["download_name"], job["meta"]) == ("frame", "out.xlsx", {"note": "x"})
+    frame = jobs.load_frame(job_id)
+    assert isinstance(frame, pd.Series) and frame.notna().any()
+    assert not jobs._active
+
+
+def test_failing_job_reports_its_error():
+    job = _wait(jobs.submit("pl_converter", "parse_month", _upload(b"not a workbook", "bad.xlsx")))
+
+    assert job["state"] == "error" and job["error"]
+    assert jobs.result_path(job["id"]) is None
+    assert not jobs._active
+
+
+def test_batch_packs_outputs_and_manifest_from_a_cp949_zip():
+    archive = _cp949_zip({"9월 주문.xlsx": ORDERS, "손상된 파일.xlsx": b"broken"})
+    uploads = [_upload(ORDERS, "8월 주문.xlsx"), _upload(archive, "months.zip")]
+
+    job = _wait(jobs.submit_batch("margin_by_tire", "process_file", uploads))
+
+    names = ["8월 주문.xlsx", "9월 주문.xlsx", "손상된 파일.xlsx"]
+    assert job["state"] == "done" and job["mimetype"] == jobs.ZIP_MIMETYPE
+    assert [item["name"] for item in job["files"]] == names
+    assert [item["state"] for item in job["files"]] == ["done", "done", "error"]
+    with zipfile.ZipFile(jobs.result_path(job["id"])) as result:
+        manifest = pd.read_csv(io.BytesIO(result.read(jobs.MANIFEST_NAME)), encoding="utf-8-sig",
+                               keep_default_na=False)
+        assert list(manifest["file"]) == names
+        assert list(manifest["status"]) == ["success", "success", "error"]
+        outputs = [f"processed_margin_by_tire_{name}" for name in names[:2]]
+        assert list(manifest["output"]) == outputs + [""]
+        assert sorted(result.namelist()) == sorted(outputs + [jobs.MANIFEST_NAME])
+        openpyxl.load_workbook(io.BytesIO(result.read(outputs[1])))
+    assert not jobs._active
+
+
+def test_batch_combines_the_file_results():
+    uploads = [_upload(TRIAL_BALANCE, "2025-09.xlsx"), _upload(TRIAL_BALANCE, "2025-08.xlsx")]
+
+    job = _wait(jobs.submit_batch("pl_converter", "parse_month", uploads, combine="combine_months"))
+
+    assert job["state"] == "done", job.get("error")
+    assert job["mimetype"] == jobs.XLSX_MIMETYPE
+    assert [item["state"] for item in job["files"]] == ["done", "done"]
+    with open(jobs.result_path(job["id"]), "rb") as f:
+        sheet = openpyxl.load_workbook(f).active
+    header = [cell for row in sheet.iter_rows(max_row=5, values_only=True) for cell in row]
+    assert header.index("2025-08") < header.index("2025-09")
+    assert not jobs._active
+
+
+def test_combine_is_skipped_when_a_file_fails():
+    uploads = [_upload(TRIAL_BALANCE, "2025-08.xlsx"), _upload(b"broken", "2025-09.xlsx")]
+
+    job = _wait(jobs.submit_batch("pl_converter", "parse_month", uploads, combine="combine_months"))
+
+    assert job["state"] == "error"
+    assert "2025-09.xlsx" in job["error"]
+    assert not jobs._active
+
+
+def test_empty_batch_is_rejected():
+    with pytest.raises(ValueError):
+        jobs.submit_batch("pl_converter", "parse_month", [_upload(_cp949_zip({}), "empty.zip")])
+    assert not jobs._active
+
+
+@pytest.mark.parametrize("job_id", ["../../etc/passwd", "A" * 32, "0" * 31, "g" * 32, ""])
+def test_malformed_job_ids_are_rejected(job_id):
+    assert jobs._job_dir(job_id) is None
+    assert jobs.status(job_id) is None
+    assert jobs.result_path(job_id) is None
+
+
+def test_unknown_job_id_has_no_status():
+    assert jobs.status("0" * 32) is None
+
+
+def test_full_queue_refuses_new_jobs(monkeypatch):
+    monkeypatch.setattr(jobs, "MAX_PENDING_JOBS", 1)
+    slot = jobs._reserve(object())
+    try:
+        before = set(os.listdir(jobs.JOB_DIR))
+        with pytest.raises(jobs.QueueFullError):
+            jobs.submit("pl_converter", "parse_month", _upload(TRIAL_BALANCE, "tb.xlsx"))
+        with pytest.raises(jobs.QueueFullError):
+            jobs.submit_batch("pl_converter", "parse_month", [_upload(TRIAL_BALANCE, "tb.xlsx")])
+        assert set(os.listdir(jobs.JOB_DIR)) == before
+    finally:
+        jobs._release(slot)
+
+    job = _wait(jobs.submit("pl_converter", "parse_month", _upload(TRIAL_BALANCE, "tb.xlsx")))
+    assert job["state"] == "done"
+    assert not jobs._active
+
+
+def test_pool_is_replaced_after_a_worker_dies():
+    jobs.warm_up()
+    broken = jobs._pool
+
+    future = jobs._submit(os._exit, 1)
+    with pytest.raises(jobs.BrokenProcessPool):
+        future.result(timeout=60)
+
+    job = _wait(jobs.submit("pl_converter", "parse_month", _upload(TRIAL_BALANCE, "tb.xlsx")))
+    assert job["state"] == "done", job.get("error")
+    assert jobs._pool is not None and jobs._pool is not broken
+    deadline = time.monotonic() + 60
+    while not jobs.readiness()["pool_started"] and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert jobs.readiness()["pool_started"]
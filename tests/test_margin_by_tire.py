@@ -0,0 +1,51 @@
+"""The margin pivots match the baseline report to the last bit.
+
+``BASELINE`` was produced by the original ``pd.pivot_table`` implementation
+from ``ORDERS``. The HL-유통 channel mixes in-scope and out-of-scope rows of
+two brands, so summing partial sums instead of the rows changes its 마진율
+in the last bits.
+"""
+
+import pandas as pd
+
+from scripts import margin_by_tire
+
+ORDERS = {
+    '상태': ['배송', '배송', '취소', '배송'],
+    'Brand': ['미쉐린', '한국', 'Other', '미쉐린'],
+    '주문ID': ['halla', 'halla', 'halla', 'TIREPICK'],
+    '수량': [1, 2, 4, 4],
+    '타이어가격': [273000, 223000, 184000, 164000],
+    '정산금액': [1076500, 1028500, 851500, 204500],
+    '판매금액': [1490500, 206500, 318000, 358500],
+}
+
+BASELINE = [
+    {
+        '미쉐린': [5.0, 1165000, 232909, 1681000, 336182, 103273, 516000, 0.3071930773391023],
+        '한국': [2.0, 935000, 467500, 188000, 93864, -373636, -747000, -3.9806295399515736],
+        '총합계': [7.0, 2100000, 299935, 1869000, 266948, -32987, -231000, -0.12357090732181925],
+    },
+    {
+        '미쉐린': [1.0, 979000, 978636, 1355000, 1355000, 376364, 376000, 0.277759141227776],
+        '한국': [2.0, 935000, 467500, 188000, 93864, -373636, -747000, -3.9806295399515736],
+        '총합계': [3.0, 1914000, 637879, 1543000, 514242, -123636, -371000, -0.24042427813789008],
+    },
+    {
+        '미쉐린': [4.0, 186000, 46477, 326000, 81477, 35000, 140000, 0.4295676429567643],
+        '총합계': [4.0, 186000, 46477, 326000, 81477, 35000, 140000, 0.4295676429567643],
+    },
+    {
+        'HL-유통': [7.0, 2688000, 383961, 1832000, 261688, -122273, -856000, -0.4672456575682382],
+        '총합계': [7.0, 2688000, 383961, 1832000, 261688, -122273, -856000, -0.4672456575682382],
+    },
+]
+
+
+def test_pivots_match_the_baseline_exactly():
+    df = margin_by_tire.create_new_columns(pd.DataFrame(ORDERS))
+    pivots = margin_by_tire.create_pivot_tables(df)
+
+    for pivot_table, expected in zip(pivots, BASELINE):
+        assert list(pivot_table.columns) == margin_by_tire.FINAL_COLUMNS
+        assert {key: list(row) for key, row in zip(pivot_table.index, pivot_table.itertuples(index=False))} == expected
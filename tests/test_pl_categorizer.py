@@ -0,0 +1,54 @@
+"""The categorized output and the vendor store agree after a run."""
+
+import io
+
+import openpyxl
+import pytest
+
+from scripts import category_store, pl_categorizer
+
+
+@pytest.fixture(autouse=True)
+def isolated_store(tmp_path, monkeypatch):
+    monkeypatch.setattr(category_store, "STORE_PATH", str(tmp_path / "categories.sqlite3"))
+
+
+def _ledger(rows):
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.append(['거래처명', '구분'])
+    for row in rows:
+        sheet.append(row)
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    buffer.seek(0)
+    return buffer
+
+
+def _categories(output):
+    sheet = openpyxl.load_workbook(output).active
+    return {vendor: category for vendor, category in sheet.iter_rows(min_row=2, values_only=True)}
+
+
+def test_previous_month_wins_in_output_and_store():
+    previous = _ledger([['A', '판관비'], ['B', '매출원가']])
+    current = _ledger([['A', '영업외비용'], ['B', None], ['C', '매출원가'], ['D', '공통'], ['E', None]])
+
+    output = _categories(pl_categorizer.process_files(previous, current))
+    stored = category_store.lookup(['A', 'B', 'C', 'D', 'E'])
+
+    assert output == {'A': '판관비', 'B': '매출원가', 'C': '매출원가', 'D': '공통', 'E': '공통'}
+    assert stored == {'A': '판관비', 'B': '매출원가', 'C': '매출원가'}
+    assert all(output[vendor] == category for vendor, category in stored.items())
+
+
+def test_store_only_run_keeps_the_output_stable():
+    pl_categorizer.process_files(_ledger([['A', '판관비']]), _ledger([['A', None]]))
+
+    # A pre-filled value in a later month replaces the stored one, in both places.
+    first = _categories(pl_categorizer.process_files(None, _ledger([['A', '매출원가'], ['B', '판관비']])))
+    second = _categories(pl_categorizer.process_files(None, _ledger([['A', None], ['B', None]])))
+
+    assert first == {'A': '매출원가', 'B': '판관비'}
+    assert second == first
+    assert category_store.lookup(['A', 'B']) == first
@@ -0,0 +1,28 @@
+"""Production WSGI entry point.
+
+Run it with gunicorn and the settings of ``gunicorn.conf.py``::
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Importing this module loads the Flask app plus every module in
+``jobs.PRELOAD_MODULES`` (pandas, openpyxl and all scripts). gunicorn
+imports it once in the master process (``preload_app``) and forks the web
+workers from there, so they start with everything loaded and share those
+pages. Each worker then starts its own job pool (:func:`jobs.warm_up`)
+before it accepts requests; ``/ready`` answers 200 once that is done.
+
+``app.py`` run directly is the development server.
+"""
+
+from __future__ import annotations
+
+import time
+
+_start = time.perf_counter()
+
+import jobs  # noqa: E402
+from app import app  # noqa: E402,F401
+
+# Seconds per preloaded module, and for the whole import of this module.
+PRELOAD_SECONDS = jobs.preload()
+STARTUP_SECONDS = time.perf_counter() - _start